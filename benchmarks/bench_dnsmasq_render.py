@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+"""Bytes per host entry and render time of a DNSMasq DHCP configuration.
+
+    python3 -m benchmarks.bench_dnsmasq_render --hosts 50000
+"""
+
+import time
+import argparse
+import tracemalloc
+from ipaddress import IPv4Address
+
+from netboxers.models.netbox import Netbox_Prefix
+from netboxers.models.dnsmasq_dhcp import DNSMasq_DHCP_Config, DNSMasq_DHCP_Section, DNSMasq_DHCP_Host
+
+
+def make_prefixes(count: int) -> list[Netbox_Prefix]:
+    return [Netbox_Prefix({'prefix': f"10.{n // 256}.{n % 256}.0/24",
+                           'status': {'value': 'active'},
+                           'vrf': {'id': 1, 'name': 'vrf_lan'},
+                           'scope': {'id': 1, 'name': 'Site'},
+                           'vlan': {'id': n + 1, 'vid': n % 4094 + 1, 'display': f"VLAN {n}"},
+                           'role': {'id': 1, 'name': 'Lan'},
+                           'is_pool': False,
+                           'tags': []}) for n in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser("bench_dnsmasq_render")
+    parser.add_argument("--hosts", help="Host entries in the configuration", default=50000, type=int)
+    parser.add_argument("--hosts-per-prefix", default=250, type=int)
+    args = parser.parse_args()
+
+    prefixes = make_prefixes(args.hosts // args.hosts_per_prefix + 1)
+    macs = [f"02:00:00:{n >> 16 & 255:02X}:{n >> 8 & 255:02X}:{n & 255:02X}" for n in range(args.hosts)]
+    names = [f"device_{n}_eth0" for n in range(args.hosts)]
+    addresses = [IPv4Address(0x0a000000 + n) for n in range(args.hosts)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    config = DNSMasq_DHCP_Config()
+    sections = {}
+    for n in range(args.hosts):
+        prefix = prefixes[n // args.hosts_per_prefix]
+        if (section := sections.get(n // args.hosts_per_prefix)) is None:
+            section = sections[n // args.hosts_per_prefix] = DNSMasq_DHCP_Section(prefix)
+            config.append_to_dhcp_config_sections(section)
+        section.append_dhcp_host(DNSMasq_DHCP_Host(prefix, section.get_info(), macs[n], names[n], addresses[n], "90m"))
+    build = time.perf_counter() - start
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    rendered = str(config)
+    render = time.perf_counter() - start
+
+    print(f"hosts: {args.hosts} bytes/host: {allocated / args.hosts:.0f} "
+          f"build: {build:.3f}s render: {render:.3f}s output: {len(rendered) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+"""Requests, bytes and time of loading all endpoints with the REST loader
+and the GraphQL loader, against the fixture server.
+
+    python3 -m benchmarks.bench_loaders --devices 30000 --latency 20
+    python3 -m benchmarks.bench_loaders --snapshot netbox.snapshot.json.gz
+"""
+
+import io
+import time
+import argparse
+import contextlib
+
+from benchmarks.fixture_server import Fixture_Server, load_dataset, make_ctx
+from netboxers.netboxers_queries import load_endpoints, get_http_stats
+
+
+def main():
+    parser = argparse.ArgumentParser("bench_loaders")
+    parser.add_argument("--snapshot", help="Recorded dataset: a snapshot file", default=None, type=str)
+    parser.add_argument("--devices", help="Size of the synthetic dataset", default=30000, type=int)
+    parser.add_argument("--latency", help="Server latency per request in ms", default=20, type=float)
+    parser.add_argument("--max-page-size", help="MAX_PAGE_SIZE of the server", default=1000, type=int)
+    parser.add_argument("--concurrency", help="Pages fetched in parallel", default=4, type=int)
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.snapshot, args.devices)
+
+    with Fixture_Server(dataset, args.latency / 1000, args.max_page_size) as server:
+        print(f"{'loader':>8} {'requests':>9} {'KiB':>10} {'seconds':>8} {'rows':>9}")
+        for loader in ["rest", "graphql"]:
+            ctx = make_ctx(server.get_base_url(), args.concurrency)
+            ctx['generic_page_size'] = 'auto'
+            ctx['generic_loader'] = loader
+
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                endpoints = load_endpoints(ctx)
+            elapsed = time.perf_counter() - start
+
+            stats = get_http_stats(ctx)
+            rows = sum(len(results or []) for results in endpoints.values())
+            print(f"{loader:>8} {stats.get_request_count():>9} {stats.get_bytes() / 1024:>10.1f} {elapsed:>8.2f} {rows:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+"""Requests/sec and rows/sec of netbox_query_list() per page size, against
+the fixture server.
+
+    python3 -m benchmarks.bench_page_size --devices 30000 --latency 20
+    python3 -m benchmarks.bench_page_size --snapshot netbox.snapshot.json.gz
+"""
+
+import time
+import argparse
+
+from benchmarks.fixture_server import Fixture_Server, load_dataset, make_ctx
+from netboxers.netboxers_queries import netbox_query_list, get_page_size, get_http_stats
+
+
+def main():
+    parser = argparse.ArgumentParser("bench_page_size")
+    parser.add_argument("--snapshot", help="Recorded dataset: a snapshot file", default=None, type=str)
+    parser.add_argument("--devices", help="Size of the synthetic dataset", default=30000, type=int)
+    parser.add_argument("--latency", help="Server latency per request in ms", default=20, type=float)
+    parser.add_argument("--max-page-size", help="MAX_PAGE_SIZE of the server", default=1000, type=int)
+    parser.add_argument("--concurrency", help="Pages fetched in parallel", default=1, type=int)
+    parser.add_argument("--endpoint", default="ipam/ip-addresses/", type=str)
+    parser.add_argument("--page-sizes", default="50,100,250,500,1000", type=str)
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.snapshot, args.devices)
+
+    with Fixture_Server(dataset, args.latency / 1000, args.max_page_size) as server:
+        ctx = make_ctx(server.get_base_url(), args.concurrency)
+        ctx['generic_page_size'] = 'auto'
+        print(f"auto page size: {get_page_size(ctx)}")
+
+        print(f"{'page size':>10} {'requests':>9} {'seconds':>8} {'req/s':>8} {'rows/s':>10}")
+        for page_size in [int(p) for p in args.page_sizes.split(",")]:
+            ctx = make_ctx(server.get_base_url(), args.concurrency)
+
+            start = time.perf_counter()
+            rows = netbox_query_list(ctx, args.endpoint, limit=page_size) or []
+            elapsed = time.perf_counter() - start
+
+            requests = get_http_stats(ctx).get_request_count()
+            print(f"{page_size:>10} {requests:>9} {elapsed:>8.2f} {requests / elapsed:>8.1f} {len(rows) / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""Build time of the prefix containment index on a synthetic dataset, and
+of its prefix x address join alone, with NumPy when it is installed and
+with the pure Python fallback.
+
+    python3 -m benchmarks.bench_prefix_index --prefixes 4096 --addresses 200000
+"""
+
+import time
+import argparse
+from ipaddress import IPv4Address, IPv6Address
+
+import netboxers.netboxers_prefix_index as netboxers_prefix_index
+from netboxers.netboxers_prefix_index import Netbox_Prefix_Index
+from netboxers.netboxers_records import Netbox_Records
+
+
+def make_dataset(prefix_count: int, address_count: int) -> Netbox_Records:
+    # A /24 per prefix below a /16 container per 256 of them, plus an IPv6 /64 per
+    # 16 prefixes. The addresses are spread over all of them, a tenth IPv6.
+    prefixes = []
+    for n in range(0, prefix_count, 256):
+        prefixes.append(f"10.{n // 256}.0.0/16")
+    for n in range(prefix_count):
+        prefixes.append(f"10.{n // 256}.{n % 256}.0/24")
+    for n in range(prefix_count // 16):
+        prefixes.append(f"2001:db8:0:{n:x}::/64")
+
+    ip_addresses = []
+    for n in range(address_count):
+        if n % 10:
+            address = IPv4Address(0x0a000000 + (n % prefix_count) * 256 + n // prefix_count % 254 + 1)
+            ip_addresses.append(f"{address}/24")
+        else:
+            address = IPv6Address((0x20010db8 << 96) + (n % max(1, prefix_count // 16) << 64) + n)
+            ip_addresses.append(f"{address}/64")
+
+    active = {'value': 'active'}
+    return Netbox_Records({
+        "ipam/prefixes/": [{'id': n, 'prefix': prefix, 'status': active} for n, prefix in enumerate(prefixes)],
+        "ipam/ip-addresses/": [{'id': n, 'address': address, 'status': active} for n, address in enumerate(ip_addresses)],
+        "ipam/ip-ranges/": [{'id': n,
+                             'start_address': f"10.{n // 256}.{n % 256}.200/24",
+                             'end_address': f"10.{n // 256}.{n % 256}.250/24",
+                             'status': active,
+                             'tags': [{'name': 'net_dhcp_range'}]} for n in range(prefix_count)],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser("bench_prefix_index")
+    parser.add_argument("--prefixes", help="Number of /24 prefixes", default=4096, type=int)
+    parser.add_argument("--addresses", help="Number of IP addresses", default=200000, type=int)
+    args = parser.parse_args()
+
+    records = make_dataset(args.prefixes, args.addresses)
+
+    runs = {"numpy": getattr(netboxers_prefix_index, 'numpy', None), "python": None}
+    for label, numpy in runs.items():
+        if label == "numpy" and numpy is None:
+            print("numpy: not installed")
+            continue
+
+        netboxers_prefix_index.numpy = numpy
+        start = time.perf_counter()
+        index = Netbox_Prefix_Index(records.prefixes, records.ip_addresses, records.ip_ranges)
+        elapsed = time.perf_counter() - start
+
+        # The prefix x address join alone, repeated on the parsed and sorted addresses
+        start = time.perf_counter()
+        for version in (4, 6):
+            index.fill_buckets(version, [bucket for bucket in index.buckets.values() if bucket.prefix.version == version])
+        join = time.perf_counter() - start
+
+        start = time.perf_counter()
+        placed = sum(len(bucket.get_ip_addresses()) for bucket in index.buckets.values())
+        load = time.perf_counter() - start
+
+        print(f"{label}: prefixes: {len(records.prefixes)} addresses: {len(records.ip_addresses)} placed: {placed} "
+              f"build: {elapsed:.3f}s join: {join * 1000:.1f}ms buckets filled: {load:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
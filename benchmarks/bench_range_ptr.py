@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+"""Time, peak memory and output size of the PTR records of one IP range:
+expanded into a record per address up front, streamed per address while
+writing, and as $GENERATE directives.
+
+    python3 -m benchmarks.bench_range_ptr --start 10.0.0.0 --end 10.0.255.255
+"""
+
+import time
+import argparse
+import tracemalloc
+from ipaddress import ip_address
+
+from netboxers.netboxers_helpers import write_lines
+from powerdnsrec.reverse_zones import split_range
+from powerdnsrec.dnsprocessing import create_rr_ptr_for_reserved_address, iter_range_ptr_lines
+
+
+class Counting_Sink:
+    # Stands in for the zonefile, only counts what is written
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        self.size += len(text)
+
+
+def measure(lines) -> tuple[float, float, int]:
+    # Seconds, peak MiB and bytes written
+    sink = Counting_Sink()
+    tracemalloc.start()
+    start = time.perf_counter()
+    write_lines(sink, lines())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, sink.size
+
+
+def main():
+    parser = argparse.ArgumentParser("bench_range_ptr")
+    parser.add_argument("--start", help="First address of the range", default="10.0.0.0", type=str)
+    parser.add_argument("--end", help="Last address of the range", default="10.0.255.255", type=str)
+    args = parser.parse_args()
+
+    start, end = ip_address(args.start), ip_address(args.end)
+
+    def expanded():
+        # Every address of the range as a record up front, as the range PTR records were made before
+        records = [create_rr_ptr_for_reserved_address(ip_address(ip_int), "range_ip")
+                   for ip_int in range(int(start), int(end) + 1)]
+        return (str(rr) for rr in records)
+
+    def pieces(generate: bool):
+        for piece_start, piece_end in split_range(start.version, int(start), int(end)):
+            yield from iter_range_ptr_lines(start.version, piece_start, piece_end, "range_ip", generate)
+
+    runs = {
+        "expanded":  expanded,
+        "streamed":  lambda: pieces(False),
+        "$GENERATE": lambda: pieces(True),
+    }
+
+    print(f"range: {start}-{end} addresses: {int(end) - int(start) + 1}")
+    print(f"{'mode':>10} {'seconds':>8} {'peak MiB':>9} {'KiB':>8}")
+    for label, lines in runs.items():
+        elapsed, peak, size = measure(lines)
+        print(f"{label:>10} {elapsed:>8.3f} {peak:>9.1f} {size / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+"""NetBox-like REST fixture server used by the benchmarks.
+
+Serves a recorded dataset, a snapshot file as written with --snapshot-file,
+or a synthetic one. It implements the parts of the NetBox API the tools
+rely on: limit/offset pagination clamped to MAX_PAGE_SIZE, 'fields=' and a
+configurable latency per request. POSTs to /graphql/ answer the batched
+list queries of the GraphQL loader.
+"""
+
+import re
+import json
+import time
+import threading
+from ipaddress import ip_interface
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+
+from netboxers.netboxers_snapshot import read_snapshot
+from netboxers.netboxers_graphql import GRAPHQL_ENDPOINTS, GRAPHQL_OBJECT_TYPES
+
+
+# An aliased list query as written by get_batch_query() of the GraphQL loader
+GRAPHQL_LIST_QUERY = re.compile(r"(\w+): (\w+)\(pagination: \{offset: (\d+), limit: (\d+)\}\)")
+
+
+def synthetic_dataset(devices: int) -> dict[str, list]:
+    """Devices with two interfaces and an IP address each, spread over /24 prefixes."""
+    def status(value): return {'value': value, 'label': value.title()}
+    def tag(name): return {'id': 1, 'name': name, 'slug': name}
+    last_updated = "2024-01-01T00:00:00.000000Z"
+
+    data: dict[str, list] = {
+        "dcim/devices/": [], "virtualization/virtual-machines/": [], "virtualization/interfaces/": [],
+        "dcim/interfaces/": [], "ipam/prefixes/": [], "ipam/ip-addresses/": [], "ipam/ip-ranges/": [],
+    }
+
+    subnets = max(1, (devices * 2) // 200 + 1)
+    for n in range(subnets):
+        data["ipam/prefixes/"].append({
+            'id': n + 1, 'prefix': f"10.{n // 256}.{n % 256}.0/24", 'status': status('active'),
+            'vrf': {'id': 1, 'name': 'vrf_lan'}, 'scope': {'id': 1, 'name': 'Site'},
+            'vlan': {'id': n + 1, 'vid': n % 4094 + 1, 'display': f"VLAN {n}"}, 'role': {'id': 1, 'name': 'Lan'},
+            'is_pool': False, 'tags': [tag('dnsmasq_generator')], 'last_updated': last_updated})
+        data["ipam/ip-ranges/"].append({
+            'id': n + 1, 'start_address': f"10.{n // 256}.{n % 256}.210/24",
+            'end_address': f"10.{n // 256}.{n % 256}.250/24", 'status': status('active'),
+            'tags': [tag('net_dhcp_range')], 'last_updated': last_updated})
+
+    for d in range(devices):
+        device = {'id': d + 1, 'name': f"device-{d}", 'status': status('active'), 'primary_ip': None,
+                  'last_updated': last_updated}
+        data["dcim/devices/"].append(device)
+
+        for i in range(2):
+            n = d * 2 + i
+            interface = {'id': n + 1, 'name': f"eth{i}", 'device': {'id': d + 1, 'name': device['name']},
+                         'mac_address': f"02:00:{n >> 24 & 255:02X}:{n >> 16 & 255:02X}:{n >> 8 & 255:02X}:{n & 255:02X}",
+                         'last_updated': last_updated}
+            data["dcim/interfaces/"].append(interface)
+
+            subnet = n // 200
+            address = f"10.{subnet // 256}.{subnet % 256}.{n % 200 + 2}/24"
+            data["ipam/ip-addresses/"].append({
+                'id': n + 1, 'address': address, 'status': status('active'), 'family': {'value': 4},
+                'dns_name': "", 'assigned_object_type': 'dcim.interface',
+                'assigned_object': {'id': n + 1, 'name': interface['name'], 'device': interface['device']},
+                'tags': [], 'last_updated': last_updated})
+            if i == 0:
+                device['primary_ip'] = {'id': n + 1, 'address': address}
+
+    return data
+
+
+def load_dataset(snapshot_file: str | None, devices: int) -> dict[str, list]:
+    if snapshot_file:
+        if not (snapshot := read_snapshot(snapshot_file)):
+            raise ValueError(f"No usable snapshot found at \'{snapshot_file}\'")
+        return {endpoint: results or [] for endpoint, results in snapshot['endpoints'].items()}
+
+    return synthetic_dataset(devices)
+
+
+def to_graphql_object(obj):
+    """The GraphQL form of a REST object, the inverse of to_rest_object() of
+    the GraphQL loader."""
+    if isinstance(obj, list):
+        return [to_graphql_object(v) for v in obj]
+    if not isinstance(obj, dict):
+        return obj
+
+    obj = {k: str(v) if k == 'id' else to_graphql_object(v) for k, v in obj.items()}
+
+    if isinstance(obj.get('status'), dict):
+        obj['status'] = "STATUS_" + obj['status']['value'].upper()
+
+    if 'primary_ip' in obj:
+        primary_ip = obj.pop('primary_ip')
+        version = ip_interface(primary_ip['address']).version if primary_ip else None
+        obj['primary_ip4'] = primary_ip if version == 4 else None
+        obj['primary_ip6'] = primary_ip if version == 6 else None
+
+    if 'mac_address' in obj:
+        mac_address = obj.pop('mac_address')
+        obj['primary_mac_address'] = {'mac_address': mac_address} if mac_address else None
+
+    if 'assigned_object_type' in obj:
+        typenames = {object_type: typename for typename, object_type in GRAPHQL_OBJECT_TYPES.items()}
+        typename = typenames.get(obj.pop('assigned_object_type'))
+        if obj.get('assigned_object'):
+            obj['assigned_object'] = {'__typename': typename, **obj['assigned_object']}
+
+    obj.pop('family', None)
+    if obj.get('scope'):
+        obj['scope'] = {'__typename': "SiteType", **obj['scope']}
+
+    return obj
+
+
+class Fixture_Server:
+    def __init__(self, dataset: dict[str, list], latency: float = 0.0, max_page_size: int = 1000):
+        self.dataset = dataset
+        self.latency = latency
+        self.max_page_size = max_page_size
+        self.requests = 0
+        self.lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.make_handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def get_base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def reset_requests(self) -> None:
+        with self.lock:
+            self.requests = 0
+
+    def get_page(self, endpoint: str, query: dict[str, str], path: str) -> dict:
+        results = self.dataset[endpoint]
+
+        limit = int(query.get('limit', 50))
+        if limit == 0 or limit > self.max_page_size:
+            limit = self.max_page_size
+        offset = int(query.get('offset', 0))
+
+        page = results[offset:offset + limit]
+        if fields := query.get('fields'):
+            keep = fields.split(",")
+            page = [{k: v for k, v in obj.items() if k in keep} for obj in page]
+
+        def link(link_offset: int) -> str:
+            return f"{self.get_base_url()}{path}?{urlencode({**query, 'limit': limit, 'offset': link_offset})}"
+
+        return {
+            'count': len(results),
+            'next': link(offset + limit) if offset + limit < len(results) else None,
+            'previous': link(max(0, offset - limit)) if offset > 0 else None,
+            'results': page,
+        }
+
+    def get_graphql(self, query: str) -> dict:
+        endpoints = {list_query: endpoint for endpoint, (list_query, _) in GRAPHQL_ENDPOINTS.items()}
+
+        data = {}
+        for alias, list_query, offset, limit in GRAPHQL_LIST_QUERY.findall(query):
+            results = self.dataset[endpoints[list_query]][int(offset):int(offset) + int(limit)]
+            data[alias] = [to_graphql_object(obj) for obj in results]
+
+        return {'data': data}
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                url = urlparse(self.path)
+                endpoint = url.path[len("/api/"):]
+                if not url.path.startswith("/api/") or endpoint not in server.dataset:
+                    self.send_error(404)
+                    return
+
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                self.send_json(server.get_page(endpoint, query, url.path))
+
+            def do_POST(self):
+                with server.lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if urlparse(self.path).path != "/graphql/":
+                    self.send_error(404)
+                    return
+
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                self.send_json(server.get_graphql(body['query']))
+
+            def send_json(self, obj: dict):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def make_ctx(base_url: str, concurrency: int = 1) -> dict:
+    # Minimal context for the query functions, as set up by the configuration
+    return {
+        'generic_netbox_base_url': base_url,
+        'generic_authkey': "benchmark",
+        'generic_verbose': False,
+        'generic_concurrency': concurrency,
+        'generic_field_projection': True,
+        'generic_page_size': None,
+    }
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import hashlib
+import tempfile
+
+
+# Bump when the rendering of a section changes, older cache files are ignored
+SECTION_CACHE_VERSION = 2
+
+
+class DNSMasq_DHCP_Section_Cache:
+    """Rendered DHCP sections per prefix. A section of a prefix known not to
+    have changed is reused as is. Lives in memory for the daemon mode, and
+    optionally in a file between runs.
+
+    In the file every section is kept with the content hash of the inputs it
+    was rendered from, and the cache with the snapshot of the NetBox data and
+    the hash of the settings it was rendered with. A run synced from that
+    snapshot knows which prefixes changed, any other run reuses a section
+    whose inputs hash the same.
+    """
+
+    def __init__(self):
+        self.sections: dict[str, tuple[str | None, str]] = {}
+        self.snapshot: float | None = None
+        self.settings: str | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"DNSMasq_DHCP_Section_Cache: sections: {len(self.sections)} hits: {self.hits} misses: {self.misses}"
+
+    @staticmethod
+    def make_digest(inputs: list) -> str:
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get_section(self, prefix: str, digest: str) -> str | None:
+        if (cached := self.sections.get(prefix)) and cached[0] == digest:
+            self.hits += 1
+            return cached[1]
+        return None
+
+    def get_rendered(self, prefix: str) -> str | None:
+        # Reused without comparing the inputs, for a prefix known not to have changed
+        if cached := self.sections.get(prefix):
+            self.hits += 1
+            return cached[1]
+        return None
+
+    def set_section(self, prefix: str, digest: str | None, rendered: str) -> None:
+        self.misses += 1
+        self.sections[prefix] = (digest, rendered)
+
+    def get_snapshot(self) -> float | None:
+        return self.snapshot
+
+    def get_settings(self) -> str | None:
+        return self.settings
+
+    def set_state(self, snapshot: float | None, settings: str) -> None:
+        # The snapshot of the NetBox data and the hash of the settings the sections are rendered with
+        self.snapshot = snapshot
+        self.settings = settings
+
+    def prune(self, prefixes: set[str]) -> None:
+        # Forget the sections of prefixes no longer in the configuration
+        self.sections = {prefix: cached for prefix, cached in self.sections.items() if prefix in prefixes}
+
+    def reset_counters(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, filepath: str) -> None:
+        if not os.path.isfile(filepath):
+            return
+
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring unreadable section cache \'{filepath}\': {e}")
+            return
+
+        if data.get('version') != SECTION_CACHE_VERSION:
+            return
+
+        self.sections = {prefix: (digest, rendered) for prefix, (digest, rendered) in data['sections'].items()}
+        self.snapshot = data.get('snapshot')
+        self.settings = data.get('settings')
+
+    def write(self, filepath: str) -> None:
+        data = {'version': SECTION_CACHE_VERSION, 'snapshot': self.snapshot, 'settings': self.settings,
+                'sections': self.sections}
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filepath)),
+                                        prefix=os.path.basename(filepath) + ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
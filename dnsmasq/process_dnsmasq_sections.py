@@ -5,7 +5,8 @@ from netboxers.models.netbox import Netbox_Prefix
 from netboxers.models.dnsmasq_dhcp import   DNSMasq_DHCP_Section, \
                                             DNSMasq_DHCP_Option, \
                                             DNSMasq_DHCP_Range, \
-                                            DNSMasq_DHCP_Host
+                                            DNSMasq_DHCP_Host, \
+                                            DNSMasq_DHCP_Prefix_Info
 from netboxers.netboxers_queries import get_net_default_gateway_from_prefix, \
                                         get_dns_from_net_default_gateway_from_prefix, \
                                         get_range_from_prefix, \
@@ -13,9 +14,52 @@ from netboxers.netboxers_queries import get_net_default_gateway_from_prefix, \
 from netboxers.netboxers_helpers import make_host_iface_name
 
 
+# Settings a DHCP section is rendered with
+SECTION_SETTINGS = [
+    'dnsmasq_dhcp_default_gateway_per_prefix_identified_by_tag',
+    'dnsmasq_dhcp_selected_range_in_prefix_by_tag',
+    'dnsmasq_dhcp_override_dns_server',
+    'dnsmasq_dhcp_default_ntp_server',
+    'dnsmasq_dhcp_domain_search',
+    'dnsmasq_dhcp_default_lease_time_range',
+    'dnsmasq_dhcp_default_lease_time_host',
+]
+
+
+def get_dnsmasq_dhcp_section_inputs(ctx: dict, prefix_obj: Netbox_Prefix) -> list:
+    """Everything a DHCP section is rendered from: the prefix, its gateway,
+    DNS server, range and hosts, and the settings used. A section rendered
+    from equal inputs renders the same.
+
+    Args:
+        ctx (dict): Context
+        prefix_obj (Netbox_Prefix): Prefix object
+
+    Returns:
+        list: Inputs of the section, to hash
+    """
+    prefix = prefix_obj.get_prefix()
+    hosts = get_hosts_from_prefix(ctx, prefix) or []
+
+    return [
+        str(prefix),
+        prefix_obj.get_scope() is not None,
+        prefix_obj.get_site(),
+        prefix_obj.get_role(),
+        prefix_obj.get_vlan(),
+        prefix_obj.get_vrf(),
+        str(get_net_default_gateway_from_prefix(ctx, prefix)),
+        str(get_dns_from_net_default_gateway_from_prefix(ctx, prefix)),
+        [str(addr) for addr in get_range_from_prefix(ctx, prefix) or ()],
+        [(mac_addr, dev_name, if_name, str(ip)) for mac_addr, dev_name, if_name, ip, _ in hosts],
+        [ctx.get(setting) for setting in SECTION_SETTINGS],
+    ]
+
+
 # Get default gateway for the prefix
 def netbox_process_prefix_into_dnsmasq_dhcp_section_gateway(ctx: dict, 
-                                                            prefix_obj: Netbox_Prefix) -> DNSMasq_DHCP_Option | None:
+                                                            prefix_obj: Netbox_Prefix,
+                                                            info: DNSMasq_DHCP_Prefix_Info) -> DNSMasq_DHCP_Option | None:
 
     gateway = get_net_default_gateway_from_prefix(ctx, prefix_obj.get_prefix())
     if gateway is None:
@@ -26,55 +70,59 @@ def netbox_process_prefix_into_dnsmasq_dhcp_section_gateway(ctx: dict,
     ip = ip_interface(gateway)
 
     # Record the default gateway
-    return DNSMasq_DHCP_Option(prefix_obj, "3", str(ip.ip))
+    return DNSMasq_DHCP_Option(prefix_obj, info, "3", str(ip.ip))
     
 
 # Get DNS server configuration for the prefix
 def netbox_process_prefix_into_dnsmasq_dhcp_section_dns(ctx: dict,
-                                                        prefix_obj: Netbox_Prefix) -> DNSMasq_DHCP_Option | None:
+                                                        prefix_obj: Netbox_Prefix,
+                                                        info: DNSMasq_DHCP_Prefix_Info) -> DNSMasq_DHCP_Option | None:
     # Override from config or args, or fetch the config from netbox
     if default_dnsname_ip_addr := ctx.get('dnsmasq_dhcp_override_dns_server'):
         # Record the DNS server
-        return DNSMasq_DHCP_Option(prefix_obj, "6", default_dnsname_ip_addr)
+        return DNSMasq_DHCP_Option(prefix_obj, info, "6", default_dnsname_ip_addr)
 
     dns = get_dns_from_net_default_gateway_from_prefix(ctx, prefix_obj.get_prefix())
     if not dns:
         print(f"Warning: No dns name set with the ip address with the tag \'{ctx['dnsmasq_dhcp_default_gateway_per_prefix_identified_by_tag']}\' configured for prefix {prefix_obj.get_prefix()}")
         return None
 
-    return DNSMasq_DHCP_Option(prefix_obj, "6", str(dns.ip))
+    return DNSMasq_DHCP_Option(prefix_obj, info, "6", str(dns.ip))
 
 
 # Get ntp from the configuration file for the prefix
 def netbox_process_prefix_into_dnsmasq_dhcp_section_ntp(ctx: dict,
-                                                        prefix_obj: Netbox_Prefix) -> DNSMasq_DHCP_Option | None:
+                                                        prefix_obj: Netbox_Prefix,
+                                                        info: DNSMasq_DHCP_Prefix_Info) -> DNSMasq_DHCP_Option | None:
     # Override from config or args, or fetch the config from netbox
     if default_ntp_ip_addr := ctx.get('dnsmasq_dhcp_default_ntp_server'):
         # Record the DNS server
-        return DNSMasq_DHCP_Option(prefix_obj, "42", default_ntp_ip_addr)
+        return DNSMasq_DHCP_Option(prefix_obj, info, "42", default_ntp_ip_addr)
 
     return None
 
 
 # Get Domain search from the configuration file, which is a generich setting at the moment.
 def netbox_process_prefix_into_dnsmasq_dhcp_section_domain_search(ctx: dict,
-                                                                  prefix_obj: Netbox_Prefix) -> DNSMasq_DHCP_Option| None:
+                                                                  prefix_obj: Netbox_Prefix,
+                                                                  info: DNSMasq_DHCP_Prefix_Info) -> DNSMasq_DHCP_Option| None:
 
     # Check if there is a specific domain search in the config file, which is a generic setting
     if domain_search := ctx.get('dnsmasq_dhcp_domain_search'):
         # Record the domain search domain
-        return DNSMasq_DHCP_Option(prefix_obj, "119", domain_search)
+        return DNSMasq_DHCP_Option(prefix_obj, info, "119", domain_search)
 
     return None
 
 
 def netbox_process_prefix_into_dnsmasq_dhcp_section_range(ctx: dict,
-                                                          prefix_obj: Netbox_Prefix) -> DNSMasq_DHCP_Range | None:
+                                                          prefix_obj: Netbox_Prefix,
+                                                          info: DNSMasq_DHCP_Prefix_Info) -> DNSMasq_DHCP_Range | None:
     netmask = ip_network(prefix_obj.get_prefix()).netmask
                                                           
     if tup := get_range_from_prefix(ctx, prefix_obj.get_prefix()):
         begin_addr, end_addr = tup
-        return DNSMasq_DHCP_Range(prefix_obj, begin_addr, end_addr, netmask,
+        return DNSMasq_DHCP_Range(prefix_obj, info, begin_addr, end_addr, netmask,
                                   ctx['dnsmasq_dhcp_default_lease_time_range'])
 
     return None
@@ -83,7 +131,8 @@ def netbox_process_prefix_into_dnsmasq_dhcp_section_range(ctx: dict,
 # Query all IP addresses in the VRF. From each, fetch the associated interface and its MAC
 # Extract all IP addresses in the VRF
 def netbox_process_prefix_into_dnsmasq_dhcp_section_hosts(ctx: dict, 
-                                                          prefix_obj: Netbox_Prefix) -> list[DNSMasq_DHCP_Host] | None:
+                                                          prefix_obj: Netbox_Prefix,
+                                                          info: DNSMasq_DHCP_Prefix_Info) -> list[DNSMasq_DHCP_Host] | None:
     host_tuples = get_hosts_from_prefix(ctx, prefix_obj.get_prefix())
     if not host_tuples:
         return None
@@ -97,7 +146,8 @@ def netbox_process_prefix_into_dnsmasq_dhcp_section_hosts(ctx: dict,
             continue
 
         host_iface = make_host_iface_name(dev_name, if_name)
-        dhcp_hosts.append(DNSMasq_DHCP_Host(prefix_obj, 
+        dhcp_hosts.append(DNSMasq_DHCP_Host(prefix_obj,
+                                            info,
                                             mac_addr,
                                             host_iface,
                                             ip,
@@ -121,30 +171,31 @@ def netbox_process_prefix_into_dnsmasq_dhcp_section(ctx: dict,
 
     # Create Section from Prefix input
     dnsmasq_dhcp_section = DNSMasq_DHCP_Section(prefix_obj)
+    info = dnsmasq_dhcp_section.get_info()
 
     # Get default gateway gateway
-    if dhcp_option := netbox_process_prefix_into_dnsmasq_dhcp_section_gateway(ctx, prefix_obj):
+    if dhcp_option := netbox_process_prefix_into_dnsmasq_dhcp_section_gateway(ctx, prefix_obj, info):
         dnsmasq_dhcp_section.append_dhcp_option(dhcp_option)
 
     # Get DNS server config
-    if dhcp_option := netbox_process_prefix_into_dnsmasq_dhcp_section_dns(ctx, prefix_obj):
+    if dhcp_option := netbox_process_prefix_into_dnsmasq_dhcp_section_dns(ctx, prefix_obj, info):
         dnsmasq_dhcp_section.append_dhcp_option(dhcp_option)
 
     # Add NTP server config
-    if dhcp_option := netbox_process_prefix_into_dnsmasq_dhcp_section_ntp(ctx, prefix_obj):
+    if dhcp_option := netbox_process_prefix_into_dnsmasq_dhcp_section_ntp(ctx, prefix_obj, info):
         dnsmasq_dhcp_section.append_dhcp_option(dhcp_option)
 
     # Add Domain search config
-    if dhcp_option := netbox_process_prefix_into_dnsmasq_dhcp_section_domain_search(ctx, prefix_obj):
+    if dhcp_option := netbox_process_prefix_into_dnsmasq_dhcp_section_domain_search(ctx, prefix_obj, info):
         dnsmasq_dhcp_section.append_dhcp_option(dhcp_option)
 
     # Add IP Range of the DHCP pool
-    if dhcp_range := netbox_process_prefix_into_dnsmasq_dhcp_section_range(ctx, prefix_obj):
+    if dhcp_range := netbox_process_prefix_into_dnsmasq_dhcp_section_range(ctx, prefix_obj, info):
         dnsmasq_dhcp_section.append_dhcp_range(dhcp_range)
 
     # Query all IP addresses in the VRF. From each, fetch the associated interface and its MAC
     # Extract all IP addresses in the VRF
-    if dhcp_hosts := netbox_process_prefix_into_dnsmasq_dhcp_section_hosts(ctx, prefix_obj):
+    if dhcp_hosts := netbox_process_prefix_into_dnsmasq_dhcp_section_hosts(ctx, prefix_obj, info):
         for dh in dhcp_hosts:
             dnsmasq_dhcp_section.append_dhcp_host(dh)
 
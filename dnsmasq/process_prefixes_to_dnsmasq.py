@@ -1,10 +1,25 @@
 #!/usr/bin/env python3
 
-from dnsmasq.process_dnsmasq_sections import netbox_process_prefix_into_dnsmasq_dhcp_section
-from netboxers.netboxers_helpers import write_data_to_file
+from dnsmasq.process_dnsmasq_sections import netbox_process_prefix_into_dnsmasq_dhcp_section, \
+                                            get_dnsmasq_dhcp_section_inputs, \
+                                            SECTION_SETTINGS
+from dnsmasq.dnsmasq_section_cache import DNSMasq_DHCP_Section_Cache
+from netboxers.netboxers_helpers import write_data_to_file, run_post_write_hook
 from netboxers.netboxers_queries import fetch_active_prefixes
 from netboxers.models.netbox import Netbox_Prefix
-from netboxers.models.dnsmasq_dhcp import DNSMasq_DHCP_Config, DNSMasq_DHCP_Generic_Switchable
+from netboxers.models.dnsmasq_dhcp import DNSMasq_DHCP_Config, \
+                                          DNSMasq_DHCP_Generic_Switchable, \
+                                          DNSMasq_DHCP_Rendered_Section
+
+
+def get_dnsmasq_dhcp_section_cache(ctx: dict) -> DNSMasq_DHCP_Section_Cache:
+    # Kept in the context between regenerations of the daemon mode
+    if not 'dnsmasq_section_cache' in ctx:
+        ctx['dnsmasq_section_cache'] = DNSMasq_DHCP_Section_Cache()
+        if section_cache_file := ctx.get('dnsmasq_dhcp_section_cache_file'):
+            ctx['dnsmasq_section_cache'].read(section_cache_file)
+
+    return ctx['dnsmasq_section_cache']
 
 
 def netbox_process_prefixes_into_dnsmasq_dhcp_config(ctx: dict, dnsmasq_dhcp_config: DNSMasq_DHCP_Config) -> DNSMasq_DHCP_Config:
@@ -17,9 +32,35 @@ def netbox_process_prefixes_into_dnsmasq_dhcp_config(ctx: dict, dnsmasq_dhcp_con
     else:
         ready_to_process_prefixes = active_prefixes
 
+    section_cache = get_dnsmasq_dhcp_section_cache(ctx)
+    section_cache.reset_counters()
+    section_cache_file = ctx.get('dnsmasq_dhcp_section_cache_file')
+
+    # The prefixes holding a change since the last generation, None for all.
+    # Or, for sections read from the file, since the snapshot they were
+    # rendered from, when the data was synced from it.
+    settings = section_cache.make_digest([ctx.get(setting) for setting in SECTION_SETTINGS])
+    changed_prefixes = ctx['cache'].get_changed_prefixes()
+    if changed_prefixes is None and section_cache.get_settings() == settings:
+        changed_prefixes = ctx['cache'].get_synced_prefixes(section_cache.get_snapshot())
    
     # Work on these
     for p in ready_to_process_prefixes:
+        # Reuse the section rendered before when nothing in the prefix changed
+        prefix = str(p.get_prefix())
+        if changed_prefixes is not None and p.get_prefix() not in changed_prefixes and \
+            (rendered := section_cache.get_rendered(prefix)) is not None:
+            dnsmasq_dhcp_config.append_to_dhcp_config_sections(DNSMasq_DHCP_Rendered_Section(prefix, rendered))
+            continue
+
+        # Or, for the file, when its inputs did not change
+        digest = None
+        if section_cache_file:
+            digest = section_cache.make_digest(get_dnsmasq_dhcp_section_inputs(ctx, p))
+            if (rendered := section_cache.get_section(prefix, digest)) is not None:
+                dnsmasq_dhcp_config.append_to_dhcp_config_sections(DNSMasq_DHCP_Rendered_Section(prefix, rendered))
+                continue
+
         # Use a Netbox_Prefix to create a DNSMasq_DHCP_Section
 
         # Process the prefix. Output is a DNSMasq_DHCP_Section object
@@ -29,7 +70,15 @@ def netbox_process_prefixes_into_dnsmasq_dhcp_config(ctx: dict, dnsmasq_dhcp_con
 
         # Record section to config
         dnsmasq_dhcp_config.append_to_dhcp_config_sections(dnsmasq_dhcp_section)
-    
+        section_cache.set_section(prefix, digest, dnsmasq_dhcp_section.get_str())
+
+    section_cache.prune({str(p.get_prefix()) for p in ready_to_process_prefixes})
+    section_cache.set_state(ctx['cache'].get_snapshot(), settings)
+    print(f"Info: DHCP sections: {section_cache.misses} rendered, {section_cache.hits} reused.")
+
+    if section_cache_file:
+        section_cache.write(section_cache_file)
+
     return dnsmasq_dhcp_config
     
 
@@ -97,5 +146,7 @@ def netbox_to_dnsmasq_dhcp_config(ctx: dict):
     # Get prefixes and process each
     dnsmasq_dhcp_config = netbox_process_prefixes_into_dnsmasq_dhcp_config(ctx, dnsmasq_dhcp_config)
 
-    ## Output DNSMasq Config to file
-    write_data_to_file(ctx.get('dnsmasq_dhcp_output_file'), str(dnsmasq_dhcp_config))
\ No newline at end of file
+    ## Output DNSMasq Config to file, signal dnsmasq only on a change
+    if write_data_to_file(ctx.get('dnsmasq_dhcp_output_file'), dnsmasq_dhcp_config.iter_lines()) and \
+        ctx.get('dnsmasq_dhcp_output_file'):
+        run_post_write_hook(ctx.get('dnsmasq_dhcp_post_write_hook'))
@@ -4,8 +4,9 @@ import sys
 
 from dnsmasq.process_prefixes_to_dnsmasq import netbox_to_dnsmasq_dhcp_config
 from netboxers.configuration import argparsing, parse_config, sanity_checks
-from netboxers.netboxers_queries import prefill_cache
-from netboxers.netboxers_helpers import get_ctx
+from netboxers.netboxers_queries import prefill_cache, get_http_stats
+from netboxers.netboxers_helpers import get_ctx, run_post_write_hook
+from netboxers.netboxers_daemon import Netbox_Webhook_Daemon
 from netboxers.models.dnsmasq_dhcp import *
 
 # from powerdnsrec.configuration import argparsing, parse_config, sanity_checks
@@ -15,9 +16,9 @@ from powerdnsrec.dnsprocessing import powerdns_recursor_zonefile, \
                                       powerdns_recursor_zoneing_reverse_lookups
 
 
-### Main
-def main(ctx):
-    ctx = prefill_cache(ctx)
+### Generate the configuration from the loaded NetBox data
+def generate(ctx):
+    prefill_requests = get_http_stats(ctx).get_request_count()
 
     #### DNSMasq DHCP
     print("Netbox to DNSMasq DHCP config")
@@ -25,15 +26,43 @@ def main(ctx):
     
 
     #### PowerDNS Recursor
-    if ctx.get('powerdns_rec_zonefile'):
+    zonefiles_changed = False
+    if ctx.get('powerdns_rec_zonefile') and ctx['cache'].has_changes():
         print("Netbox to DNS Zonefile")
         zo = powerdns_recursor_zonefile(ctx)
         footer = read_zonefile_footer_file(ctx)
-        write_zonefile(ctx, zo, footer)
+        zonefiles_changed |= write_zonefile(ctx, zo, footer)
 
     if ctx.get('powerdns_rec_zonefile_in_addr'):
         print("Netbox to DNS Zonefile for reverse lookups")
-        powerdns_recursor_zoneing_reverse_lookups(ctx)
+        zonefiles_changed |= powerdns_recursor_zoneing_reverse_lookups(ctx)
+
+    # One reload for both zonefiles, only when one changed
+    if zonefiles_changed:
+        run_post_write_hook(ctx.get('powerdns_rec_post_write_hook'))
+
+    # Generated, the next regeneration only needs what changes from here
+    ctx['cache'].reset_changes()
+
+    # Everything should have been answered from the cache
+    if requests_after_prefill := get_http_stats(ctx).get_request_count() - prefill_requests:
+        print(f"Warning: {requests_after_prefill} NetBox requests made after loading the NetBox data.")
+    else:
+        print("Info: No NetBox requests made after loading the NetBox data.")
+
+
+### Main
+def main(ctx):
+    ctx = prefill_cache(ctx)
+    generate(ctx)
+
+    # Keep the data in memory and regenerate on NetBox webhooks
+    if ctx.get('generic_daemon'):
+        daemon = Netbox_Webhook_Daemon(ctx, generate)
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            print("Info: Stopping the daemon.")
 
 
 ### Start up
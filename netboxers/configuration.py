@@ -9,17 +9,109 @@ import ipaddress
 
 
 
+# Setting from the configuration file, else from the command line, else the default.
+def get_setting(ctx: dict, section: str, key: str, default=None):
+    if (value := ctx.get(f"{section}_{key}")) is not None:
+        return value
+
+    if (value := ctx.get(f"args_{key}")) is not None:
+        return value
+
+    return default
+
+
+def parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 ### Sanity checks: on failure, makes no sense to continue
 def sanity_checks(ctx):
     # Defaults
+    ctx['generic_concurrency'] = int(get_setting(ctx, 'generic', 'concurrency', 1))
+    if ctx['generic_concurrency'] < 1:
+        print(f"Error: concurrency must be 1 or higher. Value: {ctx['generic_concurrency']}")
+        return False
+
     if not ctx.get('dnsmasq_dhcp_default_gateway_per_prefix_identified_by_tag'):
         ctx['dnsmasq_dhcp_default_gateway_per_prefix_identified_by_tag'] = 'net_default_gateway'
     
     if not ctx.get('dnsmasq_dhcp_selected_range_in_prefix_by_tag'):
         ctx['dnsmasq_dhcp_selected_range_in_prefix_by_tag'] = 'net_dhcp_range'
 
+    ctx['generic_snapshot_file'] = get_setting(ctx, 'generic', 'snapshot_file')
+    ctx['generic_snapshot_ttl'] = int(get_setting(ctx, 'generic', 'snapshot_ttl', 0))
+    ctx['generic_offline'] = parse_bool(get_setting(ctx, 'generic', 'offline', False))
+    ctx['generic_delta_sync'] = parse_bool(get_setting(ctx, 'generic', 'delta_sync', False))
+    ctx['generic_conditional_requests'] = parse_bool(get_setting(ctx, 'generic', 'conditional_requests', False))
+    ctx['generic_field_projection'] = parse_bool(get_setting(ctx, 'generic', 'field_projection', True))
+    ctx['generic_streaming'] = parse_bool(get_setting(ctx, 'generic', 'streaming', False))
+
+    ctx['generic_http_backend'] = get_setting(ctx, 'generic', 'http_backend', 'requests')
+    ctx['generic_http2'] = parse_bool(get_setting(ctx, 'generic', 'http2', False))
+    ctx['generic_http_pool_size'] = int(get_setting(ctx, 'generic', 'http_pool_size', 20))
+    if ctx['generic_http_backend'] not in ('requests', 'httpx'):
+        print(f"Error: the HTTP backend must be \"requests\" or \"httpx\". Value: {ctx['generic_http_backend']}")
+        return False
+    if ctx['generic_http_backend'] == 'httpx' and ctx['generic_streaming']:
+        print("Warning: streaming is not supported by the httpx HTTP backend, it is ignored.")
+
+    ctx['generic_daemon'] = parse_bool(get_setting(ctx, 'generic', 'daemon', False))
+    ctx['generic_daemon_address'] = get_setting(ctx, 'generic', 'daemon_address', "127.0.0.1")
+    ctx['generic_daemon_port'] = int(get_setting(ctx, 'generic', 'daemon_port', 8471))
+    ctx['generic_daemon_debounce'] = float(get_setting(ctx, 'generic', 'daemon_debounce', 1.0))
+    ctx['generic_webhook_secret'] = get_setting(ctx, 'generic', 'webhook_secret')
+    if ctx['generic_daemon'] and ctx['generic_offline']:
+        print("Error: the daemon mode needs NetBox webhooks, it can not run offline.")
+        return False
+    if ctx['generic_daemon'] and not ctx['generic_webhook_secret']:
+        print("Warning: no webhook_secret configured, the daemon accepts unsigned webhooks.")
+
+    ctx['generic_loader'] = get_setting(ctx, 'generic', 'loader', 'rest')
+    if ctx['generic_loader'] not in ('rest', 'graphql'):
+        print(f"Error: the loader must be \"rest\" or \"graphql\". Value: {ctx['generic_loader']}")
+        return False
+    if ctx['generic_loader'] == 'graphql' and (ctx['generic_streaming'] or ctx['generic_http_backend'] == 'httpx'):
+        print("Warning: streaming and the httpx HTTP backend are not used by the graphql loader.")
+
+    ctx['generic_http_timeout'] = float(get_setting(ctx, 'generic', 'http_timeout', 10))
+    ctx['generic_max_retries'] = int(get_setting(ctx, 'generic', 'max_retries', 5))
+    ctx['generic_rate_limit'] = float(get_setting(ctx, 'generic', 'rate_limit', 0))
+    ctx['generic_request_deadline'] = float(get_setting(ctx, 'generic', 'request_deadline', 120))
+    if ctx['generic_http_timeout'] <= 0 or ctx['generic_request_deadline'] <= 0:
+        print(f"Error: HTTP timeout and request deadline must be positive. Values: {ctx['generic_http_timeout']} and {ctx['generic_request_deadline']}")
+        return False
+    if ctx['generic_max_retries'] < 0 or ctx['generic_rate_limit'] < 0:
+        print(f"Error: max retries and rate limit can not be negative. Values: {ctx['generic_max_retries']} and {ctx['generic_rate_limit']}")
+        return False
+
+    ctx['generic_page_size'] = str(get_setting(ctx, 'generic', 'page_size', 'default')).strip().lower()
+    if ctx['generic_page_size'] == 'default':
+        ctx['generic_page_size'] = None
+    elif ctx['generic_page_size'] != 'auto':
+        if not ctx['generic_page_size'].isdigit() or int(ctx['generic_page_size']) < 1:
+            print(f"Error: page size must be a positive number, \"auto\" or \"default\". Value: {ctx['generic_page_size']}")
+            return False
+        ctx['generic_page_size'] = int(ctx['generic_page_size'])
+
     # Checks
-    if ctx['generic_authkey'] is None:
+    if ctx['generic_offline'] and not ctx['generic_snapshot_file']:
+        print("Offline mode requires a snapshot file. Use command line CLI flags or \"snapshot_file\" in the configuration file\"")
+        return False
+
+    if ctx['generic_delta_sync'] and not ctx['generic_snapshot_file']:
+        print("Delta sync requires a snapshot file. Use command line CLI flags or \"snapshot_file\" in the configuration file\"")
+        return False
+
+    if ctx['generic_delta_sync'] and ctx['generic_loader'] == 'graphql':
+        print("Warning: the graphql loader does not filter on changes, a delta sync loads the changed endpoints in full.")
+
+    if ctx['generic_conditional_requests'] and not ctx['generic_snapshot_file']:
+        print("Conditional requests require a snapshot file. Use command line CLI flags or \"snapshot_file\" in the configuration file\"")
+        return False
+
+    if ctx['generic_authkey'] is None and not ctx['generic_offline']:
         print("No Netbox authentication key provided")
         return False
 
@@ -60,6 +152,12 @@ def sanity_checks(ctx):
         print("No PowerDNS Recursor output file configured. Use command line CLI flags or \"zonefile_in_addr\" in the configuration file\"")
         return False
 
+    ctx['powerdns_rec_range_ptr_generate'] = parse_bool(get_setting(ctx, 'powerdns_rec', 'range_ptr_generate', False))
+    ctx['powerdns_rec_range_ptr_max_expand'] = int(get_setting(ctx, 'powerdns_rec', 'range_ptr_max_expand', 65536))
+    if ctx['powerdns_rec_range_ptr_max_expand'] < 0:
+        print(f"Error: the maximum number of PTR records of an IP range can not be negative. Value: {ctx['powerdns_rec_range_ptr_max_expand']}")
+        return False
+
 
     # Debug output
     if ctx['generic_verbose']:
@@ -98,6 +196,91 @@ def argparsing(ctx):
                         help="Netbox base URL.",
                         default=None,
                         type=str)
+    parser.add_argument("-cc", "--concurrency",
+                        dest='concurrency',
+                        help="Number of pages fetched in parallel from Netbox. Default is 1, fetching serially.",
+                        default=None,
+                        type=int)
+    parser.add_argument("-ps", "--page-size",
+                        dest='page_size',
+                        help="Number of objects per page fetched from Netbox. Use \"auto\" for the maximum page size of Netbox, or \"default\" for its default, which is the default.",
+                        default=None,
+                        type=str)
+    parser.add_argument("-sj", "--streaming",
+                        dest='streaming',
+                        help="Parse the Netbox responses while they arrive, one page at a time, to bound memory use.",
+                        action="store_true",
+                        default=None)
+    parser.add_argument("-hb", "--http-backend",
+                        dest='http_backend',
+                        help="HTTP client used to query Netbox: \"requests\" or the asynchronous \"httpx\". Default is requests.",
+                        default=None,
+                        type=str)
+    parser.add_argument("--http2",
+                        dest='http2',
+                        help="Multiplex the requests over HTTP/2 with the httpx HTTP backend.",
+                        action="store_true",
+                        default=None)
+    parser.add_argument("-ld", "--loader",
+                        dest='loader',
+                        help="How to load the Netbox data: \"rest\" or batched \"graphql\" queries. Default is rest.",
+                        default=None,
+                        type=str)
+    parser.add_argument("--http-timeout",
+                        dest='http_timeout',
+                        help="Seconds to wait for a response of Netbox. Default is 10.",
+                        default=None,
+                        type=float)
+    parser.add_argument("--max-retries",
+                        dest='max_retries',
+                        help="Retries of a request that failed on a connection error, timeout, HTTP 429, 502, 503 or 504. Default is 5.",
+                        default=None,
+                        type=int)
+    parser.add_argument("--rate-limit",
+                        dest='rate_limit',
+                        help="Maximum number of requests per second to Netbox. Default is 0, unlimited.",
+                        default=None,
+                        type=float)
+    parser.add_argument("--request-deadline",
+                        dest='request_deadline',
+                        help="Seconds after which a request is no longer retried. Default is 120.",
+                        default=None,
+                        type=float)
+    parser.add_argument("--daemon",
+                        dest='daemon',
+                        help="Keep running, and regenerate the configuration on Netbox webhooks.",
+                        action="store_true",
+                        default=None)
+    parser.add_argument("--daemon-port",
+                        dest='daemon_port',
+                        help="Port to listen on for Netbox webhooks in daemon mode. Default is 8471.",
+                        default=None,
+                        type=int)
+    parser.add_argument("-sf", "--snapshot-file",
+                        dest='snapshot_file',
+                        help="Snapshot file to store the Netbox data in.",
+                        default=None,
+                        type=str)
+    parser.add_argument("-st", "--snapshot-ttl",
+                        dest='snapshot_ttl',
+                        help="Reuse the snapshot when it is younger than this number of seconds. Default is 0, always reload.",
+                        default=None,
+                        type=int)
+    parser.add_argument("-off", "--offline",
+                        dest='offline',
+                        help="Generate the configuration purely from the snapshot, without contacting Netbox.",
+                        action="store_true",
+                        default=None)
+    parser.add_argument("-ds", "--delta-sync",
+                        dest='delta_sync',
+                        help="Update an expired snapshot with only the objects changed or deleted in Netbox since.",
+                        action="store_true",
+                        default=None)
+    parser.add_argument("-cr", "--conditional-requests",
+                        dest='conditional_requests',
+                        help="Check per endpoint whether Netbox changed since the snapshot, and take unchanged endpoints from the snapshot.",
+                        action="store_true",
+                        default=None)
 
     # DNSMasq DHCP
     parser.add_argument("-ltr", "--dhcp-default-lease-time-range",
@@ -216,6 +399,16 @@ def argparsing(ctx):
                         help="Zonefile footer template.",
                         default=None,
                         type=str)
+    parser.add_argument("--range-ptr-generate",
+                        dest='range_ptr_generate',
+                        help="Write the PTR records of IPv4 ranges as $GENERATE directives instead of a record per address.",
+                        action="store_true",
+                        default=None)
+    parser.add_argument("--range-ptr-max-expand",
+                        dest='range_ptr_max_expand',
+                        help="Skip the PTR records of IP ranges written as a record per address with more addresses than this. Default is 65536.",
+                        default=None,
+                        type=int)
 
 
     args = parser.parse_args()
@@ -224,6 +417,23 @@ def argparsing(ctx):
     ctx['args_verbose']                         = args.verbose
     ctx['args_configfile']                      = args.configfile
     ctx['args_authkey']                         = args.authkey
+    ctx['args_concurrency']                     = args.concurrency
+    ctx['args_page_size']                       = args.page_size
+    ctx['args_streaming']                       = args.streaming
+    ctx['args_http_backend']                    = args.http_backend
+    ctx['args_http2']                           = args.http2
+    ctx['args_loader']                          = args.loader
+    ctx['args_http_timeout']                    = args.http_timeout
+    ctx['args_max_retries']                     = args.max_retries
+    ctx['args_rate_limit']                      = args.rate_limit
+    ctx['args_request_deadline']                = args.request_deadline
+    ctx['args_daemon']                          = args.daemon
+    ctx['args_daemon_port']                     = args.daemon_port
+    ctx['args_snapshot_file']                   = args.snapshot_file
+    ctx['args_snapshot_ttl']                    = args.snapshot_ttl
+    ctx['args_offline']                         = args.offline
+    ctx['args_delta_sync']                      = args.delta_sync
+    ctx['args_conditional_requests']            = args.conditional_requests
     
     # DNSMasq DHCP
     ctx['args_output_file']                     = args.dnsmasq_dhcp_output_file
@@ -250,6 +460,8 @@ def argparsing(ctx):
     ctx['args_zonefile_in_addr']                = args.powerdns_rec_zonefile_in_addr
     ctx['args_zonefile_relativize']             = args.powerdns_rec_zonefile_relativize
     ctx['args_zonefile_footer']                 = args.powerdns_rec_zonefile_footer
+    ctx['args_range_ptr_generate']              = args.range_ptr_generate
+    ctx['args_range_ptr_max_expand']            = args.range_ptr_max_expand
 
 
     return ctx
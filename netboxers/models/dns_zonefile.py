@@ -1,5 +1,20 @@
+from typing import Iterable, Iterator
+
+
+# Characters replaced in names by normalize_name(), built once
+NAME_TRANSLATION = str.maketrans({" ": "_", "-": "_", "\"": "", "'": ""})
+
 
 class DNS_Resource_Record:
+    """A DNS resource record. Slotted, a zone can hold hundreds of thousands.
+
+    The keyword constructor handles all record types. The make_a(),
+    make_cname() and make_ptr() constructors skip its dispatch for the
+    records created in bulk, with the same result.
+    """
+
+    __slots__ = ('rr_name', 'rr_type', 'rr_class', 'rr_ttl', 'rr_data')
+
     def __init__(self, **kwargs):
         self.rr_name = None
         self.rr_type = None
@@ -7,13 +22,9 @@ class DNS_Resource_Record:
         self.rr_ttl = 86400
         self.rr_data = None
 
-        self.soa_mname = ""
-        self.soa_rname = ""
-        self.soa_serial = ""
-        self.soa_refresh = ""
-        self.soa_retry = ""
-        self.soa_expire = ""
-        self.soa_minimum_ttl = ""
+        soa = {}
+        mx_priority = None
+        mx_data = None
     
         for key, value in kwargs.items():
             match key:
@@ -31,30 +42,30 @@ class DNS_Resource_Record:
 
                 # SOA
                 case 'soa_mname' | 'soa_rname':
-                    setattr(self, key, self.dns_canonicalize(value).lower())
+                    soa[key] = self.dns_canonicalize(value).lower()
                 case 'soa_serial' | 'soa_refresh' | 'soa_retry' | 'soa_expire' | 'soa_minimum_ttl':
-                    setattr(self, key, value)
+                    soa[key] = value
 
                 # MX
                 case 'mx_priority':
-                    self.mx_priority = value
+                    mx_priority = value
                 case 'mx_value':
-                    self.mx_data = self.dns_canonicalize(value).lower()
+                    mx_data = self.dns_canonicalize(value).lower()
 
 
         # Post processing
         if self.rr_type == 'SOA':
             self.rr_name = self.dns_canonicalize(self.rr_name)
-            self.rr_data = " ".join([   self.soa_mname,
-                                        self.soa_rname,
-                                        str(self.soa_serial),
-                                        str(self.soa_refresh),
-                                        str(self.soa_retry),
-                                        str(self.soa_expire),
-                                        str(self.soa_minimum_ttl)])
+            self.rr_data = " ".join([   soa.get('soa_mname', ""),
+                                        soa.get('soa_rname', ""),
+                                        str(soa.get('soa_serial', "")),
+                                        str(soa.get('soa_refresh', "")),
+                                        str(soa.get('soa_retry', "")),
+                                        str(soa.get('soa_expire', "")),
+                                        str(soa.get('soa_minimum_ttl', ""))])
         elif self.rr_type == 'MX':
-            self.rr_data = " ".join([   self.mx_priority,
-                                        self.mx_data])
+            self.rr_data = " ".join([   mx_priority,
+                                        mx_data])
         elif self.rr_type == 'NS':
             self.rr_data = self.dns_canonicalize(self.rr_data)
         elif self.rr_type == 'CNAME':
@@ -82,10 +93,36 @@ class DNS_Resource_Record:
         elif self.rr_data is None:
             raise ValueError("DNS_Resource_Record(__init__)", "No rr_data provided")
 
+    @classmethod
+    def make_record(cls, rr_name: str, rr_type: str, rr_data: str, rr_ttl: int = 86400, rr_class: str = 'IN'):
+        # Fields as given, already normalized by the caller
+        rr = cls.__new__(cls)
+        rr.rr_name = rr_name
+        rr.rr_type = rr_type
+        rr.rr_class = rr_class
+        rr.rr_ttl = rr_ttl
+        rr.rr_data = rr_data
+        return rr
+
+    @classmethod
+    def make_a(cls, rr_name: str, address) -> 'DNS_Resource_Record':
+        return cls.make_record(rr_name.lower().translate(NAME_TRANSLATION), 'A', str(address))
+
+    @classmethod
+    def make_cname(cls, rr_name: str, target: str) -> 'DNS_Resource_Record':
+        return cls.make_record(rr_name.lower().translate(NAME_TRANSLATION), 'CNAME',
+                               cls.dns_canonicalize(target.lower().translate(NAME_TRANSLATION)))
+
+    @classmethod
+    def make_ptr(cls, rr_name: str, target: str) -> 'DNS_Resource_Record':
+        return cls.make_record(cls.dns_canonicalize(rr_name.lower()), 'PTR',
+                               cls.dns_canonicalize(target.lower().translate(NAME_TRANSLATION)))
+
     def __repr__(self) -> str:
         return f"{self.rr_name},{self.rr_type},{self.rr_data}"
 
-    def dns_canonicalize(self, s):
+    @staticmethod
+    def dns_canonicalize(s):
         if s == '@':
             return s
 
@@ -94,35 +131,37 @@ class DNS_Resource_Record:
         else:
             return s
 
-    def normalize_name(self, name):
-        return name.lower().translate(str.maketrans({" ": "_", "-": "_", "\"": "", "'": ""}))
+    @staticmethod
+    def normalize_name(name):
+        return name.lower().translate(NAME_TRANSLATION)
 
 
     def __str__(self):
-        res = []
-
-        res.append(self.rr_name)
-        res.append(str(self.rr_ttl))
-        res.append(self.rr_class)
-        res.append(self.rr_type)
-        res.append(self.rr_data)
-
-        return " ".join(res)
+        return f"{self.rr_name} {self.rr_ttl} {self.rr_class} {self.rr_type} {self.rr_data}"
 
 
 class DNS_Zonefile:
     def __init__(self):
         self.resource_records = []
+        self.lines: list[Iterable[str]] = []
 
     def add_rr(self, rr):
         self.resource_records.append(rr)
 
-    def get_str(self):
-        res = []
+    def add_lines(self, lines: Iterable[str]):
+        # Lines after the resource records, as $GENERATE directives, or records
+        # generated only while the zonefile is written
+        self.lines.append(lines)
+
+    def iter_lines(self) -> Iterator[str]:
         for rr in self.resource_records:
-            res.append(str(rr))
+            yield str(rr)
+
+        for lines in self.lines:
+            yield from lines
 
-        return "\n".join(res)
+    def get_str(self):
+        return "\n".join(self.iter_lines())
 
     def __str__(self):
         return self.get_str()
@@ -1,9 +1,41 @@
 
 from ipaddress import IPv4Address, IPv6Address
+from typing import Iterator
 from netboxers.models.netbox import Netbox_Prefix
 
 
 
+# The VLAN, VRF and DHCP tag of a prefix, shared by all options, ranges and
+# hosts in its section instead of looked up and formatted per entry
+class DNSMasq_DHCP_Prefix_Info:
+    __slots__ = ('vlan_id', 'vlan_name', 'vlan_short', 'vrf_name', 'dhcp_tag')
+
+    def __init__(self, prefix: Netbox_Prefix):
+        self.vlan_id: int | None = None
+        self.vlan_name: str | None = None
+        if vlan := prefix.get_vlan():
+            self.vlan_id = vlan['vid']
+            self.vlan_name = vlan['display']
+
+        self.vrf_name: str | None = None
+        if vrf := prefix.get_vrf():
+            self.vrf_name = vrf['name']
+
+        self.vlan_short: str = f"vlan_{self.vlan_id}"
+        self.dhcp_tag: str | None = None
+        if self.vrf_name is not None:
+            self.dhcp_tag = f"{self.vrf_name}_{self.vlan_short}"
+
+    def get_dhcp_tag(self) -> str:
+        if self.dhcp_tag is None:
+            # A prefix without a VRF has no tag
+            raise TypeError("DHCP tag requires a prefix with a VRF")
+        return self.dhcp_tag
+
+    def __repr__(self) -> str:
+        return f"DNSMasq_DHCP_Prefix_Info: vlan: {self.vlan_id} vrf: {self.vrf_name}"
+
+
 class DNSMasq_DHCP_Generic_Switchable:
     def __init__(self, name: str, value: str | None):
         self.name = name
@@ -20,8 +52,11 @@ class DNSMasq_DHCP_Generic_Switchable:
 
 
 class DNSMasq_DHCP_Option:
+    __slots__ = ('prefix', 'info', 'option', 'value')
+
     def __init__(self, 
                  prefix: Netbox_Prefix, 
+                 info: DNSMasq_DHCP_Prefix_Info,
                  option: str, 
                  value: str):
         if not prefix:
@@ -30,12 +65,7 @@ class DNSMasq_DHCP_Option:
         self.prefix: Netbox_Prefix = prefix
         self.option: str           = option
         self.value: str            = value
-
-        self.vlan_id = None
-        self.vlan_name = None
-        if vlan := prefix.get_vlan():
-            self.vlan_id = vlan['vid']
-            self.vlan_name = vlan['display']
+        self.info: DNSMasq_DHCP_Prefix_Info = info
 
     def get_prefix(self) -> Netbox_Prefix:
         return self.prefix
@@ -60,23 +90,19 @@ class DNSMasq_DHCP_Option:
                 return ""
 
     def get_vlan_id(self) -> int | None:
-        if vlan := self.get_prefix().get_vlan():
-            return vlan['vid']
-        
+        return self.info.vlan_id
+
+    def get_vlan_name(self) -> str | None:
+        return self.info.vlan_name
+
     def get_vlan_short(self) -> str:
-        vlan_id = self.get_vlan_id()
-        return f"vlan_{vlan_id}"
+        return self.info.vlan_short
 
     def get_vrf_name(self) -> str | None:
-        prefix = self.get_prefix()
-        if vrf := prefix.get_vrf():
-            return vrf['name']
+        return self.info.vrf_name
 
     def get_dhcp_tag(self) -> str:
-        l = []
-        l.append(self.get_vrf_name())
-        l.append(self.get_vlan_short())
-        return "_".join(l)
+        return self.info.get_dhcp_tag()
 
     def __add__(self, o):
         return self.get_str() + o
@@ -86,13 +112,7 @@ class DNSMasq_DHCP_Option:
 
     # dhcp-option=vrf_66_homelan_vlan_66,3,192.168.1.1  # Default Gateway
     def get_str(self) -> str:
-        res = []
-
-        res.append(self.get_dhcp_tag())
-        res.append(str(self.get_option()))
-        res.append(str(self.get_value()))
-
-        return f'dhcp-option={",".join(res)}  {self.get_comment()}'
+        return f'dhcp-option={self.info.get_dhcp_tag()},{self.option},{self.value}  {self.get_comment()}'
     
     def __repr__(self) -> str:
         return " ".join([
@@ -103,8 +123,11 @@ class DNSMasq_DHCP_Option:
 
 
 class DNSMasq_DHCP_Range:
+    __slots__ = ('prefix', 'info', 'range_min', 'range_max', 'netmask', 'lease_time')
+
     def __init__(self, 
                  prefix: Netbox_Prefix,
+                 info: DNSMasq_DHCP_Prefix_Info,
                  range_min: IPv4Address | IPv6Address, 
                  range_max: IPv4Address | IPv6Address, 
                  netmask: IPv4Address | IPv6Address, 
@@ -114,12 +137,7 @@ class DNSMasq_DHCP_Range:
         self.range_max: IPv4Address | IPv6Address = range_max
         self.netmask: IPv4Address | IPv6Address = netmask
         self.lease_time: str = lease_time
-
-        self.vlan_id = None
-        self.vlan_name = None
-        if vlan := prefix.get_vlan():
-            self.vlan_id = vlan['vid']
-            self.vlan_name = vlan['display']
+        self.info: DNSMasq_DHCP_Prefix_Info = info
 
     def get_prefix(self) -> Netbox_Prefix:
         return self.prefix
@@ -137,27 +155,19 @@ class DNSMasq_DHCP_Range:
         return self.lease_time
 
     def get_vlan_id(self) -> int | None:
-        if vlan := self.get_prefix().get_vlan():
-            return vlan['vid']
+        return self.info.vlan_id
+
+    def get_vlan_name(self) -> str | None:
+        return self.info.vlan_name
 
-    def get_vlan_name(self) -> int | None:
-        if vlan := self.get_prefix().get_vlan():
-            return vlan['display']
-        
     def get_vlan_short(self) -> str:
-        vlan_id = self.get_vlan_id()
-        return f"vlan_{vlan_id}"
+        return self.info.vlan_short
 
     def get_vrf_name(self) -> str | None:
-        prefix = self.get_prefix()
-        if vrf := prefix.get_vrf():
-            return vrf['name']
+        return self.info.vrf_name
 
     def get_dhcp_tag(self) -> str:
-        l = []
-        l.append(self.get_vrf_name())
-        l.append(self.get_vlan_short())
-        return "_".join(l)
+        return self.info.get_dhcp_tag()
 
     def __add__(self, o):
         return self.get_str() + o
@@ -166,15 +176,7 @@ class DNSMasq_DHCP_Range:
         return self.get_str()
 
     def get_str(self):
-        res = []
-
-        res.append(self.get_dhcp_tag())
-        res.append(str(self.get_range_min()))
-        res.append(str(self.get_range_max()))
-        res.append(str(self.get_netmask()))
-        res.append(str(self.get_lease_time()))
-
-        return f'dhcp-range={",".join(res)}'
+        return f'dhcp-range={self.info.get_dhcp_tag()},{self.range_min},{self.range_max},{self.netmask},{self.lease_time}'
 
     def __repr__(self) -> str:
         return " ".join([
@@ -188,8 +190,11 @@ class DNSMasq_DHCP_Range:
 
 
 class DNSMasq_DHCP_Host:
+    __slots__ = ('prefix', 'info', 'mac_address', 'hostname', 'ip_address', 'lease_time')
+
     def __init__(self, 
                  prefix: Netbox_Prefix,
+                 info: DNSMasq_DHCP_Prefix_Info,
                  mac_address: str, 
                  hostname: str, 
                  ip_address: str | IPv4Address | IPv6Address, 
@@ -199,12 +204,7 @@ class DNSMasq_DHCP_Host:
         self.hostname = hostname
         self.ip_address = ip_address
         self.lease_time = lease_time
-
-        self.vlan_id = None
-        self.vlan_name = None
-        if vlan := prefix.get_vlan():
-            self.vlan_id = vlan['vid']
-            self.vlan_name = vlan['display']
+        self.info: DNSMasq_DHCP_Prefix_Info = info
 
     def get_prefix(self):
         return self.prefix
@@ -222,27 +222,19 @@ class DNSMasq_DHCP_Host:
         return self.lease_time
 
     def get_vlan_id(self) -> int | None:
-        if vlan := self.get_prefix().get_vlan():
-            return vlan['vid']
+        return self.info.vlan_id
 
-    def get_vlan_name(self) -> int | None:
-        if vlan := self.get_prefix().get_vlan():
-            return vlan['display']
+    def get_vlan_name(self) -> str | None:
+        return self.info.vlan_name
 
     def get_vlan_short(self) -> str:
-        vlan_id = self.get_vlan_id()
-        return f"vlan_{vlan_id}"
+        return self.info.vlan_short
 
     def get_vrf_name(self) -> str | None:
-        prefix = self.get_prefix()
-        if vrf := prefix.get_vrf():
-            return vrf['name']
+        return self.info.vrf_name
 
     def get_dhcp_tag(self) -> str:
-        l = []
-        l.append(self.get_vrf_name())
-        l.append(self.get_vlan_short())
-        return "_".join(l)
+        return self.info.get_dhcp_tag()
 
     def __add__(self, o):
         return self.get_str() + o
@@ -251,15 +243,7 @@ class DNSMasq_DHCP_Host:
         return self.get_str()
 
     def get_str(self):
-        res = []
-
-        res.append(self.get_dhcp_tag())
-        res.append(str(self.get_mac_address()))
-        res.append(str(self.get_hostname()))
-        res.append(str(self.get_ip_address()))
-        res.append(str(self.get_lease_time()))
-
-        return f'dhcp-host={",".join(res)}'
+        return f'dhcp-host={self.info.get_dhcp_tag()},{self.mac_address},{self.hostname},{self.ip_address},{self.lease_time}'
 
     def __repr__(self) -> str:
         return " ".join([
@@ -272,19 +256,21 @@ class DNSMasq_DHCP_Host:
 
 
 class DNSMasq_DHCP_Section:
+    __slots__ = ('prefix_obj', 'info', 'scope', 'site', 'role', 'vlan_id', 'vlan_name', 'vrf_name', 'prefix',
+                 'dhcp_options', 'dhcp_ranges', 'dhcp_hosts')
+
     def __init__(self, prefix_obj: Netbox_Prefix):
         self.prefix_obj = prefix_obj
         self.scope = prefix_obj.get_scope()
         self.site = prefix_obj.get_site()
         self.role = prefix_obj.get_role()
-        self.vlan_id = None
-        self.vlan_name = None
-        if vlan := prefix_obj.get_vlan():
-            self.vlan_id = vlan['vid']
-            self.vlan_name = vlan['display']
 
-        if vrf := prefix_obj.get_vrf():
-            self.vrf_name = vrf['name']
+        # Made once here, and passed to the options, ranges and hosts of the section
+        self.info = info = DNSMasq_DHCP_Prefix_Info(prefix_obj)
+        self.vlan_id = info.vlan_id
+        self.vlan_name = info.vlan_name
+        if info.vrf_name is not None:
+            self.vrf_name = info.vrf_name
 
         self.prefix = prefix_obj.get_prefix()
 
@@ -292,6 +278,9 @@ class DNSMasq_DHCP_Section:
         self.dhcp_ranges: list[DNSMasq_DHCP_Range] = []
         self.dhcp_hosts: list[DNSMasq_DHCP_Host] = []
 
+    def get_info(self) -> DNSMasq_DHCP_Prefix_Info:
+        return self.info
+
     def set_scope(self, scope):
         self.scope = scope
 
@@ -365,6 +354,24 @@ class DNSMasq_DHCP_Section:
     def get_hosts(self):
         return self.dhcp_hosts
 
+    def iter_lines(self) -> Iterator[str]:
+        yield str(self.get_header())
+
+        yield str("")
+        for opts in self.get_options():
+            yield str(opts)
+
+        yield str("")
+        for ran in self.get_ranges():
+            yield str(ran)
+
+        yield str("")
+        for host in self.get_hosts():
+            yield str(host)
+
+    def get_str(self) -> str:
+        return "\n".join(self.iter_lines())
+
     def __repr__(self) -> str:
         return " ".join([
             f"DNSMasq_DHCP_Section:",
@@ -375,6 +382,26 @@ class DNSMasq_DHCP_Section:
         ])
 
 
+# A section reused as rendered before, see DNSMasq_DHCP_Section_Cache
+class DNSMasq_DHCP_Rendered_Section:
+    def __init__(self, prefix: str, rendered: str):
+        self.prefix = prefix
+        self.rendered = rendered
+
+    def get_prefix(self) -> str:
+        return self.prefix
+
+    def iter_lines(self) -> Iterator[str]:
+        # The rendered lines as one block
+        yield self.rendered
+
+    def get_str(self) -> str:
+        return self.rendered
+
+    def __repr__(self) -> str:
+        return f"DNSMasq_DHCP_Rendered_Section: prefix: {self.get_prefix()}"
+
+
 class DNSMasq_DHCP_Config:
     def __init__(self):
         self.dhcp_config_generic_switches = []
@@ -383,36 +410,23 @@ class DNSMasq_DHCP_Config:
     def append_to_dhcp_config_generic_switches(self, obj: DNSMasq_DHCP_Generic_Switchable):
         self.dhcp_config_generic_switches.append(obj)
 
-    def append_to_dhcp_config_sections(self, obj: DNSMasq_DHCP_Section):
+    def append_to_dhcp_config_sections(self, obj: DNSMasq_DHCP_Section | DNSMasq_DHCP_Rendered_Section):
         self.dhcp_config_sections.append(obj)
 
     def print(self):
         print(self)
 
-    def __str__(self):
-        res = []
-
+    def iter_lines(self) -> Iterator[str]:
         for sw in self.dhcp_config_generic_switches:
-            res.append(str(sw))
+            yield str(sw)
 
         for sec in self.dhcp_config_sections:
-            res.append(str(""))
-            res.append(str(""))
-            res.append(str(sec.get_header()))
-
-            res.append(str(""))
-            for opts in sec.get_options():
-                res.append(str(opts))
+            yield str("")
+            yield str("")
+            yield from sec.iter_lines()
 
-            res.append(str(""))
-            for ran in sec.get_ranges():
-                res.append(str(ran))
-
-            res.append(str(""))
-            for host in sec.get_hosts():
-                res.append(str(host))
-
-        return "\n".join(res)
+    def __str__(self):
+        return "\n".join(self.iter_lines())
 
     def __repr__(self) -> str:
         return f"DNSMasq_DHCP_Config: generic switches ({len(self.dhcp_config_generic_switches)}), sections: ({len(self.dhcp_config_sections)})"
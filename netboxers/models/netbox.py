@@ -1,44 +1,290 @@
-from ipaddress import IPv4Network, IPv6Network, ip_network
+import socket
+from ipaddress import IPv4Network, IPv6Network, IPv4Address, IPv6Address, IPv4Interface, IPv6Interface, \
+                      ip_network, ip_interface
+
+
+def parse_address(address: str) -> tuple[int, int, int]:
+    """Parse an address as NetBox writes it, '192.168.1.1/24', without the
+    cost of ip_interface().
+
+    Args:
+        address (str): IP address with an optional prefix length
+
+    Returns:
+        tuple[int, int, int]: IP version, address as int and prefix length
+    """
+    addr, _, prefixlen = address.partition('/')
+    version = 6 if ':' in addr else 4
+    if not prefixlen or prefixlen.isdigit():
+        try:
+            ip_int = int.from_bytes(socket.inet_pton(socket.AF_INET6 if version == 6 else socket.AF_INET, addr), 'big')
+            return version, ip_int, int(prefixlen) if prefixlen else (32 if version == 4 else 128)
+        except OSError:
+            pass
+
+    # Any other notation is left to ipaddress, which also raises on garbage
+    ip_iface = ip_interface(address)
+    return ip_iface.version, int(ip_iface.ip), ip_iface.network.prefixlen
+
+
+def get_tag_names(data: dict) -> frozenset[str]:
+    if not (tags := data.get('tags')):
+        return frozenset()
+    return frozenset([t['name'] for t in tags])
 
 
 class Netbox_Prefix:
+    __slots__ = ('prefix', 'status', 'vrf', 'scope', 'vlan', 'role', 'pool', 'tags')
+
     def __init__(self, data: dict):
-        self.data: dict = data
-        self.prefix: IPv4Network | IPv6Network = ip_network(self.data['prefix'], strict=True)
+        self.prefix: IPv4Network | IPv6Network = ip_network(data['prefix'], strict=True)
+        self.status: str = data['status']['value']
+        self.vrf: dict | None = data.get('vrf')
+        self.scope: dict | None = data.get('scope')
+        self.vlan: dict | None = data.get('vlan')
+        self.role: dict | None = data.get('role')
+        self.pool: bool = data.get('is_pool', False)
+        self.tags: list[str] | None = [t.get('name') for t in data['tags']] if data.get('tags') else None
 
     def __repr__(self) -> str:
         return str(self.prefix)
-    
+
     def get_prefix(self) -> IPv4Network | IPv6Network:
         return self.prefix
 
     def get_vrf(self) -> dict | None:
-        return self.data.get('vrf')
-            
+        return self.vrf
+
     def get_scope(self) -> dict | None:
-        return self.data.get('scope')
+        return self.scope
 
     def get_site(self) -> str | None:
-        if scope := self.data.get('scope'):
-            return scope['name']
+        if self.scope:
+            return self.scope['name']
 
     def get_vlan(self) -> dict | None:
-        return self.data.get('vlan')
+        return self.vlan
 
-    def get_status(self) -> dict:
-        return self.data['status']['value']
+    def get_status(self) -> str:
+        return self.status
 
     def is_active(self) -> bool:
-        return self.get_status() == 'active'
-    
+        return self.status == 'active'
+
     def get_role(self) -> dict | None:
-        return self.data.get('role')
+        return self.role
 
     def is_pool(self) -> bool:
-        return self.data['is_pool']
+        return self.pool
 
     def get_tags(self) -> list[str] | None:
-        tags = self.data.get('tags')
-        if not tags: return None
-        return [t.get('name') for t in tags]
+        return self.tags
+
+
+# A device or a virtual machine, both have the fields used
+class Netbox_Device:
+    __slots__ = ('id', 'name', 'status', 'primary_ip', 'virtual_machine')
+
+    def __init__(self, data: dict, virtual_machine: bool = False):
+        self.id: int = data['id']
+        self.name: str = data['name']
+        self.status: str = data['status']['value']
+        self.virtual_machine: bool = virtual_machine
+
+        # IP version, address as int and prefix length
+        self.primary_ip: tuple[int, int, int] | None = None
+        if (primary_ip := data.get('primary_ip')) and (address := primary_ip.get('address')):
+            self.primary_ip = parse_address(address)
+
+    def __repr__(self) -> str:
+        return f"Netbox_Device: {self.name} ({self.status})"
+
+    def get_id(self) -> int:
+        return self.id
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_status(self) -> str:
+        return self.status
+
+    def get_primary_ip(self) -> IPv4Interface | IPv6Interface | None:
+        if self.primary_ip is None:
+            return None
+        version, ip_int, prefixlen = self.primary_ip
+        return (IPv4Interface if version == 4 else IPv6Interface)((ip_int, prefixlen))
+
+    def is_virtual_machine(self) -> bool:
+        return self.virtual_machine
+
+
+# An interface of a device or a virtual machine
+class Netbox_Interface:
+    __slots__ = ('id', 'name', 'mac_address', 'device', 'unresolved_device_name', 'unresolved_device_id')
+
+    def __init__(self, data: dict, device: Netbox_Device | None):
+        self.id: int = data['id']
+        self.name: str = data['name']
+        self.mac_address: str | None = data.get('mac_address')
+        self.device: Netbox_Device | None = device
+
+        # The name and id as nested in the interface, only kept when the device is not known
+        self.unresolved_device_name: str | None = None
+        self.unresolved_device_id: int | None = None
+        if device is None:
+            nested = data.get('device') or data.get('virtual_machine') or {}
+            self.unresolved_device_name = nested.get('name')
+            self.unresolved_device_id = nested.get('id')
+
+    @property
+    def device_name(self) -> str | None:
+        # Read from the device, which is the record a rename updates
+        if self.device is not None:
+            return self.device.name
+        return self.unresolved_device_name
+
+    def __repr__(self) -> str:
+        return f"Netbox_Interface: {self.device_name} {self.name}"
+
+    def get_id(self) -> int:
+        return self.id
+
+    def get_name(self) -> str:
+        return self.name
+
+    def get_mac_address(self) -> str | None:
+        return self.mac_address
+
+    def get_device_name(self) -> str | None:
+        return self.device_name
+
+    def get_device(self) -> Netbox_Device | None:
+        return self.device
+
+    def set_device(self, device: Netbox_Device | None) -> None:
+        # A deleted device is kept by name and id, as one that is not known
+        if device is None and self.device is not None:
+            self.unresolved_device_name, self.unresolved_device_id = self.device.name, self.device.id
+        elif device is not None:
+            self.unresolved_device_name, self.unresolved_device_id = None, None
+        self.device = device
+
+
+class Netbox_IP_Address:
+    __slots__ = ('id', 'version', 'ip_int', 'prefixlen', 'ip_iface', 'status', 'dns_name', 'tags',
+                 'assigned_object_type', 'assigned', 'parent_type', 'parent_id', 'interface',
+                 'unresolved_parent_name', 'unresolved_interface_name', 'unresolved_interface_id')
+
+    def __init__(self, data: dict, interface: Netbox_Interface | None):
+        self.id: int = data['id']
+        self.version, self.ip_int, self.prefixlen = parse_address(data['address'])
+        self.ip_iface: IPv4Interface | IPv6Interface | None = None
+        self.status: str = data['status']['value']
+        self.dns_name: str | None = data.get('dns_name')
+        self.tags: frozenset[str] = get_tag_names(data)
+
+        # The device or virtual machine the address is assigned to, by id
+        self.assigned_object_type: str | None = data.get('assigned_object_type')
+        self.parent_type: str | None = None
+        self.parent_id: int | None = None
+        self.interface: Netbox_Interface | None = interface
+
+        # The names and id as nested in the assignment, only kept when the interface is not known
+        self.unresolved_parent_name: str | None = None
+        self.unresolved_interface_name: str | None = None
+        self.unresolved_interface_id: int | None = None
+
+        assigned_object = data.get('assigned_object')
+        self.assigned: bool = bool(assigned_object)
+        if assigned_object:
+            for parent_type in ('device', 'virtual_machine'):
+                if parent := assigned_object.get(parent_type):
+                    self.parent_type, self.parent_id = parent_type, parent['id']
+                    if interface is None:
+                        self.unresolved_parent_name = parent['name']
+                    break
+            if interface is None:
+                self.unresolved_interface_name = assigned_object.get('name')
+                self.unresolved_interface_id = assigned_object.get('id')
+
+    @property
+    def parent_name(self) -> str | None:
+        # Read from the device of the interface, which is the record a rename updates
+        if self.interface is not None:
+            return self.interface.device_name
+        return self.unresolved_parent_name
+
+    @property
+    def interface_name(self) -> str | None:
+        if self.interface is not None:
+            return self.interface.name
+        return self.unresolved_interface_name
+
+    def __repr__(self) -> str:
+        return f"Netbox_IP_Address: {self.get_ip_interface()} ({self.status})"
+
+    def get_ip_interface(self) -> IPv4Interface | IPv6Interface:
+        # Created on first use
+        if self.ip_iface is None:
+            self.ip_iface = (IPv4Interface if self.version == 4 else IPv6Interface)((self.ip_int, self.prefixlen))
+        return self.ip_iface
+
+    def get_ip_address(self) -> IPv4Address | IPv6Address:
+        return (IPv4Address if self.version == 4 else IPv6Address)(self.ip_int)
+
+    def get_status(self) -> str:
+        return self.status
+
+    def get_dns_name(self) -> str | None:
+        return self.dns_name
+
+    def has_tag(self, tag_name: str) -> bool:
+        return tag_name in self.tags
+
+    def is_assigned(self) -> bool:
+        return self.assigned
+
+    def get_interface(self) -> Netbox_Interface | None:
+        return self.interface
+
+    def set_interface(self, interface: Netbox_Interface | None) -> None:
+        # A deleted interface is kept by its names and id, as one that is not known
+        if interface is None and self.interface is not None:
+            self.unresolved_parent_name = self.interface.device_name
+            self.unresolved_interface_name = self.interface.name
+            self.unresolved_interface_id = self.interface.id
+        elif interface is not None:
+            self.unresolved_parent_name = self.unresolved_interface_name = self.unresolved_interface_id = None
+        self.interface = interface
+
+
+class Netbox_IP_Range:
+    __slots__ = ('id', 'version', 'start_int', 'end_int', 'status', 'tags')
+
+    def __init__(self, data: dict):
+        self.id: int = data['id']
+        self.version, self.start_int, _ = parse_address(data['start_address'])
+        _, self.end_int, _ = parse_address(data['end_address'])
+        self.status: str = data['status']['value']
+        self.tags: frozenset[str] = get_tag_names(data)
+
+    def __repr__(self) -> str:
+        return f"Netbox_IP_Range: {self.get_start_address()}-{self.get_end_address()} ({self.status})"
+
+    def get_start_address(self) -> IPv4Address | IPv6Address:
+        return (IPv4Address if self.version == 4 else IPv6Address)(self.start_int)
+
+    def get_end_address(self) -> IPv4Address | IPv6Address:
+        return (IPv4Address if self.version == 4 else IPv6Address)(self.end_int)
+
+    def get_size(self) -> int:
+        return self.end_int - self.start_int + 1
+
+    def get_status(self) -> str:
+        return self.status
+
+    def is_active(self) -> bool:
+        return self.status == 'active'
 
+    def has_tag(self, tag_name: str) -> bool:
+        return tag_name in self.tags
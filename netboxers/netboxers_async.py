@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import time
+import asyncio
+import importlib.util
+
+from netboxers.netboxers_queries import strip_query, get_request_headers, get_http_stats, get_request_scheduler
+from netboxers.netboxers_scheduler import RETRY_STATUS_CODES
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class Netbox_Async_Client:
+    """Asynchronous NetBox client on httpx, behind the same query functions as
+    the requests based client.
+
+    All requests share one event loop and one connection pool with
+    keep-alive, optionally multiplexed over HTTP/2. gzip is always
+    negotiated, brotli when the brotli package is installed. The run_*
+    methods are the synchronous facade used by netboxers_queries.
+    """
+
+    def __init__(self, ctx: dict):
+        if httpx is None:
+            raise ImportError("The httpx HTTP backend requires httpx, install it with: pip install httpx[http2,brotli]")
+
+        self.ctx = ctx
+        self.loop = asyncio.new_event_loop()
+        self.semaphore: asyncio.Semaphore | None = None
+
+        http2 = ctx.get('generic_http2', False)
+        if http2 and importlib.util.find_spec('h2') is None:
+            print("Warning: HTTP/2 requires the h2 package, falling back to HTTP/1.1.")
+            http2 = False
+
+        pool_size = ctx.get('generic_http_pool_size', 20)
+        self.client = httpx.AsyncClient(base_url=f"{ctx['generic_netbox_base_url']}/api/",
+                                        headers=get_request_headers(ctx),
+                                        limits=httpx.Limits(max_connections=pool_size,
+                                                            max_keepalive_connections=pool_size),
+                                        http2=http2,
+                                        timeout=ctx.get('generic_http_timeout', 10.0))
+
+    def __repr__(self) -> str:
+        return f"Netbox_Async_Client: {self.ctx['generic_netbox_base_url']}"
+
+    def run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def close(self) -> None:
+        self.run(self.client.aclose())
+        self.loop.close()
+
+    async def send(self, query_stripped: str, req_parameters: dict | None = None, headers: dict | None = None):
+        """GET through the request scheduler, see send_request() of
+        netboxers_queries. Waiting does not block the event loop."""
+        # Bound the requests in flight, created here to bind it to our loop
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.ctx.get('generic_http_pool_size', 20))
+
+        scheduler = get_request_scheduler(self.ctx)
+        deadline = scheduler.get_deadline()
+
+        attempt = 0
+        while True:
+            await asyncio.sleep(scheduler.reserve())
+
+            try:
+                async with self.semaphore:
+                    get_req = await self.client.get(query_stripped,
+                                                    params=req_parameters,
+                                                    headers=headers,
+                                                    timeout=scheduler.get_timeout(deadline))
+                if get_req.status_code not in RETRY_STATUS_CODES:
+                    return get_req
+
+                reason = f"HTTP {get_req.status_code}"
+                delay = scheduler.get_backoff(attempt, get_req.headers.get('Retry-After'))
+                if not scheduler.should_retry(attempt, delay, deadline):
+                    return get_req
+
+            except httpx.TransportError as e:
+                reason = type(e).__name__
+                delay = scheduler.get_backoff(attempt)
+                if not scheduler.should_retry(attempt, delay, deadline):
+                    raise
+
+            attempt += 1
+            print(f"Warning: {reason} on \'{query_stripped.split('?')[0]}\', retry {attempt} of {scheduler.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def call(self, query: str, req_parameters: dict | None = None) -> dict:
+        query_stripped = strip_query(self.ctx, query)
+
+        if self.ctx['generic_verbose']:
+            print(query_stripped)
+
+        get_req = await self.send(query_stripped, req_parameters)
+        get_req.raise_for_status()
+
+        if self.ctx['generic_verbose']:
+            print(get_req.text)
+
+        start = time.perf_counter()
+        response = get_req.json()
+
+        get_http_stats(self.ctx).record(query_stripped.split('?')[0], len(get_req.content), time.perf_counter() - start)
+        return response
+
+    async def query(self, query: str, req_parameters: dict | None = None) -> dict:
+        """Fetch the first page, then all remaining pages at once"""
+        response = await self.call(query, req_parameters)
+
+        page_size = len(response['results'])
+        if not response.get('next') or page_size == 0:
+            return response
+
+        pages = []
+        for offset in range(page_size, response['count'], page_size):
+            page_parameters = dict(req_parameters or {})
+            page_parameters['limit'] = page_size
+            page_parameters['offset'] = offset
+            pages.append(self.call(query, page_parameters))
+
+        for page in await asyncio.gather(*pages):
+            response['results'].extend(page['results'])
+
+        return response
+
+    async def load_endpoint(self, endpoint: str, parameters: dict) -> tuple[list | None, float]:
+        start = time.perf_counter()
+        response = await self.query(endpoint, parameters)
+        results = response['results'] if response['count'] > 0 else None
+        return results, time.perf_counter() - start
+
+    def run_call(self, query: str, req_parameters: dict | None = None) -> dict:
+        return self.run(self.call(query, req_parameters))
+
+    def run_query(self, query: str, req_parameters: dict | None = None) -> dict:
+        return self.run(self.query(query, req_parameters))
+
+    def run_send_all(self, queries: list[tuple[str, dict | None, dict | None]]) -> list:
+        async def send_all():
+            return await asyncio.gather(*[self.send(query, req_parameters, headers)
+                                          for query, req_parameters, headers in queries])
+        return self.run(send_all())
+
+    def run_load_endpoints(self, endpoints: list[tuple[str, dict]]) -> list[tuple[list | None, float]]:
+        async def load_all():
+            return await asyncio.gather(*[self.load_endpoint(endpoint, parameters)
+                                          for endpoint, parameters in endpoints])
+        return self.run(load_all())
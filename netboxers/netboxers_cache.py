@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+from ipaddress import IPv4Network, IPv6Network
+
+from netboxers.netboxers_records import Netbox_Records
+from netboxers.netboxers_prefix_index import Netbox_Prefix_Index
+
+
+class Netbox_Cache:
+    """In-memory cache of the NetBox endpoint results. Every endpoint is
+    indexed on the object id when it is loaded, to patch webhooks into.
+
+    The generators only read the endpoints normalized into Netbox_Records.
+    A webhook is patched into both, the records are only normalized again
+    from the results after a change to a prefix. What changed since the
+    last generation is kept as the addresses it touched, see get_changes().
+    After a delta sync the addresses changed since the snapshot it started
+    from are kept for the first generation, see get_synced_prefixes().
+    """
+
+    def __init__(self):
+        self.objects: dict[str, dict[int, dict]] = {}
+        self.records: Netbox_Records | None = None
+        self.changes: list[tuple[int, int, int]] | None = None
+
+        # Creation time of the snapshot holding the loaded data, and the
+        # snapshot synced from with the addresses changed since
+        self.snapshot: float | None = None
+        self.synced: tuple[float, list[tuple[int, int, int]]] | None = None
+
+    def __repr__(self) -> str:
+        return f"Netbox_Cache: {', '.join(f'{k} ({len(v)})' for k, v in self.objects.items())}"
+
+    def set_endpoint(self, endpoint: str, results: list[dict] | None) -> None:
+        # Kept in the order of the results, an update keeps the place of the object
+        self.objects[endpoint] = {obj['id']: obj for obj in results or []}
+        self.add_changes(None)
+
+    def update_object(self, endpoint: str, obj: dict) -> None:
+        # The data no longer is that of the snapshot
+        self.snapshot = None
+        self.objects.setdefault(endpoint, {})[obj['id']] = obj
+        self.add_changes(self.records.update_object(endpoint, obj) if self.records is not None else None)
+
+    def delete_object(self, endpoint: str, obj_id: int) -> None:
+        if self.objects.setdefault(endpoint, {}).pop(obj_id, None) is not None:
+            self.snapshot = None
+            self.add_changes(self.records.delete_object(endpoint, obj_id) if self.records is not None else None)
+
+    def add_changes(self, changes: list[tuple[int, int, int]] | None) -> None:
+        # None normalizes the records again, and everything changed
+        if changes is None:
+            self.records = None
+            self.changes = None
+            self.synced = None
+        elif self.changes is not None:
+            self.changes.extend(changes)
+
+    def get_changes(self) -> list[tuple[int, int, int]] | None:
+        """IP version, first and last address of everything changed since
+        reset_changes(). None when everything must be generated again.
+        """
+        return self.changes
+
+    def has_changes(self) -> bool:
+        return self.changes is None or len(self.changes) > 0
+
+    def reset_changes(self) -> None:
+        self.changes = []
+        self.synced = None
+
+    def set_snapshot(self, created: float | None,
+                     synced_from: float | None = None,
+                     synced: list[tuple[int, int, int]] | None = None) -> None:
+        self.snapshot = created
+        self.synced = (synced_from, synced) if synced_from is not None and synced is not None else None
+
+    def get_snapshot(self) -> float | None:
+        return self.snapshot
+
+    def drop_results(self) -> None:
+        # Keep only the records, the results cannot be patched or normalized again after this
+        self.get_records()
+        self.objects = {}
+
+    def get_records(self) -> Netbox_Records:
+        # Normalized once on first use, from the cached results
+        if self.records is None:
+            self.records = Netbox_Records({endpoint: list(objects.values())
+                                           for endpoint, objects in self.objects.items()})
+        return self.records
+
+    def get_prefix_index(self) -> Netbox_Prefix_Index:
+        return self.get_records().get_prefix_index()
+
+    def get_changed_prefixes(self) -> set[IPv4Network | IPv6Network] | None:
+        # The prefixes holding a change, None for all
+        if self.changes is None:
+            return None
+        return self.get_prefix_index().find_prefixes(self.changes)
+
+    def get_synced_prefixes(self, snapshot: float | None) -> set[IPv4Network | IPv6Network] | None:
+        # The prefixes holding a change since the given snapshot, only known after a delta sync from it
+        if snapshot is None or self.synced is None or self.synced[0] != snapshot:
+            return None
+        return self.get_prefix_index().find_prefixes(self.synced[1])
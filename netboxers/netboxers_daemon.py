@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import hmac
+import json
+import time
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable
+
+from netboxers.netboxers_queries import ENDPOINT_OBJECT_TYPES, ENDPOINT_FIELDS
+
+
+# Endpoint of the object type of a webhook, as 'ipam.ipaddress' or only the model 'ipaddress'
+WEBHOOK_ENDPOINTS = {object_type: endpoint for endpoint, object_type in ENDPOINT_OBJECT_TYPES.items()} | \
+                    {object_type.split('.')[1]: endpoint for endpoint, object_type in ENDPOINT_OBJECT_TYPES.items()}
+
+
+class Netbox_Webhook_Daemon:
+    """Keeps the NetBox data in memory and regenerates the configuration on
+    NetBox webhooks.
+
+    Every webhook of a created, updated or deleted object is queued. Once no
+    webhook came in for 'generic_daemon_debounce' seconds, the queued changes
+    are patched into the cache and the configuration is regenerated, so a
+    burst of changes costs one regeneration. With 'generic_webhook_secret'
+    set, webhooks must carry a valid HMAC-SHA512 X-Hook-Signature.
+    """
+
+    def __init__(self, ctx: dict, regenerate: Callable[[dict], None]):
+        self.ctx = ctx
+        self.regenerate = regenerate
+        self.debounce = ctx.get('generic_daemon_debounce', 1.0)
+        self.secret = ctx.get('generic_webhook_secret')
+
+        self.lock = threading.Lock()
+        self.run_lock = threading.Lock()
+        self.events: list[dict] = []
+        self.timer: threading.Timer | None = None
+
+        self.httpd = ThreadingHTTPServer((ctx.get('generic_daemon_address', "127.0.0.1"),
+                                          ctx.get('generic_daemon_port', 8471)),
+                                         self.make_handler())
+
+    def __repr__(self) -> str:
+        return f"Netbox_Webhook_Daemon: http://{self.httpd.server_address[0]}:{self.httpd.server_address[1]}/"
+
+    def verify_signature(self, body: bytes, signature: str | None) -> bool:
+        if not self.secret:
+            return True
+        if not signature:
+            return False
+
+        expected = hmac.new(self.secret.encode("utf-8"), body, hashlib.sha512).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    def queue_event(self, event: dict) -> bool:
+        """Queue a webhook and restart the debounce timer.
+
+        Args:
+            event (dict): Webhook payload of NetBox
+
+        Returns:
+            bool: False when the webhook is not about an object in the cache
+        """
+        object_type = event.get('object_type') or event.get('model')
+        if object_type not in WEBHOOK_ENDPOINTS or not isinstance(event.get('data'), dict):
+            return False
+
+        with self.lock:
+            self.events.append(event)
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.debounce, self.run)
+            self.timer.daemon = True
+            self.timer.start()
+
+        return True
+
+    def apply_event(self, event: dict) -> None:
+        endpoint = WEBHOOK_ENDPOINTS[event.get('object_type') or event.get('model')]
+        data = event['data']
+
+        if event.get('event') == 'deleted':
+            self.ctx['cache'].delete_object(endpoint, data['id'])
+            return
+
+        # Keep the fields a load would have kept
+        if self.ctx.get('generic_field_projection', True):
+            data = {k: v for k, v in data.items() if k in ENDPOINT_FIELDS[endpoint]}
+        self.ctx['cache'].update_object(endpoint, data)
+
+    def run(self) -> None:
+        # One regeneration at a time, webhooks queued meanwhile go into the next
+        with self.run_lock:
+            with self.lock:
+                events, self.events = self.events, []
+            if not events:
+                return
+
+            start = time.perf_counter()
+            for event in events:
+                self.apply_event(event)
+
+            try:
+                self.regenerate(self.ctx)
+            except Exception as e:
+                print(f"Error: regenerating the configuration failed: {e}")
+                return
+
+            print(f"Info: Regenerated the configuration for {len(events)} NetBox changes "
+                  f"in {time.perf_counter() - start:.2f}s.")
+
+    def serve_forever(self) -> None:
+        print(f"Info: Listening for NetBox webhooks on "
+              f"http://{self.httpd.server_address[0]}:{self.httpd.server_address[1]}/")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+    def shutdown(self) -> None:
+        self.httpd.shutdown()
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+
+    def make_handler(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+                if not daemon.verify_signature(body, self.headers.get('X-Hook-Signature')):
+                    print(f"Warning: ignoring a webhook from {self.client_address[0]} with an invalid signature.")
+                    self.send_response(403)
+                    self.end_headers()
+                    return
+
+                try:
+                    event = json.loads(body)
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+
+                queued = isinstance(event, dict) and daemon.queue_event(event)
+                self.send_response(202 if queued else 204)
+                self.end_headers()
+
+        return Handler
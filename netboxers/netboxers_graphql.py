@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ipaddress import ip_interface
+
+from netboxers.netboxers_queries import PREFILL_ENDPOINTS, send_http_request, get_http_stats
+
+
+# Objects per page of a GraphQL list query, unless a page size is configured
+GRAPHQL_PAGE_SIZE = 1000
+
+# GraphQL list query and selection set per endpoint, the GraphQL counterpart
+# of ENDPOINT_FIELDS. Targets the schema of NetBox 4.2 and newer.
+GRAPHQL_ENDPOINTS = {
+    "dcim/devices/":                    ("device_list",
+                                         "id name status last_updated "
+                                         "primary_ip4 { id address } primary_ip6 { id address }"),
+    "virtualization/virtual-machines/": ("virtual_machine_list",
+                                         "id name status last_updated "
+                                         "primary_ip4 { id address } primary_ip6 { id address }"),
+    "virtualization/interfaces/":       ("vm_interface_list",
+                                         "id name last_updated virtual_machine { id name } "
+                                         "primary_mac_address { mac_address }"),
+    "dcim/interfaces/":                 ("interface_list",
+                                         "id name last_updated device { id name } "
+                                         "primary_mac_address { mac_address }"),
+    "ipam/prefixes/":                   ("prefix_list",
+                                         "id prefix status is_pool last_updated vrf { id name } "
+                                         "vlan { id vid name display } role { id name } tags { id name slug } "
+                                         "scope { __typename ... on SiteType { id name } ... on LocationType { id name } "
+                                         "... on RegionType { id name } ... on SiteGroupType { id name } }"),
+    "ipam/ip-addresses/":               ("ip_address_list",
+                                         "id address status dns_name last_updated tags { id name slug } "
+                                         "assigned_object { __typename "
+                                         "... on InterfaceType { id name device { id name } } "
+                                         "... on VMInterfaceType { id name virtual_machine { id name } } }"),
+    "ipam/ip-ranges/":                  ("ip_range_list",
+                                         "id start_address end_address status last_updated tags { id name slug }"),
+}
+
+# REST 'assigned_object_type' of the GraphQL type of an assigned object
+GRAPHQL_OBJECT_TYPES = {
+    "InterfaceType":   "dcim.interface",
+    "VMInterfaceType": "virtualization.vminterface",
+    "FHRPGroupType":   "ipam.fhrpgroup",
+}
+
+
+def query_graphql(ctx: dict, query: str) -> dict:
+    if ctx['generic_verbose']:
+        print(query)
+
+    get_req = send_http_request(ctx, 'POST', f"{ctx['generic_netbox_base_url']}/graphql/", json={'query': query})
+    get_req.raise_for_status()
+
+    if ctx['generic_verbose']:
+        print(get_req.text)
+
+    start = time.perf_counter()
+    response = get_req.json()
+    get_http_stats(ctx).record("graphql/", len(get_req.content), time.perf_counter() - start)
+
+    if errors := response.get('errors'):
+        raise ValueError(f"GraphQL query failed: {errors[0].get('message')}")
+
+    return response['data']
+
+
+def get_alias(endpoint: str, page: int) -> str:
+    return f"{GRAPHQL_ENDPOINTS[endpoint][0]}_{page}"
+
+
+def get_batch_query(pages: list[tuple[str, int]], page_size: int) -> str:
+    # One aliased list query per endpoint and page, all in one request
+    lines = []
+    for endpoint, page in pages:
+        list_query, selection = GRAPHQL_ENDPOINTS[endpoint]
+        lines.append(f"  {get_alias(endpoint, page)}: {list_query}"
+                     f"(pagination: {{offset: {page * page_size}, limit: {page_size}}}) {{ {selection} }}")
+
+    return "query {\n" + "\n".join(lines) + "\n}"
+
+
+def normalize_choice(value: str | None) -> dict | None:
+    # GraphQL returns the name of the enum, 'STATUS_ACTIVE' or 'ACTIVE', REST the value and label
+    if value is None:
+        return None
+
+    value = value.removeprefix("STATUS_").lower()
+    return {'value': value, 'label': value.title()}
+
+
+def normalize_ids(obj):
+    # GraphQL serializes IDs as strings, REST as numbers
+    if isinstance(obj, dict):
+        return {k: int(v) if k == 'id' and v is not None else normalize_ids(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [normalize_ids(v) for v in obj]
+    return obj
+
+
+def to_rest_object(obj: dict) -> dict:
+    """Reshape an object of a GraphQL list query to the object the REST API
+    returns, with the fields in ENDPOINT_FIELDS.
+
+    Args:
+        obj (dict): Object as returned by GraphQL
+
+    Returns:
+        dict: Object as returned by REST
+    """
+    obj = normalize_ids(obj)
+
+    if 'status' in obj:
+        obj['status'] = normalize_choice(obj['status'])
+
+    if 'primary_ip4' in obj or 'primary_ip6' in obj:
+        # Like NetBox without PREFER_IPV4
+        primary_ip6 = obj.pop('primary_ip6', None)
+        primary_ip4 = obj.pop('primary_ip4', None)
+        obj['primary_ip'] = primary_ip6 or primary_ip4
+
+    if 'primary_mac_address' in obj:
+        obj['mac_address'] = (obj.pop('primary_mac_address') or {}).get('mac_address')
+
+    if 'assigned_object' in obj:
+        assigned_object = obj['assigned_object'] or {}
+        obj['assigned_object_type'] = GRAPHQL_OBJECT_TYPES.get(assigned_object.pop('__typename', None))
+        obj['assigned_object'] = assigned_object or None
+
+    if 'address' in obj:
+        version = ip_interface(obj['address']).version
+        obj['family'] = {'value': version, 'label': f"IPv{version}"}
+
+    if obj.get('scope'):
+        obj['scope'].pop('__typename', None)
+
+    return obj
+
+
+def load_endpoints_graphql(ctx: dict, selection: list[str] | None = None) -> dict[str, list | None]:
+    """Load all PREFILL_ENDPOINTS, or a selection of them, with batched
+    GraphQL queries. The first page of every endpoint is fetched in one
+    query. Endpoints with more pages continue in rounds of
+    'generic_concurrency' parallel queries, each holding the next page of
+    every unfinished endpoint. The objects are reshaped to their REST form.
+
+    Args:
+        ctx (dict): Context
+        selection (list[str] | None): Endpoints to load, default all PREFILL_ENDPOINTS
+
+    Returns:
+        dict[str, list | None]: Results per endpoint
+    """
+    selection = PREFILL_ENDPOINTS if selection is None else selection
+    page_size = ctx['generic_page_size'] if isinstance(ctx.get('generic_page_size'), int) else GRAPHQL_PAGE_SIZE
+    concurrency = ctx.get('generic_concurrency', 1)
+    start = time.perf_counter()
+
+    def fetch(pages: list[tuple[str, int]]) -> list[tuple[str, list]]:
+        data = query_graphql(ctx, get_batch_query(pages, page_size))
+        return [(endpoint, data[get_alias(endpoint, page)]) for endpoint, page in pages]
+
+    loaded: dict[str, list] = {endpoint: [] for endpoint in selection}
+    pending = list(selection)
+    pages = [0]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        while pending:
+            finished = set()
+            batches = [[(endpoint, page) for endpoint in pending] for page in pages]
+            for fetched in executor.map(fetch, batches):
+                for endpoint, objects in fetched:
+                    loaded[endpoint].extend(objects)
+                    if len(objects) < page_size:
+                        finished.add(endpoint)
+
+            pending = [endpoint for endpoint in pending if endpoint not in finished]
+            pages = list(range(pages[-1] + 1, pages[-1] + 1 + concurrency))
+
+    endpoints = {}
+    for endpoint in selection:
+        print(f"Info: Loaded: \'{endpoint}\' with {len(loaded[endpoint])} objects over GraphQL")
+        endpoints[endpoint] = [to_rest_object(obj) for obj in loaded[endpoint]] or None
+
+    stats = get_http_stats(ctx)
+    print(f"Info: Transferred: \'graphql/\' {stats.get_bytes('graphql/') / 1024:.1f} KiB "
+          f"in {stats.get_request_count('graphql/')} requests, JSON parsed in {stats.get_parse_time('graphql/'):.3f}s")
+
+    print(f"Info: Done loading NetBox data in {time.perf_counter() - start:.2f}s.")
+    return endpoints
@@ -2,6 +2,11 @@
 
 import os
 import re
+import sys
+import shlex
+import tempfile
+import subprocess
+from typing import Iterable
 
 
 # All non-alfanum, replace with underscore and lowercase it
@@ -18,15 +23,152 @@ def make_iface_dot_host_name(dev_name: str, if_name: str) -> str:
     return f"{sanitize(if_name)}.{sanitize(dev_name)}"
 
 
-def write_data_to_file(filepath: str | None, s: str) -> None:
+class Compare_Writer:
+    """Binary file writer taking text, comparing what is written with the
+    existing file. Nothing is written while the data matches the file; on
+    the first difference a temporary file is opened with open_tmp(), the
+    part that matched is copied into it from the existing file, and all
+    further writes go to the temporary file.
+    """
+
+    def __init__(self, existing, open_tmp):
+        self.existing = existing
+        self.open_tmp = open_tmp
+        self.matched = 0
+        self.tmp = None
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        if self.tmp is None and self.existing is not None and self.existing.read(len(data)) == data:
+            self.matched += len(data)
+            return
+
+        if self.tmp is None:
+            self.diverge()
+        self.tmp.write(data)
+
+    def diverge(self) -> None:
+        self.tmp = self.open_tmp()
+        if self.existing is not None:
+            self.existing.seek(0)
+            remaining = self.matched
+            while remaining and (chunk := self.existing.read(min(remaining, 64 * 1024))):
+                self.tmp.write(chunk)
+                remaining -= len(chunk)
+
+    def finish(self) -> bool:
+        # True when the data differs from the existing file, also when the file is longer
+        if self.tmp is None and (self.existing is None or self.existing.read(1)):
+            self.diverge()
+        return self.tmp is not None
+
+
+def write_lines(stream, lines: Iterable[str], batch_size: int = 1024) -> None:
+    # Lines separated by newlines, as "\n".join(lines), written a batch at a time
+    separator = ""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == batch_size:
+            stream.write(separator + "\n".join(batch))
+            separator = "\n"
+            batch = []
+
+    if batch:
+        stream.write(separator + "\n".join(batch))
+
+
+def write_data_to_file(filepath: str | None, data: str | Iterable[str]) -> bool:
+    """Write the data to the file, unless the file already holds exactly
+    this data. The data is compared with the file while it is generated,
+    an unchanged file costs no write at all. A changed file is replaced
+    atomically: written to a temporary file next to it, synced to disk and
+    renamed over it. A reader never sees a partial file, and a crash leaves
+    the old file in place.
+
+    Args:
+        filepath (str | None): File to write, None prints the data
+        data (str | Iterable[str]): Data, or its lines streamed into the file
+
+    Returns:
+        bool: True when the file changed, never for printed data
+    """
+    lines = [data] if isinstance(data, str) else data
+
     # No file, print only
     if filepath is None:
-        print(s)
+        write_lines(sys.stdout, lines)
+        sys.stdout.write("\n")
+        return False
+
+    # Keep the permissions of the file replaced, or as open() would create it
+    if os.path.exists(filepath):
+        mode = os.stat(filepath).st_mode & 0o7777
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    directory = os.path.dirname(os.path.abspath(filepath))
+    tmp_path = None
+
+    def open_tmp():
+        nonlocal tmp_path
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filepath) + ".")
+        return os.fdopen(fd, "wb")
+
+    existing = open(filepath, "rb") if os.path.isfile(filepath) else None
+    writer = Compare_Writer(existing, open_tmp)
+    try:
+        try:
+            write_lines(writer, lines)
+            changed = writer.finish()
+        finally:
+            if existing is not None:
+                existing.close()
+
+        if not changed:
+            print(f"Info: \'{filepath}\' is unchanged.")
+            return False
+
+        with writer.tmp as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if writer.tmp is not None:
+            writer.tmp.close()
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+    print(f"Info: Wrote \'{filepath}\'.")
+    return True
+
+
+def run_post_write_hook(hook: str | None) -> None:
+    # Command to run after an output file changed, e.g. to reload dnsmasq
+    if not hook:
+        return
+
+    print(f"Info: Running post write hook: {hook}")
+    try:
+        result = subprocess.run(shlex.split(hook), timeout=60)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Error: post write hook \'{hook}\' failed: {e}")
         return
 
-    # Write to file
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(s)
+    if result.returncode != 0:
+        print(f"Error: post write hook \'{hook}\' exited with {result.returncode}")
 
 
 def get_ctx():
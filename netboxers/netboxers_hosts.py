@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+from ipaddress import IPv4Network, IPv6Network, IPv4Address, IPv6Address
+
+from netboxers.models.netbox import Netbox_IP_Address
+from netboxers.netboxers_prefix_index import Netbox_Prefix_Index
+
+
+class Netbox_Host_Inventory:
+    """The hosts of each prefix: every active IP address joined with its
+    interface and the device or virtual machine of that interface.
+
+    The join of a prefix is made once, on first use, and shared between the
+    DHCP sections and the forward zone, which both render from the same
+    hosts. A host is a tuple of the MAC address, device name, interface
+    name, IP address and whether the IP address is the primary IP address of
+    the device.
+    """
+
+    def __init__(self, prefix_index: Netbox_Prefix_Index):
+        self.prefix_index = prefix_index
+        self.hosts: dict[IPv4Network | IPv6Network,
+                         list[tuple[str | None, str, str, IPv4Address | IPv6Address, bool]]] = {}
+
+    def __repr__(self) -> str:
+        return f"Netbox_Host_Inventory: prefixes: {len(self.hosts)} hosts: {sum(len(h) for h in self.hosts.values())}"
+
+    @staticmethod
+    def make_host(ip_addr: Netbox_IP_Address) -> tuple[str | None, str, str, IPv4Address | IPv6Address, bool] | None:
+        if ip_addr.assigned_object_type not in ('dcim.interface', 'virtualization.vminterface'):
+            raise ValueError("Unknown associatation detected")
+
+        if not (interface := ip_addr.get_interface()):
+            return None
+
+        # The primary IP address of the device, compared as parsed
+        device = interface.get_device()
+        primary = device is not None and device.primary_ip is not None and \
+                  device.primary_ip[:2] == (ip_addr.version, ip_addr.ip_int)
+
+        return (interface.get_mac_address(),
+                interface.get_device_name(),
+                interface.get_name(),
+                ip_addr.get_ip_address(),
+                primary)
+
+    def get_hosts(self, prefix: IPv4Network | IPv6Network) -> list[tuple[str | None, str, str, IPv4Address | IPv6Address, bool]]:
+        if (hosts := self.hosts.get(prefix)) is not None:
+            return hosts
+
+        hosts = []
+        for ip_addr in self.prefix_index.get_bucket(prefix).get_ip_addresses():
+            if ip_addr.get_status() == 'active' and (host := self.make_host(ip_addr)):
+                hosts.append(host)
+
+        self.hosts[prefix] = hosts
+        return hosts
+
+    def invalidate(self, prefixes: set[IPv4Network | IPv6Network]) -> None:
+        # Joined again on next use
+        for prefix in prefixes:
+            self.hosts.pop(prefix, None)
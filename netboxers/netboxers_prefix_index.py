@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+from bisect import bisect_left, bisect_right
+from ipaddress import IPv4Network, IPv6Network
+
+from netboxers.models.netbox import Netbox_Prefix, Netbox_IP_Address, Netbox_IP_Range
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Netbox_Sorted_Addresses:
+    """Addresses of one IP version as integers, sorted once, to find the
+    addresses between two bounds with a binary search.
+
+    IPv4 addresses are held in a NumPy uint32 array when NumPy is installed,
+    and the bounds of all prefixes are searched in one vectorized call.
+    IPv6 addresses, and IPv4 addresses without NumPy, are bisected in a
+    sorted list of ints.
+    """
+
+    def __init__(self, version: int, positions: list[int], values: list[int]):
+        self.vectorized = numpy is not None and version == 4
+
+        if self.vectorized:
+            array = numpy.array(values, dtype=numpy.uint32)
+            order = numpy.argsort(array, kind='stable')
+            self.values = array[order]
+            self.positions = numpy.array(positions, dtype=numpy.int64)[order]
+        else:
+            order = sorted(range(len(values)), key=values.__getitem__)
+            self.values = [values[n] for n in order]
+            self.positions = [positions[n] for n in order]
+
+    def __repr__(self) -> str:
+        return f"Netbox_Sorted_Addresses: {len(self.values)} vectorized: {self.vectorized}"
+
+    def find(self, bounds: list[tuple[int, int]]) -> list:
+        # Positions of the addresses within each pair of bounds, sorted by address
+        if not self.vectorized:
+            return [self.positions[bisect_left(self.values, low):bisect_right(self.values, high)] for low, high in bounds]
+
+        starts = numpy.searchsorted(self.values, numpy.array([low for low, _ in bounds], dtype=numpy.uint32), side='left')
+        ends = numpy.searchsorted(self.values, numpy.array([high for _, high in bounds], dtype=numpy.uint32), side='right')
+        return [self.positions[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+    @staticmethod
+    def in_cache_order(positions) -> list[int]:
+        return sorted(positions if isinstance(positions, list) else positions.tolist())
+
+
+class Netbox_Prefix_Bucket:
+    """All IP addresses and IP ranges contained in one prefix, in cache order.
+
+    The index only hands over the positions of the addresses and ranges, the
+    bucket is filled from those on first use.
+    """
+
+    def __init__(self, prefix: IPv4Network | IPv6Network, index: 'Netbox_Prefix_Index'):
+        self.prefix: IPv4Network | IPv6Network = prefix
+        self.index = index
+        self.address_positions = []
+        self.range_positions = []
+        self.loaded = False
+
+        self.ip_addresses: list[Netbox_IP_Address] = []
+        self.ip_ranges: list[Netbox_IP_Range] = []
+        self.tagged_ip_addresses: dict[str, list[Netbox_IP_Address]] = {}
+        self.tagged_ip_ranges: dict[str, list[Netbox_IP_Range]] = {}
+
+    def __repr__(self) -> str:
+        self.load()
+        return f"Netbox_Prefix_Bucket: {self.prefix} addresses: {len(self.ip_addresses)} ranges: {len(self.ip_ranges)}"
+
+    def set_positions(self, address_positions, range_positions) -> None:
+        self.address_positions = address_positions
+        self.range_positions = range_positions
+
+    def reset(self) -> None:
+        # Filled again on next use, after the addresses or ranges in it changed
+        self.loaded = False
+        self.ip_addresses = []
+        self.ip_ranges = []
+        self.tagged_ip_addresses = {}
+        self.tagged_ip_ranges = {}
+
+    def load(self) -> None:
+        if self.loaded:
+            return
+        self.loaded = True
+
+        for n in Netbox_Sorted_Addresses.in_cache_order(self.address_positions):
+            self.add_ip_address(self.index.ip_addresses[n])
+
+        # Found on the begin address, the end address must be in the prefix too
+        broadcast = int(self.prefix.broadcast_address)
+        for n in Netbox_Sorted_Addresses.in_cache_order(self.range_positions):
+            if (ip_range := self.index.ip_ranges[n]).end_int <= broadcast:
+                self.add_ip_range(ip_range)
+
+    def add_ip_address(self, ip_addr: Netbox_IP_Address) -> None:
+        self.ip_addresses.append(ip_addr)
+        for tag in ip_addr.tags:
+            self.tagged_ip_addresses.setdefault(tag, []).append(ip_addr)
+
+    def add_ip_range(self, ip_range: Netbox_IP_Range) -> None:
+        self.ip_ranges.append(ip_range)
+        for tag in ip_range.tags:
+            self.tagged_ip_ranges.setdefault(tag, []).append(ip_range)
+
+    def get_ip_addresses(self) -> list[Netbox_IP_Address]:
+        self.load()
+        return self.ip_addresses
+
+    def get_ip_addresses_by_tag(self, tag_name: str) -> list[Netbox_IP_Address]:
+        self.load()
+        return self.tagged_ip_addresses.get(tag_name, [])
+
+    def get_ip_ranges(self) -> list[Netbox_IP_Range]:
+        self.load()
+        return self.ip_ranges
+
+    def get_ip_ranges_by_tag(self, tag_name: str) -> list[Netbox_IP_Range]:
+        self.load()
+        return self.tagged_ip_ranges.get(tag_name, [])
+
+
+class Netbox_Prefix_Index:
+    """Containment index of IP addresses and IP ranges per prefix.
+
+    The addresses and the begin of the ranges, already parsed to integers by
+    the records, are sorted once per IP version. The addresses of a prefix
+    are then the run between its network and broadcast address, found with
+    a binary search for all prefixes at once, see Netbox_Sorted_Addresses.
+
+    After IP addresses or ranges are patched into the records, update()
+    sorts again and empties only the buckets of the prefixes holding the
+    changes.
+    """
+
+    def __init__(self,
+                 prefixes: list[Netbox_Prefix] | None,
+                 ip_addresses: list[Netbox_IP_Address] | None,
+                 ip_ranges: list[Netbox_IP_Range] | None):
+        # The lists of the records themselves, patched in place
+        self.ip_addresses = ip_addresses if ip_addresses is not None else []
+        self.ip_ranges = ip_ranges if ip_ranges is not None else []
+
+        self.buckets: dict[tuple[int, int, int], Netbox_Prefix_Bucket] = {}
+        self.prefixlens: dict[int, set[int]] = {4: set(), 6: set()}
+        for p in prefixes or []:
+            self.add_prefix(p.get_prefix())
+
+        self.sorted_addresses: dict[int, Netbox_Sorted_Addresses] = {}
+        self.sorted_ranges: dict[int, Netbox_Sorted_Addresses] = {}
+        self.sort()
+        for version in (4, 6):
+            buckets = [bucket for bucket in self.buckets.values() if bucket.prefix.version == version]
+            self.fill_buckets(version, buckets)
+
+    def __repr__(self) -> str:
+        return f"Netbox_Prefix_Index: prefixes: {len(self.buckets)}"
+
+    @staticmethod
+    def make_key(version: int, ip_int: int, prefixlen: int) -> tuple[int, int, int]:
+        max_prefixlen = 32 if version == 4 else 128
+        return (version, ip_int >> (max_prefixlen - prefixlen), prefixlen)
+
+    def sort(self) -> None:
+        for version in (4, 6):
+            positions = [n for n, ip_addr in enumerate(self.ip_addresses) if ip_addr.version == version]
+            self.sorted_addresses[version] = Netbox_Sorted_Addresses(
+                version, positions, [self.ip_addresses[n].ip_int for n in positions])
+
+            positions = [n for n, ip_range in enumerate(self.ip_ranges) if ip_range.version == version]
+            self.sorted_ranges[version] = Netbox_Sorted_Addresses(
+                version, positions, [self.ip_ranges[n].start_int for n in positions])
+
+    def add_prefix(self, prefix: IPv4Network | IPv6Network) -> Netbox_Prefix_Bucket:
+        key = self.make_key(prefix.version, int(prefix.network_address), prefix.prefixlen)
+        if key not in self.buckets:
+            self.buckets[key] = Netbox_Prefix_Bucket(prefix, self)
+            self.prefixlens[prefix.version].add(prefix.prefixlen)
+        return self.buckets[key]
+
+    def find_buckets(self, version: int, ip_int: int) -> list[Netbox_Prefix_Bucket]:
+        # The buckets of all prefixes holding the address, one lookup per prefix length in use
+        return [bucket for prefixlen in self.prefixlens[version]
+                if (bucket := self.buckets.get(self.make_key(version, ip_int, prefixlen)))]
+
+    def find_prefixes(self, changes: list[tuple[int, int, int]]) -> set[IPv4Network | IPv6Network]:
+        # A range is held by the prefix holding its begin address, see Netbox_Prefix_Bucket.load()
+        return {bucket.prefix for version, first, _ in changes for bucket in self.find_buckets(version, first)}
+
+    def update(self, changes: list[tuple[int, int, int]], moved: bool) -> set[IPv4Network | IPv6Network]:
+        """Bring the index up to date after the records were patched. The
+        buckets of the prefixes holding a change are emptied, and filled
+        again on next use. The other buckets keep what they hold.
+
+        Args:
+            changes (list[tuple[int, int, int]]): IP version, first and last address of the changes
+            moved (bool): IP addresses or ranges were added, removed or given another address
+
+        Returns:
+            set[IPv4Network | IPv6Network]: Prefixes holding a change
+        """
+        buckets = {id(bucket): bucket for version, first, _ in changes for bucket in self.find_buckets(version, first)}
+        for bucket in buckets.values():
+            bucket.reset()
+
+        # After a sort the positions of every bucket not filled yet are taken
+        # anew, the filled buckets hold the records themselves
+        refill = list(buckets.values())
+        if moved:
+            self.sort()
+            refill = [bucket for bucket in self.buckets.values() if not bucket.loaded]
+        for version in (4, 6):
+            self.fill_buckets(version, [bucket for bucket in refill if bucket.prefix.version == version])
+
+        return {bucket.prefix for bucket in buckets.values()}
+
+    def fill_buckets(self, version: int, buckets: list[Netbox_Prefix_Bucket]) -> None:
+        bounds = [(int(bucket.prefix.network_address), int(bucket.prefix.broadcast_address)) for bucket in buckets]
+        for bucket, address_positions, range_positions in zip(buckets,
+                                                               self.sorted_addresses[version].find(bounds),
+                                                               self.sorted_ranges[version].find(bounds)):
+            bucket.set_positions(address_positions, range_positions)
+
+    def get_bucket(self, prefix: IPv4Network | IPv6Network) -> Netbox_Prefix_Bucket:
+        key = self.make_key(prefix.version, int(prefix.network_address), prefix.prefixlen)
+        if bucket := self.buckets.get(key):
+            return bucket
+
+        # Not a prefix from NetBox, searched on its own and not kept
+        bucket = Netbox_Prefix_Bucket(prefix, self)
+        self.fill_buckets(prefix.version, [bucket])
+        return bucket
@@ -1,9 +1,65 @@
 #!/usr/bin/env python3
 
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
 from ipaddress import IPv4Network, IPv6Network, IPv4Address, IPv6Address, IPv4Interface, IPv6Interface, ip_interface
-from netboxers.models.netbox import Netbox_Prefix
-from typing import Any
+from netboxers.models.netbox import Netbox_Prefix, Netbox_Device, Netbox_IP_Address
+from netboxers.netboxers_cache import Netbox_Cache
+from netboxers.netboxers_stats import Netbox_HTTP_Stats
+from netboxers.netboxers_snapshot import read_snapshot, write_snapshot, get_snapshot_age
+from netboxers.netboxers_stream import Netbox_JSON_Stream
+from netboxers.netboxers_scheduler import Netbox_Request_Scheduler, RETRY_STATUS_CODES
+from typing import Any, Iterator
+
+
+# Endpoints loaded into the cache by prefill_cache()
+PREFILL_ENDPOINTS = [
+    "dcim/devices/",
+    "virtualization/virtual-machines/",
+    "virtualization/interfaces/",
+    "dcim/interfaces/",
+    "ipam/prefixes/",
+    "ipam/ip-addresses/",
+    "ipam/ip-ranges/",
+]
+
+# Bytes read from the socket at a time when streaming a response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Page size asked for when probing the largest page size NetBox serves
+PAGE_SIZE_PROBE = 1000000
+
+# Object type of the endpoints as recorded in the NetBox changelog
+ENDPOINT_OBJECT_TYPES = {
+    "dcim/devices/":                    "dcim.device",
+    "virtualization/virtual-machines/": "virtualization.virtualmachine",
+    "virtualization/interfaces/":       "virtualization.vminterface",
+    "dcim/interfaces/":                 "dcim.interface",
+    "ipam/prefixes/":                   "ipam.prefix",
+    "ipam/ip-addresses/":               "ipam.ipaddress",
+    "ipam/ip-ranges/":                  "ipam.iprange",
+}
+
+# The one object changed last tells whether an endpoint changed, see probe_endpoint()
+PROBE_PARAMETERS = {'limit': 1, 'ordering': '-last_updated'}
+
+# Fields used from each endpoint. Requested with 'fields=' to keep NetBox
+# from serializing (and us from parsing) everything else.
+ENDPOINT_FIELDS = {
+    "dcim/devices/":                    ["id", "name", "status", "primary_ip", "last_updated"],
+    "virtualization/virtual-machines/": ["id", "name", "status", "primary_ip", "last_updated"],
+    "virtualization/interfaces/":       ["id", "name", "virtual_machine", "mac_address", "last_updated"],
+    "dcim/interfaces/":                 ["id", "name", "device", "mac_address", "last_updated"],
+    "ipam/prefixes/":                   ["id", "prefix", "status", "vrf", "scope", "vlan", "role", "is_pool",
+                                         "tags", "last_updated"],
+    "ipam/ip-addresses/":               ["id", "address", "status", "family", "dns_name", "assigned_object_type",
+                                         "assigned_object", "tags", "last_updated"],
+    "ipam/ip-ranges/":                  ["id", "start_address", "end_address", "status", "tags", "last_updated"],
+    "extras/object-changes/":           ["id", "action", "changed_object_type", "changed_object_id", "time"],
+}
 
 
 def strip_query(ctx: dict, query: str):
@@ -14,40 +70,149 @@ def strip_query(ctx: dict, query: str):
 
     return query
 
-def query_netbox_call(ctx: dict, query: str, req_parameters: dict | None = None):
+def get_http_session(ctx: dict) -> requests.Session:
+    # One session is shared by all threads, size its connection pool to match
     if not 'http_session_handle' in ctx:
-        ctx['http_session_handle'] = requests.Session()
+        pool_size = len(PREFILL_ENDPOINTS) * ctx.get('generic_concurrency', 1)
+
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(pool_maxsize=pool_size))
+        session.mount('https://', HTTPAdapter(pool_maxsize=pool_size))
+        ctx['http_session_handle'] = session
+
+    return ctx['http_session_handle']
+
+
+def get_http_stats(ctx: dict) -> Netbox_HTTP_Stats:
+    if not 'http_stats' in ctx:
+        ctx['http_stats'] = Netbox_HTTP_Stats()
+
+    return ctx['http_stats']
 
-    session = ctx['http_session_handle']
 
+def get_request_scheduler(ctx: dict) -> Netbox_Request_Scheduler:
+    # Shared by all threads, the rate limit is global
+    if not 'http_scheduler' in ctx:
+        ctx['http_scheduler'] = Netbox_Request_Scheduler(rate_limit=ctx.get('generic_rate_limit', 0.0),
+                                                         max_retries=ctx.get('generic_max_retries', 5),
+                                                         deadline=ctx.get('generic_request_deadline', 120.0),
+                                                         timeout=ctx.get('generic_http_timeout', 10.0))
+
+    return ctx['http_scheduler']
+
+
+def get_request_headers(ctx: dict) -> dict:
     req_headers = {}
     req_headers['Authorization'] = " ".join(["Token", ctx['generic_authkey']])
     req_headers['Content-Type'] = "application/json"
-    req_headers['Accept'] = "application/json; indent=4"
+    req_headers['Accept'] = "application/json"
+    return req_headers
+
+
+def uses_async_backend(ctx: dict) -> bool:
+    return ctx.get('generic_http_backend', 'requests') == 'httpx'
+
+
+def get_async_client(ctx: dict):
+    # Imported here, the async client builds on this module
+    from netboxers.netboxers_async import Netbox_Async_Client
+
+    if not 'http_async_client' in ctx:
+        ctx['http_async_client'] = Netbox_Async_Client(ctx)
+
+    return ctx['http_async_client']
+
+
+def close_async_client(ctx: dict) -> None:
+    # Closes the connection pool and the event loop, a later query opens a new client
+    if client := ctx.pop('http_async_client', None):
+        client.close()
+
+
+def send_http_request(ctx: dict, method: str, url: str, **kwargs: Any) -> requests.Response:
+    """Send a request to NetBox through the request scheduler. Waits for the
+    rate limit, and retries on connection errors, timeouts and the status
+    codes in RETRY_STATUS_CODES until the retries or the deadline run out.
+
+    Args:
+        ctx (dict): Context
+        method (str): HTTP method
+        url (str): Full URL
+        **kwargs (Any): Passed on to requests, extra 'headers' are merged into the defaults
+
+    Returns:
+        requests.Response: Response of the last attempt, status not checked
+    """
+    session = get_http_session(ctx)
+    scheduler = get_request_scheduler(ctx)
+    deadline = scheduler.get_deadline()
+    headers = {**get_request_headers(ctx), **(kwargs.pop('headers', None) or {})}
+
+    attempt = 0
+    while True:
+        time.sleep(scheduler.reserve())
+
+        try:
+            get_req = session.request(method, url,
+                                      timeout=scheduler.get_timeout(deadline),
+                                      headers=headers,
+                                      **kwargs)
+            if get_req.status_code not in RETRY_STATUS_CODES:
+                return get_req
+
+            reason = f"HTTP {get_req.status_code}"
+            delay = scheduler.get_backoff(attempt, get_req.headers.get('Retry-After'))
+            if not scheduler.should_retry(attempt, delay, deadline):
+                return get_req
+            get_req.close()
+
+        except (requests.ConnectionError, requests.Timeout) as e:
+            reason = type(e).__name__
+            delay = scheduler.get_backoff(attempt)
+            if not scheduler.should_retry(attempt, delay, deadline):
+                raise
+
+        attempt += 1
+        print(f"Warning: {reason} on \'{urlparse(url).path}\', retry {attempt} of {scheduler.max_retries} in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def send_request(ctx: dict,
+                 query_stripped: str,
+                 req_parameters: dict | None = None,
+                 stream: bool = False,
+                 headers: dict | None = None) -> requests.Response:
+    # GET an API path, relative to /api/
+    return send_http_request(ctx, 'GET', '{}/api/{}'.format(ctx['generic_netbox_base_url'], query_stripped),
+                             params=req_parameters,
+                             stream=stream,
+                             headers=headers)
+
+
+def query_netbox_call(ctx: dict, query: str, req_parameters: dict | None = None):
+    if uses_async_backend(ctx):
+        return get_async_client(ctx).run_call(query, req_parameters)
 
     query_stripped = strip_query(ctx, query)
 
     if ctx['generic_verbose']:
         print(query_stripped)
 
-    get_req = session.get('{}/api/{}'.format(ctx['generic_netbox_base_url'], query_stripped),
-                           timeout=10,
-                           headers=req_headers,
-                           params=req_parameters)
+    get_req = send_request(ctx, query_stripped, req_parameters)
     get_req.raise_for_status()
 
     if ctx['generic_verbose']:
         print(get_req.text)
 
     # Results retrieved
-    return get_req.json()
+    start = time.perf_counter()
+    response = get_req.json()
 
+    get_http_stats(ctx).record(query_stripped.split('?')[0], len(get_req.content), time.perf_counter() - start)
+    return response
 
-def query_netbox(ctx: dict, query: str, req_parameters: dict | None = None):
-
-    # Results retrieved
-    response = query_netbox_call(ctx, query, req_parameters)
 
+def query_netbox_serial(ctx: dict, query: str, req_parameters: dict | None, response: dict) -> dict:
     # Merge response in memory
     req_next = response # setups for loop
     while 'next' in req_next and req_next['next'] and len(req_next['next']) > 0:
@@ -64,12 +229,151 @@ def query_netbox(ctx: dict, query: str, req_parameters: dict | None = None):
     return response
 
 
+def query_netbox_parallel(ctx: dict, query: str, req_parameters: dict | None, response: dict) -> dict:
+    """Fetch all remaining pages of a paginated query through a bounded worker
+    pool. The page size is taken from the first page, the number of pages from
+    its 'count'. Results are merged in page order.
+
+    Args:
+        ctx (dict): Context
+        query (str): Query as used for the first page
+        req_parameters (dict | None): Query parameters used for the first page
+        response (dict): The first page
+
+    Returns:
+        dict: First page with the results of all pages merged into it
+    """
+    page_size = len(response['results'])
+    if page_size == 0:
+        return response
+
+    def fetch_page(offset: int) -> list:
+        page_parameters = dict(req_parameters or {})
+        page_parameters['limit'] = page_size
+        page_parameters['offset'] = offset
+        return query_netbox_call(ctx, query, page_parameters)['results']
+
+    offsets = range(page_size, response['count'], page_size)
+    with ThreadPoolExecutor(max_workers=ctx['generic_concurrency']) as executor:
+        for results in executor.map(fetch_page, offsets):
+            response['results'].extend(results)
+
+    return response
+
+
+def query_netbox(ctx: dict, query: str, req_parameters: dict | None = None):
+    if uses_async_backend(ctx):
+        return get_async_client(ctx).run_query(query, req_parameters)
+
+    # Results retrieved
+    response = query_netbox_call(ctx, query, req_parameters)
+
+    if not response.get('next'):
+        return response
+
+    # Fetch the remaining pages one by one or in parallel
+    if ctx.get('generic_concurrency', 1) > 1:
+        return query_netbox_parallel(ctx, query, req_parameters, response)
+
+    return query_netbox_serial(ctx, query, req_parameters, response)
+
+
+def probe_max_page_size(ctx: dict) -> int | None:
+    """Find the largest page NetBox serves. NetBox clamps 'limit' to its
+    MAX_PAGE_SIZE, and the 'previous' link of a page carries the clamped
+    limit. Asking for a huge page far past the end returns no results, so
+    the probe is cheap.
+
+    Args:
+        ctx (dict): Context
+
+    Returns:
+        int | None: Largest page size, or None when it could not be found
+    """
+    response = query_netbox_call(ctx, "ipam/prefixes/", {'fields': 'id',
+                                                         'limit': PAGE_SIZE_PROBE,
+                                                         'offset': PAGE_SIZE_PROBE})
+    if previous := response.get('previous'):
+        if limit := parse_qs(urlparse(previous).query).get('limit'):
+            return int(limit[0])
+
+    print("Warning: could not determine the maximum page size of NetBox, using its default.")
+    return None
+
+
+def get_page_size(ctx: dict) -> int | None:
+    page_size = ctx.get('generic_page_size')
+
+    if page_size == 'auto':
+        if 'page_size_probed' not in ctx:
+            ctx['page_size_probed'] = probe_max_page_size(ctx)
+            print(f"Info: Using the maximum page size of NetBox: {ctx['page_size_probed']}")
+        return ctx['page_size_probed']
+
+    return page_size
+
+
+def query_netbox_stream(ctx: dict, query: str, req_parameters: dict | None = None) -> Iterator[dict]:
+    """Yield the results of all pages of a query one by one, parsed from the
+    response body while it arrives. Memory use is bounded by the objects the
+    caller keeps, not by the size of the pages. Pages are fetched serially,
+    following 'next'.
+
+    Args:
+        ctx (dict): Context
+        query (str): Query
+        req_parameters (dict | None): Query parameters of the first page
+
+    Yields:
+        Iterator[dict]: Result objects
+    """
+    next_query: str | None = query
+    while next_query:
+        query_stripped = strip_query(ctx, next_query)
+
+        if ctx['generic_verbose']:
+            print(query_stripped)
+
+        nbytes = 0
+        with send_request(ctx, query_stripped, req_parameters, stream=True) as get_req:
+            get_req.raise_for_status()
+
+            def counted_chunks():
+                nonlocal nbytes
+                for chunk in get_req.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    nbytes += len(chunk)
+                    yield chunk
+
+            page = Netbox_JSON_Stream(counted_chunks())
+            yield from page
+
+        get_http_stats(ctx).record(query_stripped.split('?')[0], nbytes)
+
+        # The next link holds all query parameters
+        next_query = page.meta.get('next')
+        req_parameters = None
+
+
+def netbox_query_stream(ctx: dict,
+                        subquery: str,
+                        **kwargs: Any) -> Iterator[dict]:
+    # Setup
+    parameters = dict(kwargs)
+    if 'limit' not in parameters and (page_size := get_page_size(ctx)):
+        parameters['limit'] = page_size
+
+    # Query
+    return query_netbox_stream(ctx, subquery, parameters)
+
+
 # Generic query
 def netbox_query_list(ctx: dict,
                       subquery: str,
                       **kwargs: Any) -> dict | list | None:
     # Setup
     parameters = dict(kwargs)
+    if 'limit' not in parameters and (page_size := get_page_size(ctx)):
+        parameters['limit'] = page_size
 
     # Query
     results = query_netbox(ctx, subquery, parameters)
@@ -93,19 +397,11 @@ def get_net_default_gateway_from_prefix(ctx: dict,
         IPv4Interface | IPv6Interface | None: ip interface or None
     """
 
-    requested_addrs = cache_netbox_query_list(ctx, "ipam/ip-addresses/")
-    if not requested_addrs:
-        return None
-
-    for ip_addr in requested_addrs:
-        ip_iface = ip_interface(ip_addr["address"])
-
-        if ip_iface not in prefix:
-            continue
+    bucket = ctx['cache'].get_prefix_index().get_bucket(prefix)
 
-        for tag in ip_addr.get("tags", []):
-            if tag["name"] == ctx["dnsmasq_dhcp_default_gateway_per_prefix_identified_by_tag"]:
-                return ip_iface
+    tagged = bucket.get_ip_addresses_by_tag(ctx["dnsmasq_dhcp_default_gateway_per_prefix_identified_by_tag"])
+    if tagged:
+        return tagged[0].get_ip_interface()
 
     return None
 
@@ -123,162 +419,374 @@ def get_dns_from_net_default_gateway_from_prefix(ctx: dict,
     Returns:
         str | None: ip address or None
     """
-    results = netbox_query_list(ctx, 
-                           "ipam/ip-addresses/", 
-                           parent = str(prefix), 
-                           tag = ctx['dnsmasq_dhcp_default_gateway_per_prefix_identified_by_tag'])
-    if results and (ip_str := results[0]['dns_name']) and ip_str:
+    bucket = ctx['cache'].get_prefix_index().get_bucket(prefix)
+
+    tagged = bucket.get_ip_addresses_by_tag(ctx['dnsmasq_dhcp_default_gateway_per_prefix_identified_by_tag'])
+    if tagged and (ip_str := tagged[0].get_dns_name()):
         return ip_interface(ip_str)
     return None
 
 
 def get_range_from_prefix(ctx: dict,
                           prefix: IPv4Network | IPv6Network) -> tuple[IPv4Address | IPv6Address, IPv4Address | IPv6Address] | None:
-    if results := netbox_query_list(ctx,
-                               "ipam/ip-ranges/",
-                               status = 'active',
-                               tag = ctx['dnsmasq_dhcp_selected_range_in_prefix_by_tag']):
-        # filter range to match by the prefix
-        for range in results:
-            begin_addr = ip_interface(range['start_address'])
-            end_addr   = ip_interface(range['end_address'])
-            
-            if begin_addr in prefix and end_addr in prefix:
-                return begin_addr.ip, end_addr.ip
+    bucket = ctx['cache'].get_prefix_index().get_bucket(prefix)
+
+    # The bucket only holds ranges with both ends in the prefix
+    for ip_range in bucket.get_ip_ranges_by_tag(ctx['dnsmasq_dhcp_selected_range_in_prefix_by_tag']):
+        if ip_range.is_active():
+            return ip_range.get_start_address(), ip_range.get_end_address()
 
     # No range found that fits the prefix.
     return None
 
 
-def get_assigned_interface_from_ip_address(ctx: dict, ip_addr: dict) -> dict | None:
-    assigned_id = ip_addr.get('assigned_object', {}).get('id')
-    assigned_object_type = ip_addr.get('assigned_object_type', {})
-    if assigned_object_type == 'dcim.interface':
-        if assigned_id:
-            return next((i for i in ctx['cache']['dcim/interfaces/'] if i['id'] == assigned_id), None)
-    elif assigned_object_type == 'virtualization.vminterface':
-        if assigned_id:
-            return next((i for i in ctx['cache']['virtualization/interfaces/'] if i['id'] == assigned_id), None)
-    else:
-        raise ValueError("Unknown associatation detected")
+# dhcp-host=vrf_204_IoT_net_vlan_204,24:62:AB:48:F0:07,tasmota_switch_4_wlan0,192.168.204.104,90m
+def get_hosts_from_prefix(ctx: dict,
+                          prefix: IPv4Network | IPv6Network) -> list[tuple[str | None, str, str, IPv4Address | IPv6Address, bool]] | None:
+    """Get the hosts in the prefix from the host inventory, joined once per
+    prefix and shared by the DHCP sections and the forward zone.
 
-    return None
+    Args:
+        ctx (dict): Context
+        prefix (IPv4Network | IPv6Network): Prefix in the form 192.168.1.0/24
+
+    Returns:
+        list[tuple[str | None, str, str, IPv4Address | IPv6Address, bool]] | None: MAC address,
+        device name, interface name, IP address and primary IP flag of each host, or None
+    """
+    return ctx['cache'].get_records().get_host_inventory().get_hosts(prefix) or None
 
 
-# dhcp-host=vrf_204_IoT_net_vlan_204,24:62:AB:48:F0:07,tasmota_switch_4_wlan0,192.168.204.104,90m
-def get_hosts_from_prefix(ctx: dict,
-                          prefix: IPv4Network | IPv6Network) -> list[tuple[str | None, str, str, IPv4Address | IPv6Address, dict]] | None:
+def get_status_of_devvm_from_ipaddresses_obj_from_dev_vm_list(ctx: dict, 
+                                                              ip_addr_obj: Netbox_IP_Address, 
+                                                              devices: dict[int, Netbox_Device] | None, 
+                                                              vms: dict[int, Netbox_Device] | None) -> str | None:
+    # The devices and vms are indexed by their id
+    match = None
 
-    hosts_list: list[tuple[str | None, str, str, IPv4Address | IPv6Address, dict]] = []
-                          
-    # From IP addr go to assigned_object: interface['url'] for interface object. 
-    unfiltered_ip_addrs = cache_netbox_query_list(ctx, "ipam/ip-addresses/")
-    if not unfiltered_ip_addrs:
+    if not ip_addr_obj.is_assigned():
+        # No assignment of IP to a device.
         return None
 
-    ip_addrs_in_prefix = [ip_addr for ip_addr in unfiltered_ip_addrs 
-                                    if ip_addr['status']['value'] == 'active' and 
-                                    ip_interface(ip_addr['address']).ip in prefix] 
-    if not ip_addrs_in_prefix:
+    if devices and ip_addr_obj.parent_type == 'device':
+        match = devices.get(ip_addr_obj.parent_id)
+
+    elif vms and ip_addr_obj.parent_type == 'virtual_machine':
+        match = vms.get(ip_addr_obj.parent_id)
+
+    if not match:
         return None
-        
-    
-    for ip_addr in ip_addrs_in_prefix:
-        interface_obj = get_assigned_interface_from_ip_address(ctx, ip_addr)
-        if not interface_obj:
+
+    return match.get_status()
+
+
+def get_field_projection(ctx: dict, endpoint: str) -> dict:
+    # Query parameters limiting the response to the fields used
+    if not ctx.get('generic_field_projection', True) or endpoint not in ENDPOINT_FIELDS:
+        return {}
+
+    return {'fields': ",".join(ENDPOINT_FIELDS[endpoint])}
+
+
+def load_endpoint(ctx: dict, endpoint: str, parameters: dict) -> tuple[list | None, float]:
+    start = time.perf_counter()
+    if ctx.get('generic_streaming'):
+        results = list(netbox_query_stream(ctx, endpoint, **get_field_projection(ctx, endpoint), **parameters)) or None
+    else:
+        results = netbox_query_list(ctx, endpoint, **get_field_projection(ctx, endpoint), **parameters)
+    return results, time.perf_counter() - start
+
+
+def load_endpoints(ctx: dict,
+                   parameters: dict[str, dict] | None = None,
+                   selection: list[str] | None = None) -> dict[str, list | None]:
+    """Load all PREFILL_ENDPOINTS, or a selection of them, in parallel.
+
+    Args:
+        ctx (dict): Context
+        parameters (dict[str, dict] | None): Optional query parameters per endpoint
+        selection (list[str] | None): Endpoints to load, default all PREFILL_ENDPOINTS
+
+    Returns:
+        dict[str, list | None]: Results per endpoint
+    """
+    endpoints = {}
+    parameters = parameters or {}
+    selection = PREFILL_ENDPOINTS if selection is None else selection
+    start = time.perf_counter()
+
+    if not selection:
+        return endpoints
+
+    if ctx.get('generic_loader') == 'graphql':
+        # Imported here, the GraphQL loader builds on this module
+        from netboxers.netboxers_graphql import load_endpoints_graphql
+        return load_endpoints_graphql(ctx, selection)
+
+    if uses_async_backend(ctx):
+        # All endpoints and their pages on one event loop
+        page_size = get_page_size(ctx)
+        loaded = get_async_client(ctx).run_load_endpoints(
+                    [(endpoint, {**({'limit': page_size} if page_size else {}),
+                                 **get_field_projection(ctx, endpoint),
+                                 **parameters.get(endpoint, {})}) for endpoint in selection])
+    else:
+        # Create the shared session and scheduler, and probe the page size before the threads need them
+        get_http_session(ctx)
+        get_request_scheduler(ctx)
+        get_page_size(ctx)
+
+        # The endpoints are independent, load them all at once
+        with ThreadPoolExecutor(max_workers=len(selection)) as executor:
+            loaded = list(executor.map(lambda endpoint: load_endpoint(ctx, endpoint, parameters.get(endpoint, {})),
+                                       selection))
+
+    for endpoint, (results, elapsed) in zip(selection, loaded):
+        print(f"Info: Loaded: \'{endpoint}\' with {len(results) if results else 0} objects in {elapsed:.2f}s")
+        endpoints[endpoint] = results
+
+    stats = get_http_stats(ctx)
+    for endpoint in selection:
+        print(f"Info: Transferred: \'{endpoint}\' {stats.get_bytes(endpoint) / 1024:.1f} KiB "
+              f"in {stats.get_request_count(endpoint)} requests, JSON parsed in {stats.get_parse_time(endpoint):.3f}s")
+
+    print(f"Info: Done loading NetBox data in {time.perf_counter() - start:.2f}s.")
+    return endpoints
+
+
+def get_sync_state(endpoints: dict[str, list | None], changes_since: str | None = None) -> dict:
+    """High-water marks of the loaded data: the latest 'last_updated' per
+    endpoint, and the moment from which deletions must be fetched from the
+    changelog on the next delta sync.
+    """
+    last_updated = {}
+    for endpoint, results in endpoints.items():
+        last_updated[endpoint] = max((obj['last_updated'] for obj in results or [] if obj.get('last_updated')),
+                                     default=None)
+
+    # Anything deleted after this load has a changelog time past every
+    # 'last_updated' seen now.
+    changes_since = max([t for t in [changes_since, *last_updated.values()] if t], default=None)
+
+    return {'last_updated': last_updated, 'object_changes': changes_since}
+
+
+def load_endpoints_delta(ctx: dict,
+                         snapshot: dict,
+                         unchanged: set[str] | None = None) -> tuple[dict[str, list | None], dict,
+                                                                     dict[str, set[int] | None]]:
+    """Update the snapshot with the objects changed and deleted since it was
+    taken. Endpoints without a high-water mark are loaded in full.
+
+    Args:
+        ctx (dict): Context
+        snapshot (dict): Snapshot with endpoints and sync state
+        unchanged (set[str] | None): Endpoints known to be unchanged, taken from the snapshot as is
+
+    Returns:
+        tuple[dict[str, list | None], dict, dict[str, set[int] | None]]: Results per endpoint, the new
+        sync state and the ids of the objects changed or deleted per endpoint, None when loaded in full
+    """
+    last_updated = snapshot['sync_state']['last_updated']
+    unchanged = unchanged or set()
+    selection = [endpoint for endpoint in PREFILL_ENDPOINTS if endpoint not in unchanged]
+
+    parameters = {}
+    for endpoint in selection:
+        if endpoint in snapshot['endpoints'] and (since := last_updated.get(endpoint)):
+            parameters[endpoint] = {'last_updated__gte': since}
+
+    print("Info: Delta sync of NetBox data since the snapshot.")
+    changed = load_endpoints(ctx, parameters, selection)
+
+    # Deleted objects only show up in the changelog
+    changes_since = snapshot['sync_state']['object_changes']
+    deletions = []
+    if selection:
+        changes_parameters = {'action': 'delete'}
+        if changes_since:
+            changes_parameters['time_after'] = changes_since
+        deletions = netbox_query_list(ctx, "extras/object-changes/",
+                                      **get_field_projection(ctx, "extras/object-changes/"),
+                                      **changes_parameters) or []
+
+    deleted: dict[str, set[int]] = {}
+    for change in deletions:
+        deleted.setdefault(change['changed_object_type'], set()).add(change['changed_object_id'])
+        changes_since = max(changes_since or change['time'], change['time'])
+
+    # Merge into the snapshot, a fully loaded endpoint replaces it
+    endpoints = {}
+    changed_ids: dict[str, set[int] | None] = {}
+    for endpoint in PREFILL_ENDPOINTS:
+        if endpoint in unchanged:
+            endpoints[endpoint] = snapshot['endpoints'][endpoint]
+            changed_ids[endpoint] = set()
             continue
 
-        mac_addr      = interface_obj.get('mac_address')
-        dev_name      = interface_obj['device']['name'] if interface_obj.get('device') else interface_obj['virtual_machine']['name']
-        if_name       = interface_obj['name']
-        ip            = ip_interface(ip_addr['address']).ip
-        interface_obj = interface_obj
+        if endpoint not in parameters:
+            endpoints[endpoint] = changed[endpoint]
+            changed_ids[endpoint] = None
+            continue
 
-        tup: tuple[str | None, 
-                    str, 
-                    str, 
-                    IPv4Address | IPv6Address, 
-                    dict] = (mac_addr, dev_name, if_name, ip, interface_obj)
+        objects = {obj['id']: obj for obj in snapshot['endpoints'][endpoint] or []}
+        changed_ids[endpoint] = set()
+        for obj in changed[endpoint] or []:
+            # The objects at the high-water mark come again, unchanged
+            if objects.get(obj['id']) != obj:
+                changed_ids[endpoint].add(obj['id'])
+            objects[obj['id']] = obj
+        for obj_id in deleted.get(ENDPOINT_OBJECT_TYPES[endpoint], ()):
+            if objects.pop(obj_id, None) is not None:
+                changed_ids[endpoint].add(obj_id)
 
-        hosts_list.append(tup)
+        print(f"Info: Delta sync: \'{endpoint}\' {len(changed[endpoint] or [])} changed, {len(objects)} objects")
+        endpoints[endpoint] = list(objects.values()) or None
 
-    return hosts_list
+    return endpoints, get_sync_state(endpoints, changes_since), changed_ids
 
 
-def get_status_of_devvm_from_ipaddresses_obj_from_dev_vm_list(ctx: dict, 
-                                                              ip_addr_obj: dict, 
-                                                              devices: list[dict] | None, 
-                                                              vms: list[dict] | None) -> str | None:
-    match = None
+def get_endpoint_fingerprint(response: dict) -> list:
+    # Any change, addition or deletion moves the count or the latest 'last_updated'
+    results = response.get('results') or []
+    return [response.get('count', 0), results[0].get('last_updated') if results else None]
 
-    if not ip_addr_obj.get('assigned_object'):
-        # No assignment of IP to a device.
-        return None
 
-    if devices and \
-        (assigned_object := ip_addr_obj.get('assigned_object')) and \
-        (device := assigned_object.get('device')):
+def get_conditional_headers(validator: dict | None) -> dict:
+    headers = {}
+    if validator and validator.get('etag'):
+        headers['If-None-Match'] = validator['etag']
+    if validator and validator.get('last_modified'):
+        headers['If-Modified-Since'] = validator['last_modified']
+    return headers
 
-        device_id = ip_addr_obj['assigned_object']['device']['id']
-        match = next((item for item in devices if item["id"] == device_id), None)
 
-    elif vms and \
-        (assigned_object := ip_addr_obj.get('assigned_object')) and \
-        (vm := assigned_object.get('virtual_machine')):
+def probe_endpoints(ctx: dict, validators: dict[str, dict]) -> tuple[set[str], dict[str, dict]]:
+    """Ask NetBox which endpoints changed since the validators were taken,
+    with one request per endpoint for only the object changed last. The
+    request is conditional on the ETag and Last-Modified of the previous
+    probe. When NetBox answers anyway, the fingerprint of the answer, the
+    count and the latest 'last_updated', is compared instead.
 
-        vm_id = ip_addr_obj['assigned_object']['virtual_machine']['id']
-        match = next((item for item in vms if item["id"] == vm_id), None)
+    Args:
+        ctx (dict): Context
+        validators (dict[str, dict]): Validators per endpoint from the previous probe
 
-    if not match:
-        return None
+    Returns:
+        tuple[set[str], dict[str, dict]]: Unchanged endpoints and the new validators
+    """
+    parameters = dict(PROBE_PARAMETERS)
+    if ctx.get('generic_field_projection', True):
+        parameters['fields'] = "id,last_updated"
+
+    probes = [(endpoint, parameters, get_conditional_headers(validators.get(endpoint)))
+              for endpoint in PREFILL_ENDPOINTS]
 
-    return match['status']['value']
+    if uses_async_backend(ctx):
+        responses = get_async_client(ctx).run_send_all(probes)
+    else:
+        get_http_session(ctx)
+        get_request_scheduler(ctx)
+        with ThreadPoolExecutor(max_workers=len(probes)) as executor:
+            responses = list(executor.map(lambda probe: send_request(ctx, probe[0], probe[1], headers=probe[2]),
+                                          probes))
+
+    unchanged = set()
+    new_validators = {}
+    for endpoint, get_req in zip(PREFILL_ENDPOINTS, responses):
+        get_http_stats(ctx).record(endpoint, len(get_req.content))
+        validator = validators.get(endpoint)
+
+        if get_req.status_code == 304 and validator:
+            unchanged.add(endpoint)
+            new_validators[endpoint] = validator
+            continue
+
+        get_req.raise_for_status()
+        new_validators[endpoint] = {
+            'etag': get_req.headers.get('ETag'),
+            'last_modified': get_req.headers.get('Last-Modified'),
+            'fingerprint': get_endpoint_fingerprint(get_req.json()),
+        }
+        if validator and validator.get('fingerprint') == new_validators[endpoint]['fingerprint']:
+            unchanged.add(endpoint)
+
+    print(f"Info: Conditional requests: {len(unchanged)} of {len(PREFILL_ENDPOINTS)} endpoints unchanged since the snapshot.")
+    return unchanged, new_validators
 
 
 # Fetch data which is useful multiple times.
 def prefill_cache(ctx: dict) -> dict:
-    ctx['cache'] = {}
+    ctx['cache'] = Netbox_Cache()
 
     print("Info: Loading NetBox data...")
 
-    endpoints = [
-        "dcim/devices/",
-        "virtualization/virtual-machines/",
-        "virtualization/interfaces/",
-        "dcim/interfaces/",
-        "ipam/prefixes/",
-        "ipam/ip-addresses/",
-        "ipam/ip-ranges/",
-    ]
-
-    for endpoint in endpoints:
-        print(f"Info: Loading: \'{endpoint}\'")
-        ctx['cache'][endpoint] = netbox_query_list(ctx, endpoint)    
-
-    print("Info: Done loading NetBox data.")
-    return ctx
+    snapshot = None
+    if snapshot_file := ctx.get('generic_snapshot_file'):
+        snapshot = read_snapshot(snapshot_file)
 
+    # The snapshot holding the data and the ids changed since the snapshot read, when known
+    created = None
+    changed_ids = None
 
-def cache_netbox_query_list(ctx: dict,
-                            subquery: str) -> dict | list | None:
-    
-    if (cache := ctx.get('cache')) and (requested := cache.get(subquery)):
-        return requested
-    
-    return netbox_query_list(ctx, subquery)
+    # Reuse a recent snapshot, or the last snapshot when offline
+    if snapshot and (ctx.get('generic_offline') or get_snapshot_age(snapshot) <= ctx.get('generic_snapshot_ttl', 0)):
+        print(f"Info: Using NetBox data from snapshot \'{snapshot_file}\' of {get_snapshot_age(snapshot):.0f}s old.")
+        endpoints = snapshot['endpoints']
+        created = snapshot['created']
+        changed_ids = {}
+
+    elif ctx.get('generic_offline'):
+        raise ValueError(f"Offline mode requires a NetBox snapshot, none found at \'{snapshot_file}\'")
+
+    else:
+        try:
+            # Probed before loading: a change made in between shows up on the next probe
+            unchanged, validators = set(), {}
+            if ctx.get('generic_conditional_requests'):
+                unchanged, validators = probe_endpoints(ctx, snapshot.get('validators') or {} if snapshot else {})
+
+            if snapshot and snapshot.get('sync_state') and ctx.get('generic_delta_sync'):
+                endpoints, sync_state, changed_ids = load_endpoints_delta(ctx, snapshot, unchanged)
+            else:
+                endpoints = {endpoint: snapshot['endpoints'][endpoint] for endpoint in unchanged}
+                endpoints.update(load_endpoints(ctx, selection=[endpoint for endpoint in PREFILL_ENDPOINTS
+                                                                if endpoint not in unchanged]))
+                sync_state = get_sync_state(endpoints)
+        finally:
+            # Nothing queries NetBox after the prefill, also not in daemon mode
+            close_async_client(ctx)
+
+        if snapshot_file:
+            created = write_snapshot(snapshot_file, endpoints, sync_state, validators)
+
+    for endpoint in PREFILL_ENDPOINTS:
+        ctx['cache'].set_endpoint(endpoint, endpoints.get(endpoint))
+
+    # Normalize once, the daemon keeps the results to patch webhooks into
+    start = time.perf_counter()
+    records = ctx['cache'].get_records()
+    synced = None
+    if changed_ids is not None and all(obj_ids is not None for obj_ids in changed_ids.values()):
+        synced = records.find_changes(snapshot['endpoints'], changed_ids)
+    ctx['cache'].set_snapshot(created, snapshot['created'] if snapshot else None, synced)
+    if not ctx.get('generic_daemon'):
+        ctx['cache'].drop_results()
+    print(f"Info: Normalized the NetBox data in {time.perf_counter() - start:.2f}s: {records}")
+
+    return ctx
 
 
 def fetch_active_prefixes(ctx: dict) -> list[Netbox_Prefix]:
-    # Get prefixes
-    prefixes = cache_netbox_query_list(ctx, "ipam/prefixes/")
+    # Get prefixes, as normalized by prefill_cache()
+    prefixes = ctx['cache'].get_records().prefixes
 
     if not prefixes:
         raise ValueError("No prefixes found in netbox to complete")
 
     # Select which prefixes to work on
     res = []
-    for p in prefixes:
-        np = Netbox_Prefix(p)
+    for np in prefixes:
         if np.is_active():
             res.append(np)
         else:
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+
+from netboxers.models.netbox import Netbox_Prefix, Netbox_Device, Netbox_Interface, Netbox_IP_Address, Netbox_IP_Range, \
+                                   parse_address
+from netboxers.netboxers_prefix_index import Netbox_Prefix_Index
+from netboxers.netboxers_hosts import Netbox_Host_Inventory
+
+
+def copy_record(record: object, source: object) -> None:
+    # Update a record in place, the records pointing to it see the change
+    for slot in type(record).__slots__:
+        setattr(record, slot, getattr(source, slot))
+
+
+class Netbox_Records:
+    """The NetBox endpoints normalized once into typed records.
+
+    Every object is parsed once: the IP addresses to integers, the tags to
+    sets and the status to its value. The foreign keys are resolved to the
+    records they point to, an interface to its device or virtual machine and
+    an IP address to its interface. The generators work on these records
+    only, the raw endpoint results are no longer needed.
+
+    In daemon mode a created, updated or deleted object is patched into the
+    records, see update_object() and delete_object(). A device or interface
+    is updated in place, the records pointing to it see the change. A
+    change to a prefix is not patched, it moves what every prefix holds.
+    After a delta sync the objects it changed are looked up the same way,
+    see find_changes().
+    """
+
+    def __init__(self, endpoints: dict[str, list[dict] | None]):
+        self.devices: dict[int, Netbox_Device] = {
+            d['id']: Netbox_Device(d) for d in endpoints.get("dcim/devices/") or []}
+        self.virtual_machines: dict[int, Netbox_Device] = {
+            vm['id']: Netbox_Device(vm, virtual_machine=True)
+            for vm in endpoints.get("virtualization/virtual-machines/") or []}
+
+        self.interfaces: dict[int, Netbox_Interface] = {
+            i['id']: Netbox_Interface(i, self.devices.get(i['device']['id']) if i.get('device') else None)
+            for i in endpoints.get("dcim/interfaces/") or []}
+        self.vm_interfaces: dict[int, Netbox_Interface] = {
+            i['id']: Netbox_Interface(i, self.virtual_machines.get(i['virtual_machine']['id'])
+                                         if i.get('virtual_machine') else None)
+            for i in endpoints.get("virtualization/interfaces/") or []}
+
+        self.prefixes: list[Netbox_Prefix] = [Netbox_Prefix(p) for p in endpoints.get("ipam/prefixes/") or []]
+        self.ip_addresses: list[Netbox_IP_Address] = [
+            Netbox_IP_Address(ip_addr, self.get_assigned_interface(ip_addr))
+            for ip_addr in endpoints.get("ipam/ip-addresses/") or []]
+        self.ip_ranges: list[Netbox_IP_Range] = [Netbox_IP_Range(r) for r in endpoints.get("ipam/ip-ranges/") or []]
+
+        self.prefix_index: Netbox_Prefix_Index | None = None
+        self.host_inventory: Netbox_Host_Inventory | None = None
+
+        # Only needed to patch the records, see index_references()
+        self.references: dict[Netbox_Device | Netbox_Interface, list] | None = None
+        self.orphans: dict[tuple[str, int], list] | None = None
+        self.parents: dict[tuple[str, int], list[Netbox_IP_Address]] | None = None
+        self.positions: dict[str, dict[int, int]] | None = None
+
+    def __repr__(self) -> str:
+        return f"Netbox_Records: devices ({len(self.devices)}), virtual machines ({len(self.virtual_machines)}), " \
+               f"interfaces ({len(self.interfaces) + len(self.vm_interfaces)}), prefixes ({len(self.prefixes)}), " \
+               f"ip addresses ({len(self.ip_addresses)}), ip ranges ({len(self.ip_ranges)})"
+
+    def get_assigned_interface(self, ip_addr: dict) -> Netbox_Interface | None:
+        if not (assigned_object := ip_addr.get('assigned_object')):
+            return None
+        if ip_addr.get('assigned_object_type') == 'dcim.interface':
+            return self.interfaces.get(assigned_object.get('id'))
+        if ip_addr.get('assigned_object_type') == 'virtualization.vminterface':
+            return self.vm_interfaces.get(assigned_object.get('id'))
+        return None
+
+    def get_prefix_index(self) -> Netbox_Prefix_Index:
+        # Built once on first use
+        if self.prefix_index is None:
+            self.prefix_index = Netbox_Prefix_Index(self.prefixes, self.ip_addresses, self.ip_ranges)
+        return self.prefix_index
+
+    def get_host_inventory(self) -> Netbox_Host_Inventory:
+        # Built once on first use, shared by the DHCP sections and the forward zone
+        if self.host_inventory is None:
+            self.host_inventory = Netbox_Host_Inventory(self.get_prefix_index())
+        return self.host_inventory
+
+    def index_references(self) -> None:
+        # The interfaces of each device and the IP addresses of each
+        # interface, and those pointing to an object not known, by its object
+        # type and id. The IP addresses are also kept by the device or virtual
+        # machine nested in their assignment, the status of which the reverse
+        # zones read. Built on the first patch, a single run never needs them.
+        if self.references is not None:
+            return
+
+        self.references, self.orphans, self.parents = {}, {}, {}
+        for interface in self.interfaces.values():
+            self.add_reference(interface, interface.device, ("dcim.device", interface.unresolved_device_id))
+        for interface in self.vm_interfaces.values():
+            self.add_reference(interface, interface.device,
+                               ("virtualization.virtualmachine", interface.unresolved_device_id))
+        for ip_addr in self.ip_addresses:
+            self.add_reference(ip_addr, ip_addr.interface, (ip_addr.assigned_object_type, ip_addr.unresolved_interface_id))
+            self.add_parent(ip_addr)
+
+        self.positions = {"ipam/ip-addresses/": {ip_addr.id: n for n, ip_addr in enumerate(self.ip_addresses)},
+                          "ipam/ip-ranges/": {ip_range.id: n for n, ip_range in enumerate(self.ip_ranges)}}
+
+    def add_reference(self, record, target, orphan_key: tuple[str | None, int | None]) -> None:
+        if target is not None:
+            self.references.setdefault(target, []).append(record)
+        elif orphan_key[1] is not None:
+            self.orphans.setdefault(orphan_key, []).append(record)
+
+    def remove_reference(self, record, target, orphan_key: tuple[str | None, int | None]) -> None:
+        references = self.references.get(target, []) if target is not None else self.orphans.get(orphan_key, [])
+        if record in references:
+            references.remove(record)
+
+    def add_parent(self, ip_addr: Netbox_IP_Address) -> None:
+        if ip_addr.parent_id is not None:
+            self.parents.setdefault((ip_addr.parent_type, ip_addr.parent_id), []).append(ip_addr)
+
+    def remove_parent(self, ip_addr: Netbox_IP_Address) -> None:
+        if ip_addr in (ip_addrs := self.parents.get((ip_addr.parent_type, ip_addr.parent_id), [])):
+            ip_addrs.remove(ip_addr)
+
+    def get_changes(self, record: Netbox_Device | Netbox_Interface) -> list[tuple[int, int, int]]:
+        # The addresses of an interface, or of all interfaces of a device and
+        # those assigned to it
+        if isinstance(record, Netbox_Device):
+            parent_type = 'virtual_machine' if record.is_virtual_machine() else 'device'
+            ip_addrs = self.parents.get((parent_type, record.id), [])
+            return [change for interface in self.references.get(record, []) for change in self.get_changes(interface)] + \
+                   [(ip_addr.version, ip_addr.ip_int, ip_addr.ip_int) for ip_addr in ip_addrs]
+        return [(ip_addr.version, ip_addr.ip_int, ip_addr.ip_int) for ip_addr in self.references.get(record, [])]
+
+    def find_changes(self, endpoints: dict[str, list[dict] | None],
+                     changed_ids: dict[str, set[int]]) -> list[tuple[int, int, int]] | None:
+        """The addresses the objects changed or deleted since the endpoints
+        were loaded touch, before and after the change, as a delta sync tells.
+
+        Args:
+            endpoints (dict[str, list[dict] | None]): Results per endpoint before the change
+            changed_ids (dict[str, set[int]]): Ids of the objects changed or deleted per endpoint
+
+        Returns:
+            list[tuple[int, int, int]] | None: IP version, first and last address of
+            what changed. None when a prefix changed, which moves what every prefix holds.
+        """
+        changes = []
+        for endpoint, obj_ids in changed_ids.items():
+            if not obj_ids:
+                continue
+
+            self.index_references()
+            before = {obj['id']: obj for obj in endpoints.get(endpoint) or [] if obj['id'] in obj_ids}
+            for obj_id in obj_ids:
+                if (object_changes := self.get_object_changes(endpoint, obj_id, before.get(obj_id))) is None:
+                    return None
+                changes.extend(object_changes)
+        return changes
+
+    def get_object_changes(self, endpoint: str, obj_id: int, before: dict | None) -> list[tuple[int, int, int]] | None:
+        # A deleted device or interface is found through the records still pointing to it
+        match endpoint:
+            case "dcim/devices/":
+                return self.get_device_changes(obj_id, self.devices, "dcim.device", 'device')
+            case "virtualization/virtual-machines/":
+                return self.get_device_changes(obj_id, self.virtual_machines,
+                                               "virtualization.virtualmachine", 'virtual_machine')
+            case "dcim/interfaces/":
+                return self.get_interface_changes(obj_id, self.interfaces, "dcim.interface")
+            case "virtualization/interfaces/":
+                return self.get_interface_changes(obj_id, self.vm_interfaces, "virtualization.vminterface")
+            case "ipam/ip-addresses/":
+                changes = []
+                if (n := self.positions[endpoint].get(obj_id)) is not None:
+                    ip_addr = self.ip_addresses[n]
+                    changes.append((ip_addr.version, ip_addr.ip_int, ip_addr.ip_int))
+                if before:
+                    version, ip_int, _ = parse_address(before['address'])
+                    changes.append((version, ip_int, ip_int))
+                return changes
+            case "ipam/ip-ranges/":
+                changes = []
+                if (n := self.positions[endpoint].get(obj_id)) is not None:
+                    ip_range = self.ip_ranges[n]
+                    changes.append((ip_range.version, ip_range.start_int, ip_range.end_int))
+                if before:
+                    version, start_int, _ = parse_address(before['start_address'])
+                    _, end_int, _ = parse_address(before['end_address'])
+                    changes.append((version, start_int, end_int))
+                return changes
+
+        return None
+
+    def get_device_changes(self, obj_id: int, devices: dict[int, Netbox_Device],
+                           object_type: str, parent_type: str) -> list[tuple[int, int, int]]:
+        if (device := devices.get(obj_id)) is not None:
+            return self.get_changes(device)
+        ip_addrs = self.parents.get((parent_type, obj_id), [])
+        return [change for interface in self.orphans.get((object_type, obj_id), [])
+                for change in self.get_changes(interface)] + \
+               [(ip_addr.version, ip_addr.ip_int, ip_addr.ip_int) for ip_addr in ip_addrs]
+
+    def get_interface_changes(self, obj_id: int, interfaces: dict[int, Netbox_Interface],
+                              object_type: str) -> list[tuple[int, int, int]]:
+        if (interface := interfaces.get(obj_id)) is not None:
+            return self.get_changes(interface)
+        return [(ip_addr.version, ip_addr.ip_int, ip_addr.ip_int) for ip_addr in self.orphans.get((object_type, obj_id), [])]
+
+    def update_index(self, changes: list[tuple[int, int, int]], moved: bool = False) -> list[tuple[int, int, int]]:
+        # Only the prefixes holding a change are searched and joined again
+        if self.prefix_index is not None:
+            prefixes = self.prefix_index.update(changes, moved)
+            if self.host_inventory is not None:
+                self.host_inventory.invalidate(prefixes)
+        return changes
+
+    def update_object(self, endpoint: str, data: dict) -> list[tuple[int, int, int]] | None:
+        """Patch a created or updated object into the records.
+
+        Args:
+            endpoint (str): Endpoint of the object
+            data (dict): The object as loaded from the endpoint
+
+        Returns:
+            list[tuple[int, int, int]] | None: IP version, first and last address of
+            what changed, before and after the change. None when the records must
+            be normalized again.
+        """
+        self.index_references()
+
+        match endpoint:
+            case "dcim/devices/":
+                return self.update_device(Netbox_Device(data), self.devices, "dcim.device")
+            case "virtualization/virtual-machines/":
+                return self.update_device(Netbox_Device(data, virtual_machine=True), self.virtual_machines,
+                                          "virtualization.virtualmachine")
+            case "dcim/interfaces/":
+                device = self.devices.get(data['device']['id']) if data.get('device') else None
+                return self.update_interface(Netbox_Interface(data, device), self.interfaces,
+                                             "dcim.interface", "dcim.device")
+            case "virtualization/interfaces/":
+                device = self.virtual_machines.get(data['virtual_machine']['id']) if data.get('virtual_machine') else None
+                return self.update_interface(Netbox_Interface(data, device), self.vm_interfaces,
+                                             "virtualization.vminterface", "virtualization.virtualmachine")
+            case "ipam/ip-addresses/":
+                return self.update_ip_address(Netbox_IP_Address(data, self.get_assigned_interface(data)))
+            case "ipam/ip-ranges/":
+                return self.update_ip_range(Netbox_IP_Range(data))
+
+        return None
+
+    def delete_object(self, endpoint: str, obj_id: int) -> list[tuple[int, int, int]] | None:
+        """Remove a deleted object from the records, see update_object()"""
+        self.index_references()
+
+        match endpoint:
+            case "dcim/devices/":
+                return self.delete_device(obj_id, self.devices, "dcim.device")
+            case "virtualization/virtual-machines/":
+                return self.delete_device(obj_id, self.virtual_machines, "virtualization.virtualmachine")
+            case "dcim/interfaces/":
+                return self.delete_interface(obj_id, self.interfaces, "dcim.interface", "dcim.device")
+            case "virtualization/interfaces/":
+                return self.delete_interface(obj_id, self.vm_interfaces,
+                                             "virtualization.vminterface", "virtualization.virtualmachine")
+            case "ipam/ip-addresses/":
+                if (old := self.remove_record("ipam/ip-addresses/", self.ip_addresses, obj_id)) is None:
+                    return []
+                self.remove_reference(old, old.interface, (old.assigned_object_type, old.unresolved_interface_id))
+                self.remove_parent(old)
+                return self.update_index([(old.version, old.ip_int, old.ip_int)], moved=True)
+            case "ipam/ip-ranges/":
+                if (old := self.remove_record("ipam/ip-ranges/", self.ip_ranges, obj_id)) is None:
+                    return []
+                return self.update_index([(old.version, old.start_int, old.end_int)], moved=True)
+
+        return None
+
+    def update_device(self, device: Netbox_Device, devices: dict[int, Netbox_Device],
+                      object_type: str) -> list[tuple[int, int, int]]:
+        if (old := devices.get(device.id)) is not None:
+            copy_record(old, device)
+            return self.update_index(self.get_changes(old))
+
+        # The interfaces of the device that came before it
+        devices[device.id] = device
+        for interface in self.orphans.pop((object_type, device.id), []):
+            interface.set_device(device)
+            self.add_reference(interface, device, (object_type, None))
+        return self.update_index(self.get_changes(device))
+
+    def delete_device(self, obj_id: int, devices: dict[int, Netbox_Device],
+                      object_type: str) -> list[tuple[int, int, int]]:
+        if (device := devices.pop(obj_id, None)) is None:
+            return []
+
+        changes = self.get_changes(device)
+        for interface in self.references.pop(device, []):
+            interface.set_device(None)
+            self.add_reference(interface, None, (object_type, obj_id))
+        return self.update_index(changes)
+
+    def update_interface(self, interface: Netbox_Interface, interfaces: dict[int, Netbox_Interface],
+                         object_type: str, device_type: str) -> list[tuple[int, int, int]]:
+        if (old := interfaces.get(interface.id)) is not None:
+            self.remove_reference(old, old.device, (device_type, old.unresolved_device_id))
+            copy_record(old, interface)
+            interface = old
+        else:
+            # The IP addresses of the interface that came before it
+            interfaces[interface.id] = interface
+            for ip_addr in self.orphans.pop((object_type, interface.id), []):
+                ip_addr.set_interface(interface)
+                self.add_reference(ip_addr, interface, (object_type, None))
+
+        self.add_reference(interface, interface.device, (device_type, interface.unresolved_device_id))
+        return self.update_index(self.get_changes(interface))
+
+    def delete_interface(self, obj_id: int, interfaces: dict[int, Netbox_Interface],
+                         object_type: str, device_type: str) -> list[tuple[int, int, int]]:
+        if (interface := interfaces.pop(obj_id, None)) is None:
+            return []
+
+        changes = self.get_changes(interface)
+        self.remove_reference(interface, interface.device, (device_type, interface.unresolved_device_id))
+        for ip_addr in self.references.pop(interface, []):
+            ip_addr.set_interface(None)
+            self.add_reference(ip_addr, None, (object_type, obj_id))
+        return self.update_index(changes)
+
+    def update_ip_address(self, ip_addr: Netbox_IP_Address) -> list[tuple[int, int, int]]:
+        changes = [(ip_addr.version, ip_addr.ip_int, ip_addr.ip_int)]
+        if (old := self.replace_record("ipam/ip-addresses/", self.ip_addresses, ip_addr)) is not None:
+            self.remove_reference(old, old.interface, (old.assigned_object_type, old.unresolved_interface_id))
+            self.remove_parent(old)
+            changes.append((old.version, old.ip_int, old.ip_int))
+
+        self.add_reference(ip_addr, ip_addr.interface, (ip_addr.assigned_object_type, ip_addr.unresolved_interface_id))
+        self.add_parent(ip_addr)
+        return self.update_index(changes, moved=old is None or changes[0] != changes[1])
+
+    def update_ip_range(self, ip_range: Netbox_IP_Range) -> list[tuple[int, int, int]]:
+        changes = [(ip_range.version, ip_range.start_int, ip_range.end_int)]
+        if (old := self.replace_record("ipam/ip-ranges/", self.ip_ranges, ip_range)) is not None:
+            changes.append((old.version, old.start_int, old.end_int))
+
+        return self.update_index(changes, moved=old is None or changes[0][:2] != changes[1][:2])
+
+    def replace_record(self, endpoint: str, records: list, record):
+        # In the place of the record with the same id, or appended as a load would
+        positions = self.positions[endpoint]
+        if (n := positions.get(record.id)) is None:
+            positions[record.id] = len(records)
+            records.append(record)
+            return None
+
+        old, records[n] = records[n], record
+        return old
+
+    def remove_record(self, endpoint: str, records: list, obj_id: int):
+        positions = self.positions[endpoint]
+        if (n := positions.pop(obj_id, None)) is None:
+            return None
+
+        old = records.pop(n)
+        for record in records[n:]:
+            positions[record.id] -= 1
+        return old
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+# Responses worth another try: rate limited or a hiccup of the proxy or server
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+
+class Netbox_Request_Scheduler:
+    """Paces and retries the requests to NetBox.
+
+    A token bucket shared by all threads and tasks limits the request rate.
+    Every request reserves a slot in it and waits for that slot, so callers
+    are served in order. Failed requests are retried with full-jitter
+    exponential backoff, or after the 'Retry-After' the server asks for. A
+    request is never retried past its deadline.
+    """
+
+    def __init__(self,
+                 rate_limit: float = 0.0,
+                 max_retries: int = 5,
+                 deadline: float = 120.0,
+                 timeout: float = 10.0,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0):
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.lock = threading.Lock()
+        self.capacity = max(1.0, rate_limit)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def __repr__(self) -> str:
+        return f"Netbox_Request_Scheduler: rate limit: {self.rate_limit}/s retries: {self.max_retries}"
+
+    def reserve(self) -> float:
+        """Take a token from the bucket.
+
+        Returns:
+            float: Seconds to wait before the request may be sent
+        """
+        if not self.rate_limit:
+            return 0.0
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_limit)
+            self.updated = now
+
+            # Going into debt reserves a slot in the future
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate_limit
+
+    def get_deadline(self) -> float:
+        return time.monotonic() + self.deadline
+
+    def get_timeout(self, deadline: float) -> float:
+        # Never wait for a response past the deadline
+        return max(0.1, min(self.timeout, deadline - time.monotonic()))
+
+    def get_backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+            try:
+                return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def should_retry(self, attempt: int, delay: float, deadline: float) -> bool:
+        return attempt < self.max_retries and time.monotonic() + delay < deadline
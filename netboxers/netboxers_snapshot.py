@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import os
+import gzip
+import json
+import time
+import tempfile
+
+
+# Bump when the layout of the snapshot changes, older snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+
+def read_snapshot(filepath: str) -> dict | None:
+    """Read a snapshot of NetBox endpoint results written by write_snapshot()
+
+    Args:
+        filepath (str): Snapshot file
+
+    Returns:
+        dict | None: The snapshot, or None when absent, unreadable or outdated
+    """
+    if not os.path.isfile(filepath):
+        return None
+
+    try:
+        with gzip.open(filepath, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable snapshot \'{filepath}\': {e}")
+        return None
+
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        print(f"Warning: ignoring snapshot \'{filepath}\' with version {snapshot.get('version')}")
+        return None
+
+    return snapshot
+
+
+def write_snapshot(filepath: str,
+                   endpoints: dict[str, list | None],
+                   sync_state: dict | None = None,
+                   validators: dict[str, dict] | None = None) -> float:
+    """Write the NetBox endpoint results as gzip compressed compact JSON. The
+    file is replaced atomically, a reader never sees a partial snapshot.
+
+    Args:
+        filepath (str): Snapshot file
+        endpoints (dict[str, list | None]): Results per endpoint
+        sync_state (dict | None): High-water marks for a delta sync
+        validators (dict[str, dict] | None): Validators per endpoint for conditional requests
+
+    Returns:
+        float: Creation time of the snapshot
+    """
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'created': time.time(),
+        'endpoints': endpoints,
+        'sync_state': sync_state,
+        'validators': validators,
+    }
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filepath)),
+                                    prefix=os.path.basename(filepath) + ".")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            f.write(json.dumps(snapshot, separators=(',', ':')).encode("utf-8"))
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return snapshot['created']
+
+
+def get_snapshot_age(snapshot: dict) -> float:
+    return time.time() - snapshot['created']
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import threading
+
+
+class Netbox_HTTP_Stats:
+    """Thread safe counters of the HTTP requests made to NetBox, per endpoint:
+    the number of requests, the bytes received and the time spent parsing
+    the JSON responses.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests: dict[str, int] = {}
+        self.bytes: dict[str, int] = {}
+        self.parse_time: dict[str, float] = {}
+
+    def __repr__(self) -> str:
+        return f"Netbox_HTTP_Stats: requests: {self.get_request_count()} bytes: {self.get_bytes()}"
+
+    def record(self, endpoint: str, nbytes: int = 0, parse_time: float = 0.0) -> None:
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.bytes[endpoint] = self.bytes.get(endpoint, 0) + nbytes
+            self.parse_time[endpoint] = self.parse_time.get(endpoint, 0.0) + parse_time
+
+    def get_request_count(self, endpoint: str | None = None) -> int:
+        with self.lock:
+            if endpoint is not None:
+                return self.requests.get(endpoint, 0)
+            return sum(self.requests.values())
+
+    def get_bytes(self, endpoint: str | None = None) -> int:
+        with self.lock:
+            if endpoint is not None:
+                return self.bytes.get(endpoint, 0)
+            return sum(self.bytes.values())
+
+    def get_parse_time(self, endpoint: str | None = None) -> float:
+        with self.lock:
+            if endpoint is not None:
+                return self.parse_time.get(endpoint, 0.0)
+            return sum(self.parse_time.values())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import json
+import codecs
+from typing import Iterable, Iterator
+
+
+class Netbox_JSON_Stream:
+    """Incremental parser of a NetBox list response.
+
+    Iterating yields the objects of the 'results' array one by one while the
+    response body is still arriving. Only the unparsed tail of the body is
+    kept in memory. All other top-level keys ('count', 'next', 'previous')
+    are collected in 'meta', in whatever order the server sends them.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.meta: dict = {}
+
+    def fill(self) -> bool:
+        # Replace the parsed part of the buffer with the next chunk
+        try:
+            text = self.decoder.decode(next(self.chunks))
+        except StopIteration:
+            text = self.decoder.decode(b"", final=True)
+            self.eof = True
+
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return not self.eof
+
+    def peek(self) -> str:
+        # Next non-whitespace character, or '' at the end of the body
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof or not self.fill():
+                if self.pos >= len(self.buf):
+                    return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Netbox_JSON_Stream: expected one of \'{chars}\', got \'{c}\'")
+        self.pos += 1
+        return c
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.json_decoder.raw_decode(self.buf, self.pos)
+
+                # A value is complete when something follows it, 12 could be
+                # the start of 1234
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill()
+
+    def __iter__(self) -> Iterator[dict]:
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+
+        while True:
+            key = self.value()
+            self.expect(":")
+
+            if key == 'results':
+                self.expect("[")
+                if self.peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield self.value()
+                        if self.expect(",]") == "]":
+                            break
+            else:
+                self.meta[key] = self.value()
+
+            if self.expect(",}") == "}":
+                break
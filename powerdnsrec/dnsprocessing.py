@@ -1,24 +1,26 @@
 from pathlib import Path
-import ipaddress
+from itertools import chain
+from typing import Iterator
 from ipaddress import IPv4Address, IPv6Address, IPv4Interface, IPv6Interface, ip_interface, ip_address
 
 from netboxers.netboxers_helpers import make_iface_dot_host_name, write_data_to_file
-from netboxers.netboxers_queries import cache_netbox_query_list, \
-                                        get_status_of_devvm_from_ipaddresses_obj_from_dev_vm_list, \
+from netboxers.netboxers_queries import get_status_of_devvm_from_ipaddresses_obj_from_dev_vm_list, \
                                         get_hosts_from_prefix, \
                                         fetch_active_prefixes
-from netboxers.models.netbox import Netbox_Prefix
+from netboxers.models.netbox import Netbox_Prefix, Netbox_IP_Address
 from netboxers.models.dns_zonefile import DNS_Zonefile, DNS_Resource_Record
+from powerdnsrec.reverse_zones import get_reverse_zone_cuts, get_reverse_zone_name, get_reverse_zonefile_path, \
+                                      split_range, partition_by_zone, get_changed_zones
 
 
 
-def create_zone_defaults(ctx: dict) -> DNS_Zonefile:
+def create_zone_defaults(ctx: dict, zone_name: str | None = None) -> DNS_Zonefile:
     zo = DNS_Zonefile()
 
-    # SOA
+    # SOA, of the domain unless another zone is named
     rr = DNS_Resource_Record(
             rr_type = 'SOA',
-            rr_name = ctx['powerdns_rec_domain'],
+            rr_name = zone_name or ctx['powerdns_rec_domain'],
             soa_mname = 'ns.' + ctx['powerdns_rec_domain'],
             soa_rname = 'hostmaster.' + ctx['powerdns_rec_domain'],
             soa_serial = 7,
@@ -37,26 +39,6 @@ def create_zone_defaults(ctx: dict) -> DNS_Zonefile:
     return zo
 
 
-def get_device_or_virtualmachine_obj(ctx: dict, interface_obj: dict) -> dict | None:
-    # Get device or virtualmachine object associated to the interface object.
-
-    for key, cache_key in [
-            ('device', 'dcim/devices/'),
-            ('virtual_machine', 'virtualization/virtual-machines/')
-        ]:
-        if obj := interface_obj.get(key):
-            return next((d for d in ctx['cache'][cache_key] if d['id'] == obj['id']), None)
-    return None
-
-
-def get_primary_ip_from_interface(ctx: dict, interface_obj: dict) -> IPv4Interface | IPv6Interface | None:
-    # get primary IP address from the interface (through the device configuration)
-    devvm = get_device_or_virtualmachine_obj(ctx, interface_obj)
-    if devvm and (p_ip := devvm.get('primary_ip')) and (addr := p_ip.get('address')):
-        return ip_interface(addr)
-    return None
-
-
 def powerdns_recursor_zonefile(ctx) -> DNS_Zonefile:
     # Setup defaults
     zo = create_zone_defaults(ctx)
@@ -70,32 +52,21 @@ def powerdns_recursor_zonefile(ctx) -> DNS_Zonefile:
             continue
 
         for h in host_tuples:
-            (_, dev_name, if_name, ip, interface_obj) = h
+            (_, dev_name, if_name, ip, is_primary) = h
 
             iface_hostname = make_iface_dot_host_name(dev_name, if_name)
 
             # Add the A record for each interface
-            rr = DNS_Resource_Record(
-                    rr_type = 'A',
-                    rr_name = iface_hostname,
-                    rr_data = str(ip)
-            )
+            rr = DNS_Resource_Record.make_a(iface_hostname, ip)
             zo.add_rr(rr)
 
 
             # Test if current handled IP is the primary IP in the device. If
             # yes, CNAME the name of the device to this IP through the
             # iface_hostname value.
-
-            primary_ip = get_primary_ip_from_interface(ctx, interface_obj)
-
-            if primary_ip and ip == primary_ip.ip:
+            if is_primary:
                 # Add CNAME towards primary ip_address holding interface
-                rr = DNS_Resource_Record(
-                        rr_type = 'CNAME',
-                        rr_name = dev_name,
-                        rr_data = f"{iface_hostname}.{ctx['powerdns_rec_domain']}"
-                        )
+                rr = DNS_Resource_Record.make_cname(dev_name, f"{iface_hostname}.{ctx['powerdns_rec_domain']}")
                 zo.add_rr(rr)
 
     return zo
@@ -116,137 +87,174 @@ def read_zonefile_footer_file(ctx: dict) -> str | None:
     return foot
 
 
-def write_zonefile(ctx: dict, zo: DNS_Zonefile, footer: str | None) -> None:
-    l = []
-    l.append(str(zo))
+def write_zonefile(ctx: dict, zo: DNS_Zonefile, footer: str | None) -> bool:
+    # The footer follows after an empty line
+    lines = zo.iter_lines()
     if footer:
-        l.append(footer)
-
-    s = "\n\n".join(l)
+        lines = chain(lines, ["", footer])
 
     # Write zonefile
-    write_data_to_file(ctx['powerdns_rec_zonefile'], s)
+    return write_data_to_file(ctx['powerdns_rec_zonefile'], lines)
     
 
 
-### WORK IN PROGRESS 192.168.x.x only
-def powerdns_recursor_zoneing_reverse_lookups(ctx):
-    zo = DNS_Zonefile()
-
-    print(ctx['powerdns_rec_zonefile_in_addr'])
-    ### ctx['powerdns_rec_zonefile_in_addr']
-
-    #ipam/ip-addresses/
-    zone_name = "168.192.in-addr.arpa"
+def powerdns_recursor_zoneing_reverse_lookups(ctx) -> bool:
+    """Write the reverse zones of all IPv4 and IPv6 addresses.
 
-    rr = DNS_Resource_Record(
-            rr_type = 'SOA',
-            rr_name = zone_name,
-            soa_mname = 'ns.' + ctx['powerdns_rec_domain'],
-            soa_rname = 'hostmaster.' + ctx['powerdns_rec_domain'],
-            soa_serial = 7,
-            soa_refresh = 86400,
-            soa_retry = 7200,
-            soa_expire = 3600000,
-            soa_minimum_ttl = 1800)
-    zo.add_rr(rr)
+    The zones are derived from the prefixes, see get_reverse_zone_cuts().
+    The PTR records are sorted by address once and partitioned over the
+    zones in a single merge pass, after which every zone is written to its
+    own file. After a patch in daemon mode only the zones holding a change
+    are generated and written, see Netbox_Cache.get_changes().
 
+    Args:
+        ctx (dict): Context
 
-    rr = DNS_Resource_Record(
-            rr_type = 'NS',
-            rr_name = '@',
-            rr_data = 'ns.' + ctx['powerdns_rec_domain'])
-    zo.add_rr(rr)
+    Returns:
+        bool: True when any of the zonefiles changed
+    """
+    records = ctx['cache'].get_records()
 
-    # Fetch all devices
-    unfiltered_devices = cache_netbox_query_list(ctx, "dcim/devices")
-    if unfiltered_devices:
-        devices = [d for d in unfiltered_devices if d['status']['value'] in ('active', 'decommissioning', 'staged')]
-    else:
-        devices = None
+    # Reverse zones of all prefixes in use
+    zones = get_reverse_zone_cuts([p.get_prefix() for p in records.prefixes if p.get_status() != 'deprecated'])
+    if not zones:
+        print("Error: no prefixes found to derive the reverse zones from.")
+        return False
 
-    # Fetch all virtual machines
-    unfiltered_vms = cache_netbox_query_list(ctx, "virtualization/virtual-machines/")
-    if unfiltered_vms:
-        vms = [d for d in unfiltered_vms if d['status']['value'] in ('active', 'decommissioning', 'staged')]
-    else:
-        vms = None
+    # Only the zones holding a change, or all
+    changes = ctx['cache'].get_changes()
+    changed_zones = zones if changes is None else get_changed_zones(zones, changes)
 
+    # All devices and virtual machines, indexed by id
+    devices = {d.id: d for d in records.devices.values() if d.get_status() in ('active', 'decommissioning', 'staged')}
+    vms = {d.id: d for d in records.virtual_machines.values() if d.get_status() in ('active', 'decommissioning', 'staged')}
 
-    # Query for prefixes and ranges
-    ip_addresses = cache_netbox_query_list(ctx, "ipam/ip-addresses/")
-    if not ip_addresses:
+    if not records.ip_addresses:
         print("Error: no IP addresses found.")
-        return
+        return False
+
+    # The IP addresses of the changed zones, in the order of the records
+    ip_addresses = records.ip_addresses
+    if changes is not None:
+        prefix_index = records.get_prefix_index()
+        ip_addresses = [ip for zone in changed_zones for ip in prefix_index.get_bucket(zone).get_ip_addresses()]
 
     # Filter on active and reserved IP addresses
-    ip_addresses_to_process = [ip for ip in ip_addresses if ip['status']['value'] in ('active', 'reserved')]
-                                     
-    # Process
-    for ip_addr_obj in ip_addresses_to_process:
-        if ip_addr_obj['family']['value'] == 6:
-            print(f"IP address {ip_addr_obj['address']} skipping IPv6 for PTR records.")
-            continue
+    ip_addresses_to_process = [ip for ip in ip_addresses if ip.get_status() in ('active', 'reserved')]
 
-        ip = ip_interface(ip_addr_obj['address'])
-        if not ip.is_private:
-            print(f"IP address {ip_addr_obj['address']} skipping because not RFC1918.")
-            continue
-        
+    # PTR records with the IP version and address to sort and partition them on,
+    # and likewise the lines of the pieces of the IP ranges
+    ptr_records: list[tuple[int, int, DNS_Resource_Record]] = []
+    range_lines: list[tuple[int, int, Iterator[str]]] = []
 
+    # Process
+    for ip_addr_obj in ip_addresses_to_process:
         # Handle reserved
         # Will create a new DNS Resource Record with the IP address and reserved tag.
-        if ip_addr_obj['status']['value'] == 'reserved': 
-            rr = create_rr_ptr_for_reserved_address(ip_addr_obj['address'], "reserved_ip")
-            zo.add_rr(rr)
+        if ip_addr_obj.get_status() == 'reserved': 
+            rr = create_rr_ptr_for_reserved_address(ip_addr_obj.get_ip_address(), "reserved_ip")
+            ptr_records.append((ip_addr_obj.version, ip_addr_obj.ip_int, rr))
             continue
         
         
         # If the associated device or virtual machine is not active, skip
         status = get_status_of_devvm_from_ipaddresses_obj_from_dev_vm_list(ctx, ip_addr_obj, devices, vms)
         if status is None:
-            print(f"skipping {ip_addr_obj['address']} as there is no interface assigned to it.")
+            print(f"skipping {ip_addr_obj.get_ip_interface()} as there is no interface assigned to it.")
             continue
         elif status != 'active':
-            print(f"skipping {ip_addr_obj['address']} because the device associated to the IP address is not active.")
+            print(f"skipping {ip_addr_obj.get_ip_interface()} because the device associated to the IP address is not active.")
             continue
 
         # Create DNS Resource Record from IP address information
         rr = create_rr_ptr_from_ip_address(ctx, ip_addr_obj)
-        zo.add_rr(rr)
+        ptr_records.append((ip_addr_obj.version, ip_addr_obj.ip_int, rr))
 
 
     ## Create PTR records for IP Range addresses.
-    unfiltered_ip_ranges = cache_netbox_query_list(ctx, "ipam/ip-ranges/")
-    if not unfiltered_ip_ranges:
+    if not records.ip_ranges:
         print("Warning: no IP addresses found.")
     else:
-        ip_ranges = [ir for ir in unfiltered_ip_ranges 
-                        if is_active(ir) and 
-                            has_tag(ir, ctx['dnsmasq_dhcp_selected_range_in_prefix_by_tag'])]
+        ip_ranges = [ir for ir in records.ip_ranges
+                        if ir.is_active() and 
+                            ir.has_tag(ctx['dnsmasq_dhcp_selected_range_in_prefix_by_tag']) and
+                            (changes is None or get_changed_zones(changed_zones, [(ir.version, ir.start_int, ir.end_int)]))]
         for ip_range in ip_ranges:
-            for ip in ip_range_iterator(ip_range['start_address'], ip_range['end_address']):
-                rr = create_rr_ptr_for_reserved_address(ip, "range_ip")
-                zo.add_rr(rr)
-
+            start = ip_range.get_start_address()
+            end = ip_range.get_end_address()
+            size = ip_range.get_size()
+
+            # The PTR records of a range are only generated while writing, yet
+            # an IPv6 range can hold more addresses than any zonefile can
+            generate = ctx['powerdns_rec_range_ptr_generate'] and start.version == 4
+            if not generate and size > ctx['powerdns_rec_range_ptr_max_expand']:
+                print(f"Warning: skipping the PTR records of IP range {start}-{end}, its {size} addresses exceed "
+                      f"the maximum of {ctx['powerdns_rec_range_ptr_max_expand']}.")
+                continue
+
+            for piece_start, piece_end in split_range(start.version, int(start), int(end)):
+                range_lines.append((start.version, piece_start,
+                                    iter_range_ptr_lines(start.version, piece_start, piece_end, "range_ip", generate)))
+
+
+    # One sort, then one pass to hand every record to its zone
+    ptr_records.sort(key=lambda r: (r[0], r[1]))
+    partitions, outside = partition_by_zone(changed_zones, ptr_records)
+    range_lines.sort(key=lambda r: (r[0], r[1]))
+    range_partitions, range_outside = partition_by_zone(changed_zones, range_lines)
+
+    # Outside of the changed zones is not outside of every zone
+    if changes is None:
+        for version, address, _ in outside:
+            print(f"IP address {ip_address(address) if version == 4 else IPv6Address(address)} "
+                  f"skipping because no prefix holds a reverse zone for it.")
+        for version, address, _ in range_outside:
+            print(f"IP range from {ip_address(address) if version == 4 else IPv6Address(address)} "
+                  f"skipping because no prefix holds a reverse zone for it.")
+
+    print(f"Info: Reverse zones: {len(changed_zones)} zones with {len(ptr_records) - len(outside)} PTR records "
+          f"and {len(range_lines) - len(range_outside)} IP range pieces.")
+
+    # Write a zonefile per zone
+    changed = False
+    for (zone, zone_records), (_, zone_range_lines) in zip(partitions, range_partitions):
+        zone_name = get_reverse_zone_name(zone)
+
+        zo = create_zone_defaults(ctx, zone_name)
+        for rr in zone_records:
+            zo.add_rr(rr)
+        for lines in zone_range_lines:
+            zo.add_lines(lines)
 
-    # Write zonefile
-    write_data_to_file(ctx.get('powerdns_rec_zonefile_in_addr'), str(zo))
+        path = get_reverse_zonefile_path(ctx.get('powerdns_rec_zonefile_in_addr'), zone_name, len(zones) == 1)
+        changed |= write_data_to_file(path, zo.iter_lines())
 
+    return changed
 
-def is_active(obj: dict) -> bool:
-    return obj['status']['value'] == 'active'
 
+def iter_range_ptr_lines(version: int, start: int, end: int, prefix_name: str, generate: bool) -> Iterator[str]:
+    """Lines of the PTR records of a piece of an IP range, as split by
+    split_range(). Generated lazily, straight into the zonefile.
 
-def has_tag(obj: dict, tag_name: str) -> bool:
-    return any(t['name'] == tag_name for t in obj.get('tags', []))
+    Args:
+        version (int): IP version
+        start (int): First address of the piece
+        end (int): Last address of the piece, in the same /24 for IPv4
+        prefix_name (str): Prefix of the PTR target, as of create_rr_ptr_for_reserved_address()
+        generate (bool): One $GENERATE directive for the piece instead of a record per address
 
+    Yields:
+        Iterator[str]: Zonefile lines
+    """
+    if generate and version == 4:
+        o1, o2, o3, _ = str(ip_address(start)).split('.')
+        yield f"$GENERATE {start & 255}-{end & 255} $.{o3}.{o2}.{o1}.in-addr.arpa. 86400 IN PTR " \
+              f"{prefix_name}_{o1}_{o2}_{o3}_$."
+        return
 
-def ip_range_iterator(start: str, end: str):
-    start_ip = ip_interface(start)
-    end_ip = ip_interface(end)
-    for ip_int in range(int(start_ip.ip), int(end_ip.ip) + 1):
-        yield ip_address(ip_int)
+    for ip_int in range(start, end + 1):
+        ip = ip_address(ip_int) if version == 4 else IPv6Address(ip_int)
+        yield str(create_rr_ptr_for_reserved_address(ip, prefix_name))
 
 
 def is_ip_interface(s: str) -> bool:
@@ -277,38 +285,24 @@ def create_rr_ptr_for_reserved_address(ip_addr: IPv4Address | IPv6Address | str,
 
     flatten_data = f"{prefix_name}_{flatten_ip}"
 
-    rr = DNS_Resource_Record(
-            rr_type = 'PTR',
-            rr_name = rev_ip_addr,
-            rr_data = flatten_data)
+    rr = DNS_Resource_Record.make_ptr(rev_ip_addr, flatten_data)
     
     return rr
     
 
-def create_rr_ptr_from_ip_address(ctx: dict, ip_addr_obj: dict) -> DNS_Resource_Record:
+def create_rr_ptr_from_ip_address(ctx: dict, ip_addr_obj: Netbox_IP_Address) -> DNS_Resource_Record:
     tupple = {}
 
-    # Assemble the tupple
-    tupple['ip_addr'] = ip_addr_obj['address']
-
-    if 'device' in ip_addr_obj['assigned_object']:
-        tupple['host_name'] = ip_addr_obj['assigned_object']['device']['name']
-    elif 'virtual_machine' in ip_addr_obj['assigned_object']:
-        tupple['host_name'] = ip_addr_obj['assigned_object']['virtual_machine']['name']
-
-    tupple['interface_name'] = ip_addr_obj['assigned_object']['name']
-
-    ip_addr_interface = ipaddress.ip_interface(tupple['ip_addr'])
-    tupple['rev_ip_addr'] = ip_addr_interface.ip.reverse_pointer
+    # Assemble the tupple, from the device or virtual machine the address is assigned to
+    tupple['host_name'] = ip_addr_obj.parent_name
+    tupple['interface_name'] = ip_addr_obj.interface_name
+    tupple['rev_ip_addr'] = ip_addr_obj.get_ip_address().reverse_pointer
 
 
     # RFC compliant domain name
     iface_hostname = make_iface_dot_host_name(tupple['host_name'], tupple['interface_name'])
     rfc_host_name = f"{iface_hostname}.{ctx['powerdns_rec_domain']}"
 
-    rr = DNS_Resource_Record(
-            rr_type = 'PTR',
-            rr_name = tupple['rev_ip_addr'],
-            rr_data = rfc_host_name)
+    rr = DNS_Resource_Record.make_ptr(tupple['rev_ip_addr'], rfc_host_name)
     
     return rr
\ No newline at end of file
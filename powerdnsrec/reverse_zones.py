@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+from typing import Iterator
+from ipaddress import IPv4Network, IPv6Network
+
+
+# Bits per label of a reverse zone name, an octet for IPv4 and a nibble for
+# IPv6, and the longest prefix that still gets a zone of its own
+REVERSE_ZONE_BITS = {4: (8, 24), 6: (4, 64)}
+
+
+def get_reverse_zone_cuts(prefixes: list[IPv4Network | IPv6Network]) -> list[IPv4Network | IPv6Network]:
+    """Derive the reverse zones from the prefixes.
+
+    A zone cut falls on a label boundary. A prefix between two boundaries is
+    split into the zones at the next boundary, a /12 into 16 zones of a /16.
+    A prefix longer than the longest zone falls in the zone it is part of, a
+    /26 in its /24. Zones inside another zone are dropped, what remains is a
+    disjoint set of zones.
+
+    Args:
+        prefixes (list[IPv4Network | IPv6Network]): Prefixes of NetBox
+
+    Returns:
+        list[IPv4Network | IPv6Network]: Disjoint zones, IPv4 before IPv6 and sorted by address
+    """
+    cuts = set()
+    for prefix in prefixes:
+        label_bits, longest = REVERSE_ZONE_BITS[prefix.version]
+        boundary = max(label_bits, -(-prefix.prefixlen // label_bits) * label_bits)
+        if boundary > longest:
+            cuts.add(prefix.supernet(new_prefix=longest))
+        else:
+            cuts.update(prefix.subnets(new_prefix=boundary))
+
+    # Sorted by address and the shortest first, a zone starting within the
+    # last kept zone is part of it
+    zones = []
+    for zone in sorted(cuts, key=lambda z: (z.version, int(z.network_address), z.prefixlen)):
+        if zones and zones[-1].version == zone.version and zone.network_address <= zones[-1].broadcast_address:
+            continue
+        zones.append(zone)
+
+    return zones
+
+
+def get_changed_zones(zones: list[IPv4Network | IPv6Network],
+                      changes: list[tuple[int, int, int]]) -> list[IPv4Network | IPv6Network]:
+    # The zones overlapping any of the changes, an IP version with its first and last address
+    return [zone for zone in zones
+            if any(version == zone.version and first <= int(zone.broadcast_address) and int(zone.network_address) <= last
+                   for version, first, last in changes)]
+
+
+def get_reverse_zone_name(zone: IPv4Network | IPv6Network) -> str:
+    # 192.168.1.0/24 is 1.168.192.in-addr.arpa
+    labels = zone.network_address.reverse_pointer.split('.')
+    return ".".join(labels[(zone.max_prefixlen - zone.prefixlen) // REVERSE_ZONE_BITS[zone.version][0]:])
+
+
+def get_reverse_zonefile_path(template: str | None, zone_name: str, single: bool) -> str | None:
+    # A '{zone}' in the path is replaced by the zone name. Without it a single
+    # zone is written to the path itself, and more zones to the path suffixed
+    # with the zone name
+    if template is None:
+        return None
+    if '{zone}' in template:
+        return template.replace('{zone}', zone_name)
+    if single:
+        return template
+    return f"{template}.{zone_name}"
+
+
+def split_range(version: int, start: int, end: int) -> Iterator[tuple[int, int]]:
+    # Pieces of a range within one block the size of the longest zone, as
+    # every zone is at least that large, each piece falls in a single zone
+    block = 1 << ((32 if version == 4 else 128) - REVERSE_ZONE_BITS[version][1])
+    while start <= end:
+        piece_end = min(end, start | (block - 1))
+        yield start, piece_end
+        start = piece_end + 1
+
+
+def partition_by_zone(zones: list[IPv4Network | IPv6Network],
+                      records: list[tuple[int, int, object]]) -> tuple[list[tuple[IPv4Network | IPv6Network, list]], list]:
+    """Partition records over the zones holding their address, in one merge
+    pass over both.
+
+    Args:
+        zones (list[IPv4Network | IPv6Network]): Disjoint zones as returned by get_reverse_zone_cuts()
+        records (list[tuple[int, int, object]]): IP version, address as int and record, sorted by version and address
+
+    Returns:
+        tuple[list[tuple[IPv4Network | IPv6Network, list]], list]: Records per zone, in the order
+        of the zones, and the records outside of every zone
+    """
+    bounds = [(zone.version, int(zone.network_address), int(zone.broadcast_address)) for zone in zones]
+    partitions = [(zone, []) for zone in zones]
+    outside = []
+
+    n = 0
+    for record in records:
+        version, address = record[0], record[1]
+
+        # Zones ending before this address hold none of the next records either
+        while n < len(bounds) and (bounds[n][0], bounds[n][2]) < (version, address):
+            n += 1
+
+        if n < len(bounds) and (bounds[n][0], bounds[n][1]) <= (version, address):
+            partitions[n][1].append(record[2])
+        else:
+            outside.append(record)
+
+    return partitions, outside
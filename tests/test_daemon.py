@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+import sys
+import importlib.util
+from pathlib import Path
+
+from benchmarks.fixture_server import synthetic_dataset
+from netboxers.configuration import argparsing, parse_config, sanity_checks
+from netboxers.netboxers_cache import Netbox_Cache
+from netboxers.netboxers_daemon import Netbox_Webhook_Daemon
+from netboxers.netboxers_helpers import get_ctx
+from netboxers.netboxers_queries import prefill_cache
+from netboxers.netboxers_snapshot import write_snapshot
+
+
+MAIN_SCRIPT = Path(__file__).resolve().parent.parent / "netbox-2-dnsmasq-dhcp-and-powerdns-rec.py"
+
+CONFIG = """
+[generic]
+netbox_base_url = http://127.0.0.1:1
+authkey = x
+verbose = false
+webhook_secret = test
+snapshot_file = {out}/snapshot.json.gz
+snapshot_ttl = 3600
+daemon = true
+daemon_port = 0
+daemon_debounce = 60
+
+[dnsmasq_dhcp]
+output_file = {out}/dhcp.conf
+lease_file = /var/cache/dnsmasq/dnsmasq-dhcp.leasefile
+authoritive = true
+default_lease_time_range = 600m
+default_lease_time_host = 90m
+default_domain = example.lan
+prefix_in_scope_by_tag = dnsmasq_generator
+default_gateway_per_prefix_identified_by_tag = net_default_gateway
+selected_range_in_prefix_by_tag = net_dhcp_range
+
+[powerdns_rec]
+zonefile = {out}/zonefile
+zonefile_in_addr = {out}/zonefile_in_addr
+domain = example.lan
+"""
+
+
+def load_generate():
+    # The main script is not importable by its name
+    spec = importlib.util.spec_from_file_location("netbox_2_dnsmasq", MAIN_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.generate
+
+
+def make_ctx(tmp_path: Path, monkeypatch, devices: int = 4) -> dict:
+    write_snapshot(str(tmp_path / "snapshot.json.gz"), synthetic_dataset(devices))
+    config = tmp_path / "netbox.config"
+    config.write_text(CONFIG.format(out=tmp_path))
+
+    monkeypatch.setattr(sys, 'argv', ["netbox-2-dnsmasq-dhcp-and-powerdns-rec.py", "-c", str(config)])
+    ctx = parse_config(argparsing(get_ctx()))
+    assert sanity_checks(ctx)
+    return ctx
+
+
+def read_outputs(tmp_path: Path) -> dict[str, str]:
+    # The host names are written with underscores, as 'device_0'
+    return {path.name: path.read_text().replace('-', '_') for path in sorted(tmp_path.iterdir())
+            if path.name in ("dhcp.conf", "zonefile") or path.name.startswith("zonefile_in_addr")}
+
+
+def test_device_rename_reaches_all_outputs(tmp_path, monkeypatch):
+    generate = load_generate()
+    ctx = prefill_cache(make_ctx(tmp_path, monkeypatch))
+    generate(ctx)
+
+    outputs = read_outputs(tmp_path)
+    assert len(outputs) == 3
+    assert all("device_0" in text for text in outputs.values())
+
+    # NetBox only sends the device on a rename, not its interfaces or IP addresses
+    daemon = Netbox_Webhook_Daemon(ctx, generate)
+    try:
+        event = {'event': 'updated', 'model': 'device',
+                 'data': {'id': 1, 'name': "renamed-box", 'status': {'value': 'active'},
+                          'primary_ip': {'id': 1, 'address': "10.0.0.2/24"}}}
+        assert daemon.queue_event(event)
+        daemon.timer.cancel()
+        daemon.run()
+    finally:
+        daemon.httpd.server_close()
+
+    outputs = read_outputs(tmp_path)
+    assert len(outputs) == 3
+    for name, text in outputs.items():
+        assert "renamed_box" in text, name
+        assert "device_0" not in text, name
+
+
+def test_patched_outputs_match_a_full_generation(tmp_path, monkeypatch, capsys):
+    generate = load_generate()
+    # The addresses fill the prefixes 10.0.0.0/24 to 10.0.2.0/24
+    ctx = prefill_cache(make_ctx(tmp_path, monkeypatch, devices=250))
+    generate(ctx)
+
+    daemon = Netbox_Webhook_Daemon(ctx, generate)
+    daemon.httpd.server_close()
+    active = {'value': 'active'}
+    for event in [
+            # An interface renamed, an IP address moved to the next prefix and one deleted
+            {'event': 'updated', 'model': 'interface',
+             'data': {'id': 3, 'name': "uplink", 'device': {'id': 2, 'name': "device-1"},
+                      'mac_address': "02:00:00:00:00:02"}},
+            {'event': 'updated', 'model': 'ipaddress',
+             'data': {'id': 1, 'address': "10.0.1.150/24", 'status': active, 'assigned_object_type': 'dcim.interface',
+                      'assigned_object': {'id': 1, 'name': "eth0", 'device': {'id': 1, 'name': "device-0"}},
+                      'tags': []}},
+            {'event': 'deleted', 'model': 'ipaddress', 'data': {'id': 5}}]:
+        daemon.apply_event(event)
+    capsys.readouterr()
+    generate(ctx)
+
+    # Only the sections and reverse zones holding the changes are generated
+    out = capsys.readouterr().out
+    assert "DHCP sections: 2 rendered, 1 reused." in out
+    assert "Reverse zones: 2 zones" in out
+
+    full = tmp_path / "full"
+    full.mkdir()
+    # The same settings, without the sections kept and from the patched results
+    full_ctx = {key: value for key, value in ctx.items() if key != 'dnsmasq_section_cache'}
+    full_ctx.update(cache=Netbox_Cache(),
+                    dnsmasq_dhcp_output_file=str(full / "dhcp.conf"),
+                    powerdns_rec_zonefile=str(full / "zonefile"),
+                    powerdns_rec_zonefile_in_addr=str(full / "zonefile_in_addr"))
+    for endpoint, objects in ctx['cache'].objects.items():
+        full_ctx['cache'].set_endpoint(endpoint, list(objects.values()))
+    generate(full_ctx)
+
+    assert read_outputs(tmp_path) == read_outputs(full)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+import copy
+
+import dnsmasq.process_prefixes_to_dnsmasq as process_prefixes_to_dnsmasq
+from benchmarks.fixture_server import synthetic_dataset
+from netboxers.netboxers_queries import prefill_cache
+from netboxers.netboxers_records import Netbox_Records
+from tests.test_daemon import load_generate, make_ctx, read_outputs
+
+
+def test_sections_of_the_same_snapshot_are_reused_without_their_inputs(tmp_path, monkeypatch, capsys):
+    generate = load_generate()
+    config = make_ctx(tmp_path, monkeypatch, devices=250)
+    config['dnsmasq_dhcp_section_cache_file'] = str(tmp_path / "sections.json")
+    generate(prefill_cache(dict(config)))
+    outputs = read_outputs(tmp_path)
+
+    # A new run from the same snapshot knows nothing changed since the sections were rendered
+    built = []
+    monkeypatch.setattr(process_prefixes_to_dnsmasq, 'get_dnsmasq_dhcp_section_inputs',
+                        lambda ctx, prefix: built.append(prefix))
+    capsys.readouterr()
+    generate(prefill_cache(dict(config)))
+
+    assert "DHCP sections: 0 rendered, 3 reused." in capsys.readouterr().out
+    assert built == []
+    assert read_outputs(tmp_path) == outputs
+
+
+def test_synced_changes_hold_the_old_and_new_addresses():
+    before = synthetic_dataset(250)
+    endpoints = copy.deepcopy(before)
+
+    # An IP address moved to the next prefix, and an interface deleted with its IP addresses left on it
+    ip_addr = endpoints["ipam/ip-addresses/"][0]
+    ip_addr['address'] = "10.0.1.150/24"
+    interface_id = endpoints["dcim/interfaces/"].pop(-1)['id']
+    records = Netbox_Records(endpoints)
+
+    changes = records.find_changes(before, {"ipam/ip-addresses/": {ip_addr['id']}, "dcim/interfaces/": {interface_id}})
+    prefixes = {str(prefix) for prefix in records.get_prefix_index().find_prefixes(changes)}
+    assert prefixes == {"10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24"}
+
+    # A prefix changes what every prefix holds
+    assert records.find_changes(before, {"ipam/prefixes/": {1}}) is None